@@ -0,0 +1 @@
+# bench - HTTP 负载基准测试 (进程内启动应用 + 本地 SQLite 数据库)
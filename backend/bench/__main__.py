@@ -0,0 +1,155 @@
+# __main__.py - 基准测试入口
+#
+# 用法 (在 backend 目录下执行):
+#   python -m bench                               # 默认参数运行，结果输出到标准输出
+#   python -m bench --output result.json          # 保存结果
+#   python -m bench --compare bench/baseline.json # 与基线对比，出现回退时以非 0 退出码结束
+#   python -m bench --save-baseline               # 用本次结果覆盖 bench/baseline.json
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+from datetime import timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="人员接口 HTTP 负载基准测试 (进程内应用 + 本地 SQLite)")
+    parser.add_argument("--rows", type=int, default=20000, help="预置的记录数 (默认 20000)")
+    parser.add_argument("--concurrency", type=str, default="1,16,64", help="并发数列表，逗号分隔 (默认 1,16,64)")
+    parser.add_argument("--requests", type=int, default=2000, help="每个并发级别发送的请求数 (默认 2000)")
+    parser.add_argument("--mix", type=str, default="create=1,get=6,list=2,update=1,delete=1",
+                        help="各接口请求比例 (默认 create=1,get=6,list=2,update=1,delete=1)")
+    parser.add_argument("--db-mode", choices=["sync", "async"], default="sync", help="数据库访问模式")
+    parser.add_argument("--seed", type=int, default=42, help="随机数种子，保证请求序列可重复")
+    parser.add_argument("--output", type=str, help="结果 JSON 输出路径 (默认输出到标准输出)")
+    parser.add_argument("--compare", type=str, nargs="?", const=DEFAULT_BASELINE, metavar="BASELINE",
+                        help="与基线 JSON 对比，有回退时退出码为 1")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="对比基线时允许的相对波动 (默认 0.25)")
+    parser.add_argument("--save-baseline", type=str, nargs="?", const=DEFAULT_BASELINE, metavar="PATH",
+                        help="把本次结果保存为基线")
+    return parser.parse_args(argv)
+
+
+def seed_database(rows: int, seed: int):
+    """
+    建表并批量写入种子数据，返回 (可查询/修改的学号, 可删除的学号)。
+    写入后执行 migrate.upgrade，与部署时一样补建索引并由迁移 3 计算统计聚合表
+    (否则统计表为空，删除请求会把计数扣成负数，/personnel/stats 也读不到数据)。
+    """
+    import contextlib
+    import random
+    from sqlalchemy import insert
+    import migrate
+    from database import engine, Base, Personnel
+    from dbCRUD import new_created_time
+    from bench.load import make_record
+
+    Base.metadata.create_all(engine)
+    rng = random.Random(seed)
+    now = new_created_time()
+    ids = [f"{2000000000000 + i}" for i in range(rows)]
+    with engine.begin() as connection:
+        for start in range(0, rows, 5000):
+            chunk = []
+            for offset, student_id in enumerate(ids[start:start + 5000]):
+                record = make_record(student_id, rng)
+                record["created_time"] = now - timedelta(seconds=rows - start - offset)
+                chunk.append(record)
+            connection.execute(insert(Personnel.__table__), chunk)
+    # 迁移的进度输出写到标准错误，标准输出只保留结果 JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        migrate.upgrade(engine)
+    # 预留 10% 的种子记录供删除请求使用
+    reserved = max(1, rows // 10)
+    return ids[reserved:], ids[:reserved]
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    concurrency_levels = [int(value) for value in args.concurrency.split(",")]
+
+    # 必须在导入应用模块之前设置，config.py 在导入时读取环境变量
+    db_path = os.path.join(tempfile.mkdtemp(prefix="personnel-bench-"), "bench.db")
+    os.environ["PERSONNEL_DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["PERSONNEL_DB_MODE"] = args.db_mode
+    os.environ.setdefault("PERSONNEL_SETTINGS_FILE", "")
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    # 高并发下连接池等待日志会刷屏，基准测试中只保留错误
+    logging.getLogger("personnel.db").setLevel(logging.ERROR)
+
+    from bench.load import Workload, parse_mix, run_level, compare_with_baseline
+    mix = parse_mix(args.mix)
+    stable_ids, deletable_ids = seed_database(args.rows, args.seed)
+
+    from main import app
+    workload = Workload(stable_ids, deletable_ids, mix, args.seed)
+
+    async def run_all():
+        # 所有并发级别在同一个事件循环中执行，异步引擎的连接不能跨事件循环复用
+        levels = []
+        try:
+            for concurrency in concurrency_levels:
+                level = await run_level(app, workload, concurrency, args.requests)
+                print(f"并发 {concurrency:>4}: {level['throughput_rps']:>9.1f} rps", file=sys.stderr)
+                levels.append(level)
+        finally:
+            if args.db_mode == "async":
+                from database_async import async_engine
+                await async_engine.dispose()
+        return levels
+
+    levels = asyncio.run(run_all())
+
+    report = {
+        "meta": {
+            "rows": args.rows,
+            "requests_per_level": args.requests,
+            "mix": mix,
+            "db_mode": args.db_mode,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "levels": levels,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"基线已保存到 {args.save_baseline}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        for key in ("rows", "requests_per_level", "mix", "db_mode"):
+            if baseline.get("meta", {}).get(key) != report["meta"][key]:
+                print(f"警告: 本次参数 {key} 与基线不同，对比结果仅供参考。", file=sys.stderr)
+        regressions = compare_with_baseline(report, baseline, args.tolerance)
+        if regressions:
+            print("\n!!! 性能回退 (相对基线 %s，容差 %.0f%%) !!!" % (args.compare, args.tolerance * 100), file=sys.stderr)
+            for line in regressions:
+                print("  - " + line, file=sys.stderr)
+            return 1
+        print("与基线对比：未发现性能回退。", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
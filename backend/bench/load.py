@@ -0,0 +1,167 @@
+# load.py - 对五个人员接口按配置比例施加并发负载，统计吞吐量与延迟分位数
+
+import asyncio
+import math
+import random
+import time
+from typing import Dict, List
+
+import httpx
+
+# 接口名称 -> (HTTP 方法, 路由模板)
+ROUTES = {
+    "create": ("POST", "/personnel/"),
+    "get": ("GET", "/personnel/{student_id}"),
+    "list": ("GET", "/personnel/"),
+    "update": ("PUT", "/personnel/{student_id}"),
+    "delete": ("DELETE", "/personnel/{student_id}"),
+}
+# 各接口视为成功的状态码
+EXPECTED_STATUS = {"create": 201, "get": 200, "list": 200, "update": 200, "delete": 204}
+
+HOBBIES = ["钓鱼", "阅读", "编程", "篮球", "羽毛球", "摄影", "旅行", "音乐"]
+NAMES = ["紫薯", "张三", "李四", "王五", "赵六", "欧阳修", "钱七", "孙八"]
+
+
+def make_record(student_id: str, rng: random.Random) -> dict:
+    """生成一条符合 PersonnelCreate 校验规则的记录"""
+    return {
+        "id": student_id,
+        "name": rng.choice(NAMES),
+        "email": f"u{student_id}@example.com",
+        "tel": "13" + student_id[-9:],
+        "hobby": rng.choice(HOBBIES),
+    }
+
+
+def parse_mix(text: str) -> Dict[str, int]:
+    """解析请求比例，例如 "create=1,get=6,list=2,update=1,delete=1" """
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ROUTES:
+            raise ValueError(f"未知的接口: {name}，可选: {', '.join(ROUTES)}")
+        mix[name] = int(weight)
+    if not any(mix.values()):
+        raise ValueError("请求比例不能全为 0")
+    return mix
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """最近秩法计算分位数 (输入需已排序)"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Workload:
+    """
+    负载状态：维护可查询/修改的学号集合与可删除的学号集合，保证请求可重复且互不干扰。
+    - 查询/修改只作用于 stable_ids (不会被删除)。
+    - 删除只作用于 deletable_ids (预留的种子记录 + 压测中新增的记录)。
+    """
+
+    def __init__(self, stable_ids: List[str], deletable_ids: List[str], mix: Dict[str, int], seed: int):
+        self.rng = random.Random(seed)
+        self.stable_ids = stable_ids
+        self.deletable_ids = list(deletable_ids)
+        self.names = [name for name, weight in mix.items() if weight > 0]
+        self.weights = [mix[name] for name in self.names]
+        self.next_id = 0
+
+    def new_student_id(self) -> str:
+        self.next_id += 1
+        return f"{9000000000000 + self.next_id}"
+
+    def next_request(self):
+        """按比例随机选择下一个请求，返回 (接口名, 方法, URL, 请求体)"""
+        name = self.rng.choices(self.names, self.weights)[0]
+        if name == "delete" and not self.deletable_ids:
+            name = "create"
+        if name == "create":
+            student_id = self.new_student_id()
+            self.deletable_ids.append(student_id)
+            return name, "POST", "/personnel/", make_record(student_id, self.rng)
+        if name == "get":
+            return name, "GET", f"/personnel/{self.rng.choice(self.stable_ids)}", None
+        if name == "list":
+            mode = self.rng.choice(("descend", "ascend"))
+            return name, "GET", f"/personnel/?mode={mode}&limit=50", None
+        if name == "update":
+            body = {"hobby": self.rng.choice(HOBBIES)}
+            return name, "PUT", f"/personnel/{self.rng.choice(self.stable_ids)}", body
+        index = self.rng.randrange(len(self.deletable_ids))
+        student_id = self.deletable_ids.pop(index)
+        return name, "DELETE", f"/personnel/{student_id}", None
+
+
+async def run_level(app, workload: Workload, concurrency: int, total_requests: int) -> dict:
+    """以固定并发数发送 total_requests 个请求，返回整体与各接口的统计结果"""
+    latencies: Dict[str, List[float]] = {name: [] for name in ROUTES}
+    errors: Dict[str, int] = {name: 0 for name in ROUTES}
+    remaining = [total_requests]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                name, method, url, body = workload.next_request()
+                start = time.perf_counter()
+                response = await client.request(method, url, json=body)
+                latencies[name].append(time.perf_counter() - start)
+                if response.status_code != EXPECTED_STATUS[name]:
+                    errors[name] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    routes = {}
+    for name, values in latencies.items():
+        if not values:
+            continue
+        values.sort()
+        routes[name] = {
+            "count": len(values),
+            "errors": errors[name],
+            "throughput_rps": round(len(values) / elapsed, 2),
+            "p50_ms": round(percentile(values, 50) * 1000, 3),
+            "p95_ms": round(percentile(values, 95) * 1000, 3),
+            "p99_ms": round(percentile(values, 99) * 1000, 3),
+        }
+    return {
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total_requests / elapsed, 2),
+        "routes": routes,
+    }
+
+
+def compare_with_baseline(report: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    与基线对比，返回回退项描述列表 (为空表示没有回退)。
+    - 吞吐量低于基线 (1 - tolerance) 倍，或 p95 延迟高于基线 (1 + tolerance) 倍，视为回退。
+    - 出现基线中没有的错误也视为回退。
+    """
+    regressions = []
+    baseline_levels = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    for level in report["levels"]:
+        base_level = baseline_levels.get(level["concurrency"])
+        if base_level is None:
+            continue
+        for name, stats in level["routes"].items():
+            base = base_level["routes"].get(name)
+            if base is None:
+                continue
+            where = f"并发 {level['concurrency']} / {name}"
+            if stats["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+                regressions.append(f"{where}: 吞吐量 {stats['throughput_rps']} < 基线 {base['throughput_rps']} rps")
+            if stats["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{where}: p95 {stats['p95_ms']} ms > 基线 {base['p95_ms']} ms")
+            if stats["errors"] > base.get("errors", 0):
+                regressions.append(f"{where}: 错误数 {stats['errors']} > 基线 {base.get('errors', 0)}")
+    return regressions
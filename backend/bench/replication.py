@@ -0,0 +1,175 @@
+# replication.py - 读写分离的一致性测试：两个 SQLite 文件模拟主库与只读副本，副本按固定延迟追赶主库
+#
+# 用法 (在 backend 目录下执行，需要安装 uvicorn):
+#   python -m bench.replication                       # 默认 5000 行、复制延迟 0.5 秒、同步模式
+#   python -m bench.replication --lag 1 --wait 0.2 --db-mode async
+#
+# 预置数据并执行迁移后，本进程的复制线程每 --interval 秒对主库做一次快照 (sqlite3 backup)，
+# 快照在 --lag 秒后整体写入副本文件，副本上的数据 (包括复制心跳) 始终是 lag 秒前的主库。
+# 启动配置了 replica_database_url 的 uvicorn 子进程后，对不同学号依次：
+# - PUT 修改姓名，取得响应头中的一致性令牌；
+# - 立即不带令牌 GET (读副本，可能是旧值)，再带令牌 GET 单条记录和按手机号过滤的列表 (必须是新值)；
+# 全部写完并等待 lag 之后，不带令牌再读一遍 (必须是新值：副本的旧值不能留在记录缓存中)。
+# 带令牌读到旧值、等待后仍读到旧值，或读请求没有使用副本时退出码为 1。
+
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+
+from bench.startup import BACKEND_DIR, free_port, wait_for
+
+TOKEN_HEADER = "X-Consistency-Token"
+
+
+class LaggingReplicator:
+    """后台线程：定期对主库做快照，快照在 lag 秒后写入副本文件"""
+
+    def __init__(self, primary_path: str, replica_path: str, lag: float, interval: float):
+        self._primary_path = primary_path
+        self._replica_path = replica_path
+        self._lag = lag
+        self._interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="lagging-replicator", daemon=True)
+        self.applied = 0
+
+    def start(self):
+        self.copy(self._primary_path, self._replica_path)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    @staticmethod
+    def copy(source_path: str, target_path: str):
+        with sqlite3.connect(source_path) as source, sqlite3.connect(target_path) as target:
+            source.backup(target)
+
+    def _run(self):
+        pending = deque()  # (快照时刻, 内存中的快照)
+        with sqlite3.connect(self._primary_path, timeout=30) as primary, \
+                sqlite3.connect(self._replica_path, timeout=30) as replica:
+            while not self._stopped.wait(self._interval):
+                snapshot = sqlite3.connect(":memory:")
+                primary.backup(snapshot)
+                pending.append((time.monotonic(), snapshot))
+                # 只写入到期快照中最新的一个
+                due = None
+                while pending and time.monotonic() - pending[0][0] >= self._lag:
+                    if due is not None:
+                        due.close()
+                    due = pending.popleft()[1]
+                if due is not None:
+                    due.backup(replica)
+                    due.close()
+                    self.applied += 1
+
+
+def read_routing(client, base: str) -> dict:
+    """/metrics 中 personnel_read_routing_total 的各项"""
+    result = {}
+    for line in client.get(base + "/metrics").text.splitlines():
+        if line.startswith("personnel_read_routing_total{"):
+            labels, value = line.rsplit(" ", 1)
+            result[labels.split('"')[1]] = int(float(value))
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="读写分离的读己之写测试 (两个 SQLite 文件，模拟复制延迟)")
+    parser.add_argument("--rows", type=int, default=5000, help="预置的记录数 (默认 5000)")
+    parser.add_argument("--writes", type=int, default=50, help="修改的记录数 (默认 50)")
+    parser.add_argument("--lag", type=float, default=0.5, help="复制延迟，秒 (默认 0.5)")
+    parser.add_argument("--interval", type=float, default=0.02, help="快照间隔，秒 (默认 0.02)")
+    parser.add_argument("--wait", type=float, default=0.0, help="replica_wait_seconds：带令牌时等待副本的秒数 (默认 0)")
+    parser.add_argument("--db-mode", choices=["sync", "async"], default="sync", help="数据库访问模式")
+    parser.add_argument("--timeout", type=float, default=60.0, help="等待就绪的最长时间，秒 (默认 60)")
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix="personnel-replication-")
+    primary_path = os.path.join(directory, "primary.db")
+    replica_path = os.path.join(directory, "replica.db")
+    env = dict(os.environ, PERSONNEL_DATABASE_URL=f"sqlite:///{primary_path}", PERSONNEL_DB_MODE=args.db_mode,
+               PERSONNEL_REPLICA_DATABASE_URL=f"sqlite:///{replica_path}",
+               PERSONNEL_REPLICA_WAIT_SECONDS=str(args.wait))
+    env.setdefault("PERSONNEL_SETTINGS_FILE", "")
+    env.pop("PERSONNEL_ASYNC_DATABASE_URL", None)
+    env.pop("PERSONNEL_ASYNC_REPLICA_DATABASE_URL", None)
+    # 预置数据在子进程中完成 (seed_database 最后执行迁移，建立复制心跳表)，本进程不导入应用模块
+    subprocess.run([sys.executable, "-c", f"from bench.__main__ import seed_database; seed_database({args.rows}, 42)"],
+                   cwd=BACKEND_DIR, env=env, check=True, stderr=subprocess.DEVNULL)
+    with sqlite3.connect(primary_path) as connection:
+        people = connection.execute("SELECT id, tel FROM student ORDER BY pid LIMIT ?", (args.writes,)).fetchall()
+
+    import httpx
+    replicator = LaggingReplicator(primary_path, replica_path, args.lag, args.interval)
+    replicator.start()
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+                              cwd=BACKEND_DIR, env=env)
+    try:
+        with httpx.Client(base_url=base) as client:
+            wait_for(client, base + "/readyz", time.perf_counter() + args.timeout)
+            stale_without_token = stale_with_token = 0
+            token_latencies = []
+            for index, (student_id, tel) in enumerate(people):
+                name = f"复{index}"
+                response = client.put(f"/personnel/{student_id}", json={"name": name})
+                response.raise_for_status()
+                headers = {TOKEN_HEADER: response.headers[TOKEN_HEADER]}
+                stale_without_token += client.get(f"/personnel/{student_id}").json()["name"] != name
+                start = time.perf_counter()
+                item = client.get(f"/personnel/{student_id}", headers=headers).json()
+                token_latencies.append((time.perf_counter() - start) * 1000)
+                listed = client.get("/personnel/", params={"tel": tel}, headers=headers).json()["items"]
+                stale_with_token += item["name"] != name
+                stale_with_token += [row["name"] for row in listed if row["id"] == student_id] != [name]
+            # 副本追上之后，不带令牌的读请求 (可能命中记录缓存) 必须返回新值
+            time.sleep(args.lag + 10 * args.interval + 0.2)
+            stale_after_lag = sum(client.get(f"/personnel/{student_id}").json()["name"] != f"复{index}"
+                                  for index, (student_id, _) in enumerate(people))
+            routing = read_routing(client, base)
+    finally:
+        server.terminate()
+        server.wait()
+        replicator.stop()
+
+    report = {
+        "db_mode": args.db_mode,
+        "lag_seconds": args.lag,
+        "replica_wait_seconds": args.wait,
+        "writes": len(people),
+        "stale_reads_without_token": stale_without_token,
+        "stale_reads_with_token": stale_with_token,
+        "stale_reads_after_lag": stale_after_lag,
+        "token_read_p50_ms": round(statistics.median(token_latencies), 2),
+        "token_read_max_ms": round(max(token_latencies), 2),
+        "read_routing": routing,
+        "replica_snapshots_applied": replicator.applied,
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    failures = []
+    if stale_with_token:
+        failures.append(f"带一致性令牌的读请求读到旧值 {stale_with_token} 次")
+    if stale_after_lag:
+        failures.append(f"副本追上之后仍读到旧值 {stale_after_lag} 次 (旧值留在了缓存中)")
+    if not routing.get("replica"):
+        failures.append("读请求没有使用只读副本")
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
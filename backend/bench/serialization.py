@@ -0,0 +1,82 @@
+# serialization.py - 列表响应序列化的单行开销对比 (微基准)
+#
+# 用法 (在 backend 目录下执行):
+#   python -m bench.serialization                  # 默认 10000 和 100000 行
+#   python -m bench.serialization --rows 10000 --repeat 5
+#
+# before: PersonnelInDB.model_validate 逐行校验 -> PersonnelCollection 按 response_model 再校验一遍 -> JSON
+# after : 查询结果行 Row._asdict() -> fastjson.dumps (orjson)，与列表接口的服务层一致
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def make_rows(count: int):
+    """构造与 dbRead 查询结果列顺序相同的行 (有属性访问和 _asdict()，同 sqlalchemy Row)"""
+    from fastjson import PERSONNEL_FIELDS
+    PersonnelRow = namedtuple("PersonnelRow", PERSONNEL_FIELDS)
+    start = datetime(2025, 1, 1, 8, 0, 0)
+    return [
+        PersonnelRow(id=f"{2025000000000 + i}", name="欧阳修", email=f"user{i}@example.com", tel=f"13{i:09d}",
+                     hobby="编程与阅读", pid=i + 1, created_time=start + timedelta(seconds=i))
+        for i in range(count)
+    ]
+
+
+def serialize_before(rows) -> bytes:
+    """原路径：逐行 model_validate，再按 response_model 校验并序列化 (与 FastAPI 的 JSONResponse 一致)"""
+    from val import PersonnelInDB, PersonnelCollection
+    items = [PersonnelInDB.model_validate(p) for p in rows]
+    content = {"items": items, "count": len(items), "next": None}
+    validated = PersonnelCollection.model_validate(content)
+    data = validated.model_dump(mode="json")
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def serialize_after(rows) -> bytes:
+    """新路径：直接转 dict 并序列化"""
+    from fastjson import dumps
+    items = [row._asdict() for row in rows]
+    return dumps({"items": items, "count": len(items), "next": None})
+
+
+def best_of(func, rows, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(rows)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="列表响应序列化微基准")
+    parser.add_argument("--rows", type=str, default="10000,100000", help="行数列表，逗号分隔")
+    parser.add_argument("--repeat", type=int, default=3, help="每种路径重复次数，取最快一次")
+    args = parser.parse_args(argv)
+
+    import fastjson
+    print(f"JSON 编码器: {'orjson' if fastjson.orjson is not None else 'json (标准库)'}")
+    print(f"{'行数':>8} {'before 总耗时':>14} {'after 总耗时':>14} {'before 单行':>12} {'after 单行':>12} {'加速':>8}")
+    for count in (int(value) for value in args.rows.split(",")):
+        rows = make_rows(count)
+        # 两条路径的输出必须一致
+        if json.loads(serialize_before(rows[:100])) != json.loads(serialize_after(rows[:100])):
+            raise SystemExit("两条路径的序列化结果不一致")
+        before = best_of(serialize_before, rows, args.repeat)
+        after = best_of(serialize_after, rows, args.repeat)
+        print(f"{count:>8} {before * 1000:>12.1f}ms {after * 1000:>12.1f}ms "
+              f"{before / count * 1e6:>10.2f}us {after / count * 1e6:>10.2f}us {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
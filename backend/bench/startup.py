@@ -0,0 +1,118 @@
+# startup.py - 冷启动测量：从启动 uvicorn 进程到存活、就绪和第一个请求的耗时
+#
+# 用法 (在 backend 目录下执行，需要安装 uvicorn):
+#   python -m bench.startup                      # 默认 20000 行、同步模式
+#   python -m bench.startup --db-mode async --rows 100000
+#
+# 在临时 SQLite 数据库中预置数据 (与部署时一样执行迁移，统计聚合表已有计数) 后启动 `python -m uvicorn main:app` 子进程：
+# - listen: 到 GET /healthz 返回 200 (开始监听)
+# - ready : 到 GET /readyz 返回 200 (预热完成)
+# - 就绪后各接口的第一个请求与之后请求的延迟中位数对比
+# 就绪耗时超过 --budget 秒、就绪后第一个请求超过 --first-max-ms 毫秒，
+# 或 /personnel/stats 的总数与预置行数不一致 (计时的不是实际部署的状态) 时退出码为 1。
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 就绪后依次请求的接口 (学号在预置数据范围内)
+PATHS = ("/personnel/?limit=50", "/personnel/?limit=50&mode=ascend", "/personnel/2000000000100", "/personnel/stats")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(client, url: str, deadline: float) -> float:
+    """轮询直到 url 返回 200，返回到达时刻 (perf_counter)；超过 deadline 时抛出 TimeoutError"""
+    import httpx
+    while time.perf_counter() < deadline:
+        try:
+            if client.get(url, timeout=1).status_code == 200:
+                return time.perf_counter()
+        except httpx.TransportError:
+            pass
+        time.sleep(0.005)
+    raise TimeoutError(f"{url} 在超时前没有返回 200")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="冷启动到就绪与第一个请求的耗时")
+    parser.add_argument("--rows", type=int, default=20000, help="预置的记录数 (默认 20000)")
+    parser.add_argument("--db-mode", choices=["sync", "async"], default="sync", help="数据库访问模式")
+    parser.add_argument("--repeat", type=int, default=20, help="就绪后每个接口请求的次数 (默认 20)")
+    parser.add_argument("--budget", type=float, default=10.0, help="就绪耗时预算，秒 (默认 10)")
+    parser.add_argument("--first-max-ms", type=float, default=100.0, help="就绪后第一个请求的延迟上限 (默认 100 ms)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="等待就绪的最长时间，秒 (默认 60)")
+    args = parser.parse_args(argv)
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="personnel-startup-"), "startup.db")
+    env = dict(os.environ, PERSONNEL_DATABASE_URL=f"sqlite:///{db_path}", PERSONNEL_DB_MODE=args.db_mode,
+               PERSONNEL_STARTUP_BUDGET_SECONDS=str(args.budget))
+    env.setdefault("PERSONNEL_SETTINGS_FILE", "")
+    # 预置数据在子进程中完成，本进程不导入应用模块
+    subprocess.run([sys.executable, "-c", f"from bench.__main__ import seed_database; seed_database({args.rows}, 42)"],
+                   cwd=BACKEND_DIR, env=env, check=True)
+
+    import httpx
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+                              cwd=BACKEND_DIR, env=env)
+    try:
+        with httpx.Client() as client:
+            deadline = started + args.timeout
+            listening = wait_for(client, base + "/healthz", deadline)
+            ready = wait_for(client, base + "/readyz", deadline)
+            readyz = client.get(base + "/readyz").json()
+            requests = {}
+            for path in PATHS:
+                latencies = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    response = client.get(base + path)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    response.raise_for_status()
+                requests[path] = {"first_ms": round(latencies[0], 2),
+                                  "p50_ms": round(statistics.median(latencies[1:] or latencies), 2)}
+            # 计时之后再检查统计，不预热被测接口
+            stats_total = client.get(base + "/personnel/stats").json()["total"]
+    finally:
+        server.terminate()
+        server.wait()
+
+    report = {
+        "rows": args.rows,
+        "db_mode": args.db_mode,
+        "listen_seconds": round(listening - started, 3),
+        "ready_seconds": round(ready - started, 3),
+        "stats_total": stats_total,
+        "server_phases": {name: round(seconds, 3) for name, seconds in readyz["phases"].items()},
+        "requests": requests,
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    failures = []
+    if stats_total != args.rows:
+        failures.append(f"统计总数 {stats_total} 与预置行数 {args.rows} 不一致 (统计聚合表没有初始化)")
+    if report["ready_seconds"] > args.budget:
+        failures.append(f"就绪耗时 {report['ready_seconds']} s 超过预算 {args.budget} s")
+    failures += [f"{path} 第一个请求 {result['first_ms']} ms 超过 {args.first_max_ms} ms"
+                 for path, result in requests.items() if result["first_ms"] > args.first_max_ms]
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+# validation.py - 批量校验 (val_bulk) 与 PersonnelCreate 的一致性检查和速度对比
+#
+# 用法 (在 backend 目录下执行):
+#   python -m bench.validation                       # 一致性检查 + 默认 10000 和 100000 行
+#   python -m bench.validation --rows 50000 --invalid 0.1 --repeat 5
+#
+# 一致性: 随机生成含各类非法值的数据，逐条比较 PersonnelCreate.model_validate 与
+#         validate_personnel_batch 的结果 (通过的记录 model_dump() 相同，失败的 errors() 相同)，
+#         不一致时以非零状态退出。
+# before: 逐条 PersonnelCreate.model_validate，捕获 ValidationError
+# after : validate_personnel_batch 整批按列校验
+
+import argparse
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# 各字段的非法/边界取值 (包括首尾空白、全角数字、超长、非字符串)
+BAD_VALUES = {
+    "id": ["", "   ", "202500000000", "20250000000012", "2025O00000001", " 2025000000001 ", "２０２５０００００００００１",
+           "2025000000001\n", None, 2025000000001, ["2025000000001"]],
+    "name": ["", " ", "欧阳修欧阳修欧阳修", "  欧阳修  ", "a" * 8, "a" * 9, None, 1, {"x": 1}],
+    "email": ["", "  ", "testexample.com", "a@b", "a@b.c", " user@example.com ", "x" * 250 + "@ex.com",
+              "x" * 300 + "@example.com", None, 3.5],
+    "tel": ["", "23800138000", "1380013800", "138001380000", " 13800138000 ", "13800138000\n", None, 13800138000],
+    "hobby": ["", "   ", "编" * 32, "编" * 33, " 编程 ", None, True, ["阅读"]],
+}
+
+
+def make_record(i: int) -> dict:
+    return {"id": f"{2025000000000 + i}", "name": "欧阳修", "email": f"user{i}@example.com",
+            "tel": f"13{i % 10 ** 9:09d}", "hobby": "编程与阅读"}
+
+
+def make_items(count: int, invalid_ratio: float, seed: int = 0) -> list:
+    """构造原始数据，其中约 invalid_ratio 的行含有非法值、缺失字段、多余字段或不是 dict"""
+    rng = random.Random(seed)
+    items = []
+    for i in range(count):
+        item = make_record(i)
+        if rng.random() < invalid_ratio:
+            kind = rng.random()
+            if kind < 0.05:
+                item = rng.choice([None, "row", 1, [item]])
+            else:
+                for field in rng.sample(list(BAD_VALUES), rng.randint(1, 3)):
+                    if rng.random() < 0.15:
+                        item.pop(field)
+                    else:
+                        item[field] = rng.choice(BAD_VALUES[field])
+                if rng.random() < 0.1:
+                    item["extra"] = "ignored"
+        items.append(item)
+    return items
+
+
+def validate_before(items):
+    from pydantic import ValidationError
+    from val import PersonnelCreate
+    records, errors = [], {}
+    for index, item in enumerate(items):
+        try:
+            records.append(PersonnelCreate.model_validate(item).model_dump())
+        except ValidationError as e:
+            records.append(None)
+            errors[index] = e.errors(include_url=False, include_context=False)
+    return records, errors
+
+
+def validate_after(items):
+    from val_bulk import validate_personnel_batch
+    return validate_personnel_batch(items)
+
+
+def check_conformance(items) -> int:
+    """逐条比较两种校验的结果，返回不一致的行数"""
+    before_records, before_errors = validate_before(items)
+    after_records, after_errors = validate_after(items)
+    mismatches = 0
+    for index in range(len(items)):
+        if before_records[index] != after_records[index] or before_errors.get(index) != after_errors.get(index):
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"不一致: 第 {index} 行 {items[index]!r}")
+                print(f"  pydantic: {before_records[index] or before_errors.get(index)}")
+                print(f"  val_bulk: {after_records[index] or after_errors.get(index)}")
+    return mismatches
+
+
+def best_of(func, items, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(items)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量校验一致性检查与微基准")
+    parser.add_argument("--rows", type=str, default="10000,100000", help="行数列表，逗号分隔")
+    parser.add_argument("--invalid", type=float, default=0.02, help="基准数据中非法行的比例")
+    parser.add_argument("--repeat", type=int, default=3, help="每种路径重复次数，取最快一次")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args(argv)
+
+    # 一致性检查：一半以上的行含非法值，覆盖各类错误组合
+    conformance_items = make_items(20000, invalid_ratio=0.6, seed=args.seed)
+    mismatches = check_conformance(conformance_items)
+    if mismatches:
+        raise SystemExit(f"一致性检查失败：{mismatches} 行结果与 PersonnelCreate 不一致")
+    print(f"一致性检查通过：{len(conformance_items)} 行结果与 PersonnelCreate 完全一致")
+
+    print(f"{'行数':>8} {'before 总耗时':>14} {'after 总耗时':>14} {'before 单行':>12} {'after 单行':>12} {'加速':>8}")
+    for count in (int(value) for value in args.rows.split(",")):
+        items = make_items(count, args.invalid, seed=args.seed)
+        before = best_of(validate_before, items, args.repeat)
+        after = best_of(validate_after, items, args.repeat)
+        print(f"{count:>8} {before * 1000:>12.1f}ms {after * 1000:>12.1f}ms "
+              f"{before / count * 1e6:>10.2f}us {after / count * 1e6:>10.2f}us {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# cache.py - 进程内单条记录读穿缓存 (LRU + TTL + 负缓存 + 出错时返回旧值)
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+# 负缓存标记：表示该键在数据库中不存在 (用于缓存 404)
+NOT_FOUND = object()
+
+
+class RecordCache:
+    """
+    线程安全的读穿缓存。
+    - 容量有上限，超出时淘汰最久未使用的条目 (LRU)。
+    - 正常条目有效期 ttl 秒，负缓存 (NOT_FOUND) 有效期 negative_ttl 秒。
+    - 过期条目在被淘汰前仍保留，stale_if_error 开启时可在数据库不可用时返回。
+    - 写入缓存前会检查代数：查询期间发生过失效操作则丢弃本次结果，避免把旧值写回缓存。
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 60.0, negative_ttl: float = 5.0,
+                 stale_if_error: bool = False):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_if_error = stale_if_error
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def lookup(self, key: Hashable) -> Tuple[Optional[Any], int]:
+        """
+        查询缓存。
+        :return: (缓存值，未命中为 None，负缓存命中为 NOT_FOUND, 当前代数，供 store 使用)
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry[1]:
+                self._entries.move_to_end(key)
+                if entry[0] is NOT_FOUND:
+                    self.negative_hits += 1
+                else:
+                    self.hits += 1
+                return entry[0], self._generation
+            self.misses += 1
+            return None, self._generation
+
+    def store(self, key: Hashable, value: Any, generation: int):
+        """写入查询结果 (value 为 NOT_FOUND 表示负缓存)；generation 为 lookup 时返回的代数。"""
+        if not self.enabled:
+            return
+        ttl = self.negative_ttl if value is NOT_FOUND else self.ttl
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_stale(self, key: Hashable) -> Optional[Any]:
+        """数据库不可用时取最后一次已知的值 (忽略有效期)；未开启 stale_if_error 或没有旧值时返回 None。"""
+        if not self.stale_if_error:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] is NOT_FOUND:
+                return None
+            self.stale_hits += 1
+            return entry[0]
+
+    def invalidate(self, *keys: Hashable):
+        """删除指定键的缓存条目，并使进行中的查询结果作废。"""
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """命中/未命中等计数器"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "stale_hits": self.stale_hits,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,171 @@
+# changes.py - 进程内变更日志 (GET /personnel/changes 长轮询 / SSE 用)
+#
+# 写操作提交后由 notify_personnel_changed 追加 (序号, 学号, 是否新增) 到定长环形缓冲区，
+# 客户端持有游标 "<启动标识>.<序号>"，只取回游标之后变化的学号对应的当前记录，不必重新下载整张表。
+# - 日志只记学号，读取时按学号查询当前记录：存在的为新增/修改，不存在的为删除；
+#   同一学号多次变化只返回一次最终状态，重复投递是幂等的。
+# - 缓冲区只保留最近 capacity 条；游标早于保留范围、来自进程重启前或无法解析时返回 resync，
+#   客户端应重新加载列表并使用新游标。
+# - 等待新变更只在事件循环中进行 (asyncio.Event)，不占用线程池；同步模式下写操作在线程池中提交，
+#   通过 call_soon_threadsafe 唤醒等待者。
+# - 多 worker 模式下各 worker 的日志是共享变更环的副本：启动标识和序号与变更环一致，游标可以发给任意 worker。
+
+import asyncio
+import itertools
+import secrets
+import threading
+from collections import deque
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from fastjson import dumps
+
+# 一次响应最多包含的学号数，超过时 more 为真，客户端用新游标继续读取
+MAX_CHANGES_PER_RESPONSE = 1000
+# 长轮询最长等待时间 (秒)
+MAX_CHANGES_WAIT = 60
+# SSE 无变更时发送心跳注释的间隔 (秒)，防止代理断开空闲连接
+SSE_HEARTBEAT_SECONDS = 15
+
+
+class ChangeLog:
+    """线程安全的定长变更日志，序号连续递增"""
+
+    def __init__(self, capacity: int = 10000, boot_id: Optional[str] = None, start_seq: int = 0):
+        self._lock = threading.Lock()
+        self._boot_id = boot_id or secrets.token_hex(4)
+        self._entries = deque(maxlen=max(1, capacity))  # (序号, 学号, 是否新增)
+        self._seq = start_seq
+        self._waiters = set()  # (事件循环, asyncio.Event)
+
+    def cursor(self, seq: Optional[int] = None) -> str:
+        return f"{self._boot_id}.{self._seq if seq is None else seq}"
+
+    def parse_cursor(self, cursor: Optional[str]) -> Optional[int]:
+        """游标对应的序号；不是本进程签发的游标返回 None。"""
+        boot_id, _, seq = (cursor or "").partition(".")
+        if boot_id != self._boot_id or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def append(self, student_ids: Iterable[str], inserted: Iterable[str] = ()):
+        """写操作提交后调用：登记变化的学号，inserted 为其中新出现的学号。"""
+        inserted = set(inserted)
+        self.extend((student_id, student_id in inserted) for student_id in student_ids)
+
+    def extend(self, entries: Iterable[Tuple[str, bool]]):
+        """按顺序登记 (学号, 是否新增)，并唤醒等待者。"""
+        with self._lock:
+            for student_id, is_insert in entries:
+                self._seq += 1
+                self._entries.append((self._seq, student_id, is_insert))
+            waiters = list(self._waiters)
+        self._wake(waiters)
+
+    def reset(self, seq: int):
+        """丢弃全部记录并跳到序号 seq (多 worker 模式下丢失了共享变更环中的项)，之前的游标都需要重新同步。"""
+        with self._lock:
+            self._entries.clear()
+            self._seq = seq
+            waiters = list(self._waiters)
+        self._wake(waiters)
+
+    @staticmethod
+    def _wake(waiters):
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:  # 事件循环已关闭
+                pass
+
+    def read(self, cursor: Optional[str],
+             limit: int = MAX_CHANGES_PER_RESPONSE) -> Tuple[Dict[str, bool], str, bool, bool]:
+        """
+        读取游标之后的变更。
+        :return: ({学号: 是否在本段内新增}, 新游标, 是否需要重新同步, 是否还有更多)
+        - cursor 为空时不返回变更，只返回当前游标 (客户端先取游标再加载列表)。
+        """
+        seq = self.parse_cursor(cursor)
+        with self._lock:
+            if cursor is None:
+                return {}, self.cursor(), False, False
+            oldest = self._entries[0][0] if self._entries else self._seq + 1
+            if seq is None or seq > self._seq or seq < oldest - 1:
+                return {}, self.cursor(), True, False
+            changed: Dict[str, bool] = {}
+            last = seq
+            # 序号连续，游标之后的第一条位于 seq - oldest + 1
+            for entry_seq, student_id, is_insert in itertools.islice(self._entries, seq - oldest + 1, None):
+                if student_id not in changed and len(changed) >= limit:
+                    return changed, self.cursor(last), False, True
+                # 以本段内第一次出现时是否为新增为准 (先新增后修改仍是新增)
+                changed.setdefault(student_id, is_insert)
+                last = entry_seq
+            return changed, self.cursor(last), False, False
+
+    async def wait(self, cursor: Optional[str], timeout: float) -> bool:
+        """
+        等待游标之后出现新变更，最多 timeout 秒；已有变更或游标无效时立即返回。
+        :return: 是否有可读取的内容 (超时返回 False)
+        """
+        seq = self.parse_cursor(cursor)
+        event = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), event)
+        with self._lock:
+            if seq is None or seq != self._seq:
+                return True
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+
+def build_changes_result(changed: Dict[str, bool], rows, cursor: str, resync: bool, more: bool) -> dict:
+    """
+    由 ChangeLog.read 的结果和按学号查询到的当前记录 (Row) 构造响应 (同步/异步服务层共用)。
+    本段内新增后又删除的学号客户端从未见过，不出现在结果中。
+    """
+    found = {row.id: row._asdict() for row in rows}
+    inserted, updated, deleted = [], [], []
+    for student_id, is_insert in changed.items():
+        record = found.get(student_id)
+        if record is None:
+            if not is_insert:
+                deleted.append(student_id)
+        elif is_insert:
+            inserted.append(record)
+        else:
+            updated.append(record)
+    return {"cursor": cursor, "resync": resync, "more": more,
+            "inserted": inserted, "updated": updated, "deleted": deleted}
+
+
+def sse_event(event: str, result: dict) -> bytes:
+    """一条 SSE 事件；id 为游标，浏览器重连时通过 Last-Event-ID 带回。"""
+    return b"id: %s\nevent: %s\ndata: %s\n\n" % (result["cursor"].encode(), event.encode(), dumps(result))
+
+
+async def stream_changes(change_log: ChangeLog, since: Optional[str],
+                         read: Callable[[Optional[str]], Awaitable[dict]]):
+    """
+    SSE 事件流 (同步/异步路由共用)，read 为读取变更的服务函数 (异步调用)。
+    - 未指定游标时先发送 ready 事件 (只含当前游标)。
+    - 有变更时发送 changes 事件；游标失效时发送 resync 事件，之后从新游标继续。
+    - 无变更时每 SSE_HEARTBEAT_SECONDS 秒发送一次心跳注释。
+    """
+    result = await read(since)
+    if since is None:
+        yield sse_event("ready", result)
+    while True:
+        if result["resync"]:
+            yield sse_event("resync", result)
+        elif result["inserted"] or result["updated"] or result["deleted"]:
+            yield sse_event("changes", result)
+        cursor = result["cursor"]
+        while not result["more"] and not await change_log.wait(cursor, SSE_HEARTBEAT_SECONDS):
+            yield b": ping\n\n"
+        result = await read(cursor)
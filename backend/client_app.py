@@ -1,10 +1,23 @@
 import argparse
+import csv
+import json
+import os
+import random
+import re
 import requests 
+import urllib3
 import sys
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from prettytable import PrettyTable
 
+from digest import build_digest_tree, summarize_tree
+
 # --- 配置 ---
 BASE_URL = "http://127.0.0.1:8000"
+# 批量接口单次请求的操作数上限 (与服务端 val.MAX_BATCH_SIZE 一致)
+MAX_BATCH_SIZE = 5000
 
 # --- 辅助函数 ---
 
@@ -119,47 +132,582 @@ def api_update(student_id: str, data: dict):
     except requests.exceptions.RequestException as e:
         print_failure(f"网络请求失败: 无法连接到服务器 {BASE_URL}. 错误: {e}")
 
-def api_list(mode: str):
-    """列出所有条目 (GET /personnel/?mode={mode})"""
-    url = get_full_url(f"/personnel/?mode={mode}")
-    try:
-        response = requests.get(url, timeout=10.0)
-        
-        if response.status_code == 200:
-            data = response.json()
-            items = data.get('items', [])
-            
-            print(f"\n--- 人员列表 (排序: {mode.upper()}) ---")
-            if not items:
-                print("系统中没有记录。")
-                return
-            
-            table = PrettyTable()
-            table.field_names = ["序号", "学号 (ID)", "姓名", "电话", "邮箱", "兴趣爱好", "创建时间"]
-            
-            for index, p in enumerate(items, 1):
-                time_str = p.get('created_time', 'N/A')
-                if time_str != 'N/A':
-                    time_str = time_str[:19].replace('T', ' ')
-                    
-                table.add_row([
-                    index,
-                    p.get('id', 'N/A'),
-                    p.get('name', 'N/A'),
-                    p.get('tel', 'N/A'),
-                    p.get('email', 'N/A'),
-                    p.get('hobby', 'N/A'),
-                    time_str
-                ])
-            
-            print(table)
-            print(f"{len(items)} rows in set.")
 
+# --- 列表输出 (--list) ---
+# 列表输出的列：(接口字段, 表格列名)
+LIST_COLUMNS = (("id", "学号 (ID)"), ("name", "姓名"), ("tel", "电话"), ("email", "邮箱"),
+                ("hobby", "兴趣爱好"), ("created_time", "创建时间"))
+LIST_PAGE_SIZE = 200
+
+
+def iter_list_pages(session: requests.Session, mode: str, page_size: int = LIST_PAGE_SIZE):
+    """沿 next 游标逐页获取列表 (只请求输出需要的列)，每次产出一页的记录"""
+    url = get_full_url("/personnel/")
+    params = {"mode": mode, "limit": page_size, "fields": ",".join(field for field, _ in LIST_COLUMNS)}
+    while True:
+        response = session.get(url, params=params, timeout=10.0)
+        if response.status_code != 200:
+            raise RuntimeError(f"获取列表失败: {get_error_message(response)}")
+        data = response.json()
+        yield data.get('items', [])
+        if not data.get('next'):
+            return
+        params["cursor"] = data['next']
+
+
+def text_width(text: str) -> int:
+    """终端显示宽度 (中文等全角字符占两列)"""
+    return sum(2 if unicodedata.east_asian_width(ch) in "WF" else 1 for ch in text)
+
+
+def write_table_pages(pages, mode: str, out) -> int:
+    """
+    逐页输出表格：第一页带表头，之后每页只输出数据行。
+    列宽取已输出各页的最大值，每页只保留一页数据在内存中。
+    """
+    table = PrettyTable()
+    table.field_names = ["序号"] + [title for _, title in LIST_COLUMNS]
+    widths = {name: text_width(name) for name in table.field_names}
+    index = 0
+    bottom = ""
+    for page_no, page in enumerate(pages):
+        if page_no == 0:
+            print(f"\n--- 人员列表 (排序: {mode.upper()}) ---", file=out)
+            if not page:
+                print("系统中没有记录。", file=out)
+                return 0
+        table.clear_rows()
+        for p in page:
+            index += 1
+            time_str = p.get('created_time') or 'N/A'
+            if time_str != 'N/A':
+                time_str = time_str[:19].replace('T', ' ')
+            table.add_row([index] + [p.get(field) or 'N/A' for field, _ in LIST_COLUMNS[:-1]] + [time_str])
+        for name, values in zip(table.field_names, zip(*table.rows)):
+            widths[name] = max([widths.get(name, 0)] + [text_width(str(value)) for value in values])
+        table.min_width = widths
+        lines = table.get_string(header=page_no == 0).split("\n")
+        # 各页拼成一张表：后续页去掉上边框，下边框只在最后输出一次
+        bottom = lines.pop()
+        if page_no:
+            lines = lines[1:]
+        print("\n".join(lines), file=out, flush=True)
+    print(bottom, file=out)
+    print(f"{index} rows in set.", file=out)
+    return index
+
+
+def write_csv_pages(pages, out) -> int:
+    writer = csv.writer(out)
+    writer.writerow([field for field, _ in LIST_COLUMNS])
+    count = 0
+    for page in pages:
+        writer.writerows([p.get(field) for field, _ in LIST_COLUMNS] for p in page)
+        out.flush()
+        count += len(page)
+    return count
+
+
+def write_jsonl_pages(pages, out) -> int:
+    count = 0
+    for page in pages:
+        out.write("".join(json.dumps(p, ensure_ascii=False) + "\n" for p in page))
+        out.flush()
+        count += len(page)
+    return count
+
+
+def api_list(mode: str, fmt: str = "table", page_size: int = LIST_PAGE_SIZE):
+    """
+    列出所有条目 (GET /personnel/?mode={mode})。
+    逐页获取、逐页输出，内存中只保留一页，第一页到达后立即显示。
+    fmt: table (表格) / csv / jsonl (便于管道交给其他工具处理)
+    """
+    session = create_session(1)
+    pages = iter_list_pages(session, mode, page_size)
+    try:
+        if fmt == "csv":
+            write_csv_pages(pages, sys.stdout)
+        elif fmt == "jsonl":
+            write_jsonl_pages(pages, sys.stdout)
         else:
-            print_failure(f"获取列表失败: {get_error_message(response)}")
-            
+            write_table_pages(pages, mode, sys.stdout)
+    except RuntimeError as e:
+        print_failure(str(e))
     except requests.exceptions.RequestException as e:
         print_failure(f"网络请求失败: 无法连接到服务器 {BASE_URL}. 错误: {e}")
+    except BrokenPipeError:
+        # 输出被管道另一端提前关闭 (如 | head)，停止获取后续页；重定向到 devnull 避免退出时再次报错
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    finally:
+        session.close()
+
+
+# --- 批量导入 (--import FILE) ---
+# 文件按行/按元素流式读取，每 batch_size 条记录组成一次 POST /personnel/batch 请求，
+# 由多个线程通过同一个保持连接的 requests.Session 并发发送，内存占用与文件大小无关。
+
+IMPORT_FIELDS = ("id", "name", "email", "tel", "hobby")
+# 可重试的状态码：批量请求不是幂等的，只重试服务端明确没有处理请求的限流 (429) 和暂时不可用 (503)；
+# 500/502/504 以及读取响应超时时批次可能已经提交，重放会把已导入的记录报告为 409/404
+RETRY_STATUS = {429, 503}
+_JSON_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def create_session(pool_size: int) -> requests.Session:
+    """创建保持连接的会话，连接池大小与并发线程数一致"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def detect_import_format(path: str) -> str:
+    """根据扩展名判断文件格式：.csv / .jsonl (.ndjson) / 其他按 JSON 处理"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    return "json"
+
+
+def iter_json_records(f, chunk_size: int = 1 << 16):
+    """
+    流式解析 JSON 数组 [{...}, {...}]，逐个产出 (序号, 元素)，不把整个文件读入内存。
+    顶层是单个对象时 (如 data/create.json) 视为只有一条记录。
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+
+    def skip_whitespace():
+        nonlocal buffer, pos, eof
+        while True:
+            pos = _JSON_WHITESPACE.match(buffer, pos).end()
+            if pos < len(buffer) or eof:
+                return
+            more = f.read(chunk_size)
+            eof = not more
+            buffer, pos = buffer[pos:] + more, 0
+
+    skip_whitespace()
+    if buffer[pos:pos + 1] == "{":
+        yield 1, json.loads(buffer[pos:] + f.read())
+        return
+    if buffer[pos:pos + 1] != "[":
+        raise ValueError("文件内容不是 JSON 数组或对象")
+    pos += 1
+    row = 0
+    expect_comma = False
+    while True:
+        skip_whitespace()
+        if pos == len(buffer):
+            raise ValueError(f"JSON 数组不完整 (已读取 {row} 个元素)")
+        if buffer[pos] == "]" and (expect_comma or not row):
+            return
+        if expect_comma:
+            if buffer[pos] != ",":
+                raise ValueError(f"第 {row} 个元素之后缺少逗号")
+            pos += 1
+            expect_comma = False
+            continue
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+            # 元素恰好在缓冲区末尾结束时可能被截断 (如数字)，读入更多再解析
+            complete = end < len(buffer) or eof
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+        if not complete:
+            more = f.read(chunk_size)
+            eof = not more
+            buffer, pos = buffer[pos:] + more, 0
+            continue
+        row += 1
+        yield row, value
+        pos = end
+        expect_comma = True
+
+
+def iter_jsonl_records(f):
+    """逐行解析 JSONL，产出 (行号, 记录)；无法解析的行产出 (行号, ValueError)"""
+    for line_no, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, ValueError(f"不是合法的 JSON: {e.msg}")
+
+
+def iter_csv_records(f):
+    """逐行读取 CSV (首行为表头，列名与 create.json 的字段相同)，产出 (行号, 记录)"""
+    reader = csv.DictReader(f)
+    missing = [field for field in IMPORT_FIELDS if field not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"CSV 表头缺少列: {', '.join(missing)}")
+    for row in reader:
+        yield reader.line_num, {field: row[field] for field in IMPORT_FIELDS}
+
+
+def iter_import_records(path: str, fmt: str, encoding: str):
+    """打开文件并按格式产出 (位置, 记录)"""
+    readers = {"json": iter_json_records, "jsonl": iter_jsonl_records, "csv": iter_csv_records}
+    with open(path, "r", encoding=encoding, newline="" if fmt == "csv" else None) as f:
+        yield from readers[fmt](f)
+
+
+def iter_chunks(records, size: int):
+    chunk = []
+    for item in records:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def format_batch_detail(detail) -> str:
+    """把批量接口逐条结果中的 detail (字符串或校验错误列表) 转为一行文字"""
+    if isinstance(detail, list):
+        parts = []
+        for err in detail:
+            if not isinstance(err, dict):
+                parts.append(str(err))
+                continue
+            msg = err.get('msg', '未知验证错误').replace('Value error, ', '')
+            loc = err.get('loc') or []
+            parts.append(f"[{loc[-1]}] {msg}" if loc else msg)
+        return "; ".join(parts)
+    return str(detail)
+
+
+def retry_delay(attempt: int, response=None) -> float:
+    """第 attempt 次重试前的等待秒数：优先使用 Retry-After，否则指数退避 (0.5s 起，最多 10s) 加随机抖动"""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return float(retry_after)
+    return min(10.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+def operation_id(operation: dict):
+    """批量操作涉及的学号 (update/delete 取 id，create 取 data.id)"""
+    return operation.get("id") or (operation.get("data") or {}).get("id")
+
+
+def request_not_sent(error: requests.exceptions.RequestException) -> bool:
+    """请求是否在发出之前失败 (建立连接失败或连接超时)，此时服务端一定没有执行，可以安全重试"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError):
+        reason = error.args[0] if error.args else None
+        # requests 把 urllib3 的 MaxRetryError 包装为 ConnectionError，建立连接失败时其 reason 为 NewConnectionError
+        return isinstance(getattr(reason, "reason", reason), urllib3.exceptions.NewConnectionError)
+    return False
+
+
+def post_batch(session: requests.Session, chunk: list, retries: int) -> list:
+    """
+    以一次批量请求执行 chunk 中的操作 [(位置, 操作)]。
+    批量请求不是幂等的，只在请求未发出 (建立连接失败) 或服务端返回 429/503 时按退避重试；
+    请求已发出后的网络错误 (例如读取超时) 和其他 5xx 不重试，批次结果未知，对应记录报告为失败并注明。
+    :return: 每个操作的 (位置, 学号, 状态码, 说明)，成功的说明为 None
+    """
+    url = get_full_url("/personnel/batch")
+    payload = {"operations": [operation for _, operation in chunk]}
+    error = None
+    for attempt in range(retries + 1):
+        if attempt:
+            time.sleep(retry_delay(attempt - 1, error if isinstance(error, requests.Response) else None))
+        try:
+            response = session.post(url, json=payload, timeout=60.0)
+        except requests.exceptions.RequestException as e:
+            error = e
+            if request_not_sent(e):
+                continue
+            break
+        if response.status_code == 200:
+            return [(position, item.get("id") or operation_id(operation), item["status"],
+                     None if item["status"] < 400 else format_batch_detail(item.get("detail")))
+                    for (position, operation), item in zip(chunk, response.json()["results"])]
+        error = response
+        if response.status_code not in RETRY_STATUS:
+            break
+    if isinstance(error, requests.Response):
+        message = get_error_message(error)
+        status = error.status_code
+        if status >= 500 and status not in RETRY_STATUS:
+            message += " (批次可能已生效，请查询确认后再重新导入)"
+    else:
+        message = f"网络请求失败: {error}"
+        status = 0
+        if not request_not_sent(error):
+            message += " (请求已发出，批次可能已生效，请查询确认后再重新导入)"
+    return [(position, operation_id(operation), status, message) for position, operation in chunk]
+
+
+class ImportProgress:
+    """导入计数与进度输出 (只在主线程中更新)"""
+
+    def __init__(self, interval: float = 0.5):
+        self.started = time.perf_counter()
+        self.succeeded = 0
+        self.failures = []   # [(位置, 学号, 状态码, 说明)]
+        self.interval = interval
+        self._last_print = 0.0
+
+    @property
+    def processed(self) -> int:
+        return self.succeeded + len(self.failures)
+
+    def rate(self) -> float:
+        elapsed = time.perf_counter() - self.started
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+    def add(self, results):
+        for result in results:
+            if result[3] is None:
+                self.succeeded += 1
+            else:
+                self.failures.append(result)
+        now = time.perf_counter()
+        if now - self._last_print >= self.interval:
+            self._last_print = now
+            print(f"\r已处理 {self.processed} 条 (成功 {self.succeeded}, 失败 {len(self.failures)})，"
+                  f"{self.rate():.0f} 条/秒", end="", file=sys.stderr, flush=True)
+
+
+def format_position(position) -> str:
+    """失败记录的位置：导入时为下标/行号，同步时为 (文件名, 行号)"""
+    if isinstance(position, tuple):
+        name, line = position
+        return f"{name}:{line}" if line else name
+    return str(position)
+
+
+def write_failure_report(path: str, failures: list):
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["位置", "学号", "状态码", "原因"])
+        for position, student_id, status, message in failures:
+            writer.writerow([format_position(position), student_id or "", status or "", message])
+
+
+def print_failures(failures: list, report: str = None, limit: int = 20):
+    """按位置排序输出失败记录 (最多 limit 条)，report 指定时写出全部"""
+    if not failures:
+        return
+    failures = sorted(failures, key=lambda item: item[0])
+    table = PrettyTable()
+    table.field_names = ["位置", "学号", "状态码", "原因"]
+    table.align["原因"] = "l"
+    for position, student_id, status, message in failures[:limit]:
+        table.add_row([format_position(position), student_id or "", status or "", message])
+    print(table)
+    if len(failures) > limit:
+        print(f"仅显示前 {limit} 条失败记录，共 {len(failures)} 条。")
+    if report:
+        write_failure_report(report, failures)
+        print(f"失败明细已写入 {report}")
+
+
+def send_operations(operations, workers: int, batch_size: int, retries: int):
+    """
+    把 [(位置, 操作)] 按 batch_size 分批，由 workers 个线程通过同一个保持连接的会话并发发送。
+    操作位置上是 ValueError 时 (本地无法解析的记录) 直接记为失败，不发送。
+    :return: (ImportProgress, 中止原因或 None)
+    """
+    progress = ImportProgress()
+    session = create_session(workers)
+    pending = set()
+    error = None
+
+    def collect(done):
+        for future in done:
+            progress.add(future.result())
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        for chunk in iter_chunks(operations, batch_size):
+            local = [(position, None, 0, str(operation))
+                     for position, operation in chunk if isinstance(operation, ValueError)]
+            if local:
+                progress.add(local)
+                chunk = [item for item in chunk if not isinstance(item[1], ValueError)]
+                if not chunk:
+                    continue
+            # 最多同时有 2 倍线程数的批次在途，读取速度受发送速度约束
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending.add(pool.submit(post_batch, session, chunk, retries))
+        done, pending = wait(pending)
+        collect(done)
+    except (OSError, ValueError, csv.Error) as e:
+        error = f"读取文件失败: {e}"
+    except KeyboardInterrupt:
+        error = "操作被中断，未发送的记录已跳过。"
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        session.close()
+    if error:
+        # 已提交的批次仍会完成，计入结果
+        collect(future for future in pending if future.done() and not future.cancelled())
+    print(file=sys.stderr)
+    return progress, error
+
+
+def print_send_summary(title: str, progress: ImportProgress, error: str = None, report: str = None):
+    elapsed = time.perf_counter() - progress.started
+    if error:
+        print_failure(error)
+    print(f"\n--- {title} ---")
+    print(f"处理 {progress.processed} 条: 成功 {progress.succeeded}, 失败 {len(progress.failures)}; "
+          f"耗时 {elapsed:.1f} 秒, {progress.rate():.0f} 条/秒")
+    print_failures(progress.failures, report)
+
+
+def iter_create_operations(records):
+    """把 (位置, 记录) 转换为 create 操作；不是对象的记录转换为 ValueError"""
+    for position, record in records:
+        if isinstance(record, dict):
+            yield position, {"op": "create", "data": record}
+        elif isinstance(record, ValueError):
+            yield position, record
+        else:
+            yield position, ValueError("记录不是 JSON 对象")
+
+
+def api_import(path: str, fmt: str = None, workers: int = 4, batch_size: int = 500, retries: int = 3,
+               encoding: str = "utf-8-sig", report: str = None):
+    """批量导入文件中的记录 (POST /personnel/batch)，输出进度、吞吐量和失败明细"""
+    fmt = fmt or detect_import_format(path)
+    operations = iter_create_operations(iter_import_records(path, fmt, encoding))
+    progress, error = send_operations(operations, workers, batch_size, retries)
+    print_send_summary(f"导入结果 ({path}, 格式: {fmt})", progress, error, report)
+
+
+# --- 增量同步 (--sync DIR) ---
+# 以 DIR 中的 JSON / JSONL / CSV 文件为准，先比较内容摘要 (digest.py)，只发送有差异的记录。
+
+SYNC_EXTENSIONS = (".json", ".jsonl", ".ndjson", ".csv")
+UPDATE_FIELDS = ("name", "email", "tel", "hobby")
+# 每次请求取回记录摘要的桶数
+DIGEST_BUCKETS_PER_REQUEST = 32
+
+
+def load_local_roster(directory: str, encoding: str):
+    """
+    读取目录中的全部数据文件 (按文件名排序)。
+    :return: ({学号: (位置, 记录)}, 无法使用的记录 [(位置, 学号, 0, 原因)])
+    """
+    roster, failures = {}, []
+    names = sorted(name for name in os.listdir(directory) if os.path.splitext(name)[1].lower() in SYNC_EXTENSIONS)
+    for name in names:
+        path = os.path.join(directory, name)
+        for line, record in iter_import_records(path, detect_import_format(path), encoding):
+            position = (name, line)
+            if isinstance(record, ValueError):
+                failures.append((position, None, 0, str(record)))
+                continue
+            student_id = record.get("id") if isinstance(record, dict) else None
+            if not isinstance(student_id, str) or not student_id.strip():
+                failures.append((position, None, 0, "记录不是 JSON 对象或缺少学号"))
+                continue
+            student_id = student_id.strip()
+            if student_id in roster:
+                failures.append((position, student_id, 0,
+                                 f"学号重复，已使用 {format_position(roster[student_id][0])} 中的记录"))
+                continue
+            roster[student_id] = (position, record)
+    return roster, failures
+
+
+def fetch_digest(session: requests.Session, buckets=None):
+    """GET /personnel/digest，返回 (响应数据, 响应体字节数)"""
+    response = session.get(get_full_url("/personnel/digest"), params={"bucket": buckets} if buckets else None,
+                           timeout=60.0)
+    if response.status_code != 200:
+        raise RuntimeError(f"获取摘要失败: {get_error_message(response)}")
+    return response.json(), len(response.content)
+
+
+def plan_sync(roster: dict, local_tree: dict, remote_records: dict, allow_delete: bool) -> list:
+    """比较不一致的桶内的记录摘要，生成 [(位置, 操作)]"""
+    operations = []
+    for bucket, remote in sorted(remote_records.items()):
+        local = local_tree.get(bucket, {})
+        for student_id, digest in sorted(local.items()):
+            position, record = roster[student_id]
+            if student_id not in remote:
+                operations.append((position, {"op": "create", "data": record}))
+            elif remote[student_id] != digest:
+                data = {field: record[field] for field in UPDATE_FIELDS if field in record}
+                operations.append((position, {"op": "update", "id": student_id, "data": data}))
+        if allow_delete:
+            for student_id in sorted(remote):
+                if student_id not in local:
+                    operations.append((("服务端", 0), {"op": "delete", "id": student_id}))
+    return operations
+
+
+def api_sync(directory: str, workers: int = 4, batch_size: int = 500, retries: int = 3,
+             encoding: str = "utf-8-sig", allow_delete: bool = True, dry_run: bool = False, report: str = None):
+    """以本地目录为准增量同步到服务端：只取回不一致的桶的摘要，只发送新增 / 修改 / 删除的记录"""
+    try:
+        roster, local_failures = load_local_roster(directory, encoding)
+    except (OSError, ValueError, csv.Error) as e:
+        print_failure(f"读取本地数据失败，未做任何修改: {e}")
+        return
+    if local_failures and allow_delete:
+        # 无法识别的记录可能对应服务端已有的学号，为避免误删，本次不删除
+        allow_delete = False
+        print_failure(f"本地有 {len(local_failures)} 条记录无法使用，本次同步不删除服务端记录。")
+    local_tree = build_digest_tree(record for _, record in roster.values())
+    local_root, local_buckets = summarize_tree(local_tree)
+
+    session = create_session(1)
+    try:
+        summary, transferred = fetch_digest(session)
+        if summary["root"] == local_root:
+            print_success(f"本地 {len(roster)} 条记录与服务端一致，无需同步 (摘要数据 {transferred / 1024:.1f} KB)。")
+            print_failures(local_failures, report)
+            return
+        remote_buckets = summary["digests"]
+        changed = sorted(bucket for bucket in set(local_buckets) | set(remote_buckets)
+                         if local_buckets.get(bucket) != remote_buckets.get(bucket))
+        remote_records = {}
+        for start in range(0, len(changed), DIGEST_BUCKETS_PER_REQUEST):
+            data, size = fetch_digest(session, changed[start:start + DIGEST_BUCKETS_PER_REQUEST])
+            remote_records.update(data["records"])
+            transferred += size
+    except (requests.exceptions.RequestException, RuntimeError) as e:
+        print_failure(str(e) if isinstance(e, RuntimeError) else f"网络请求失败: 无法连接到服务器 {BASE_URL}. 错误: {e}")
+        return
+    finally:
+        session.close()
+
+    operations = plan_sync(roster, local_tree, remote_records, allow_delete)
+    counts = {op: sum(1 for _, operation in operations if operation["op"] == op) for op in ("create", "update", "delete")}
+    print(f"\n本地 {len(roster)} 条，服务端 {summary['count']} 条；不一致的桶 {len(changed)}/{summary['buckets']}，"
+          f"摘要数据 {transferred / 1024:.1f} KB")
+    print(f"需要新增 {counts['create']} 条，修改 {counts['update']} 条，删除 {counts['delete']} 条。")
+    if dry_run:
+        table = PrettyTable()
+        table.field_names = ["位置", "操作", "学号"]
+        for position, operation in operations[:20]:
+            table.add_row([format_position(position), operation["op"], operation_id(operation)])
+        if operations:
+            print(table)
+        print_failures(local_failures, report)
+        return
+    progress, error = send_operations(operations, workers, batch_size, retries)
+    progress.failures.extend(local_failures)
+    print_send_summary(f"同步结果 ({directory})", progress, error, report)
 
 
 # --- 参数解析和主执行逻辑 (保持不变) ---
@@ -179,8 +727,17 @@ App --delete=2020123456789
 # 按照时间升序方式输出全部记录
 App -l ascend
 
+# 以 CSV / JSONL 格式逐页输出全部记录，便于重定向或交给其他工具
+App -l descend --format csv > people.csv
+
 # 对某条目修改手机号和兴趣爱好
 App -u 2020123456789 --mobile="15922223333" -b "健身"
+
+# 批量导入 (JSON 数组 / JSONL / CSV)，8 个线程并发，每批 500 条，失败明细写入 failed.csv
+App --import people.jsonl --workers 8 --batch-size 500 --report failed.csv
+
+# 以 roster 目录中的数据文件为准增量同步 (只发送有差异的记录)；--dry-run 只列出将执行的操作
+App --sync roster --dry-run
 """
 
     parser = argparse.ArgumentParser(
@@ -197,6 +754,10 @@ App -u 2020123456789 --mobile="15922223333" -b "健身"
     group.add_argument('-l', '--list', type=str, nargs='?', const='descend', 
                         choices=['descend', 'ascend'], metavar='MODE',
                         help='输出所有条目列表。MODE: ascend (升序) 或 descend (降序，默认)')
+    group.add_argument('--import', dest='import_file', type=str, metavar='FILE',
+                        help='从文件批量导入条目 (JSON 数组、JSONL 或带表头的 CSV，字段同 data/create.json)')
+    group.add_argument('--sync', type=str, metavar='DIR',
+                        help='以目录中的数据文件为准增量同步：比较内容摘要，只新增/修改/删除有差异的条目')
 
     parser.add_argument('-n', '--name', type=str, help='姓名')
     parser.add_argument('-i', '--id', type=str, help='学号')
@@ -204,11 +765,27 @@ App -u 2020123456789 --mobile="15922223333" -b "健身"
     parser.add_argument('-e', '--email', type=str, help='邮箱') 
     parser.add_argument('-b', '--hobby', type=str, help='兴趣爱好')
 
+    list_group = parser.add_argument_group('列表输出选项 (配合 -l 使用)')
+    list_group.add_argument('--format', choices=['table', 'csv', 'jsonl'], default='table',
+                            help='输出格式：table (表格，默认) / csv / jsonl，后两者便于通过管道交给其他工具')
+    list_group.add_argument('--page-size', type=int, default=LIST_PAGE_SIZE,
+                            help=f'每次请求的条数 (1-500，默认 {LIST_PAGE_SIZE})')
+
+    import_group = parser.add_argument_group('批量导入与同步选项 (配合 --import / --sync 使用)')
+    import_group.add_argument('--input-format', choices=['json', 'jsonl', 'csv'], help='导入文件的格式 (默认按扩展名判断)')
+    import_group.add_argument('--workers', type=int, default=4, help='并发发送的线程数 (默认 4)')
+    import_group.add_argument('--batch-size', type=int, default=500, help=f'每个批量请求的记录数 (1-{MAX_BATCH_SIZE}，默认 500)')
+    import_group.add_argument('--retries', type=int, default=3, help='连接失败或 429/503 时的重试次数 (默认 3)')
+    import_group.add_argument('--encoding', type=str, default='utf-8-sig', help='文件编码 (默认 utf-8，兼容 BOM)')
+    import_group.add_argument('--report', type=str, metavar='FILE', help='把全部失败记录写入 CSV 文件')
+    import_group.add_argument('--no-delete', action='store_true', help='同步时不删除服务端多出的条目')
+    import_group.add_argument('--dry-run', action='store_true', help='同步时只列出将执行的操作，不修改服务端')
+
     args = parser.parse_args()
     
     # ------------------ 命令行逻辑判断 ------------------
     
-    main_actions = [args.add, args.delete, args.update, args.list is not None]
+    main_actions = [args.add, args.delete, args.update, args.list is not None, args.import_file, args.sync]
     
     if not any(main_actions):
         args.list = 'descend'
@@ -249,7 +826,28 @@ App -u 2020123456789 --mobile="15922223333" -b "健身"
         return
 
     if args.list:
-        api_list(args.list) # 直接调用同步函数
+        if not 1 <= args.page_size <= 500:
+            print_failure("--page-size 必须在 1 到 500 之间。")
+            sys.exit(1)
+        api_list(args.list, fmt=args.format, page_size=args.page_size) # 直接调用同步函数
+        return
+
+    if args.import_file or args.sync:
+        if not 1 <= args.batch_size <= MAX_BATCH_SIZE or args.workers < 1 or args.retries < 0:
+            print_failure(f"--batch-size 必须在 1 到 {MAX_BATCH_SIZE} 之间，--workers 至少为 1，--retries 不能为负数。")
+            sys.exit(1)
+
+    if args.import_file:
+        api_import(args.import_file, fmt=args.input_format, workers=args.workers, batch_size=args.batch_size,
+                   retries=args.retries, encoding=args.encoding, report=args.report)
+        return
+
+    if args.sync:
+        if not os.path.isdir(args.sync):
+            print_failure(f"同步目录 {args.sync} 不存在。")
+            sys.exit(1)
+        api_sync(args.sync, workers=args.workers, batch_size=args.batch_size, retries=args.retries,
+                 encoding=args.encoding, allow_delete=not args.no_delete, dry_run=args.dry_run, report=args.report)
         return
 
 if __name__ == "__main__":
@@ -0,0 +1,99 @@
+# coalesce.py - 相同读请求的合并 (singleflight)
+#
+# 同一时刻到达的相同读请求 (同一接口、同样的查询参数) 只由第一个请求 (leader) 查询数据库并序列化，
+# 其余请求 (follower) 等待并直接使用同一份响应体字节，例如大量浏览器同时打开页面请求列表第一页。
+# - 合并键包含表版本号 (etag.table_version)：写操作提交后版本号递增，之后到达的请求使用新键，
+#   不会加入写入前开始的查询；写入前已加入的请求与 leader 本就是并发的，使用同一结果不违反一致性。
+# - 只合并正在进行的查询，完成后立即移除，不缓存结果。
+# - 合并键还包含会话在只读副本上的位置和一致性令牌 (replica.py)：使用主库与副本、或要求不同令牌的请求不合并。
+# - leader 抛出的异常 (例如 HTTPException) 同样传给 follower。
+
+import asyncio
+import threading
+from typing import Awaitable, Callable, Dict, Hashable, Tuple
+
+from fastapi import Request
+
+from etag import table_version
+from replica import CONSISTENCY_HEADER, REPLICA_POSITION
+from metrics import COALESCED_REQUESTS
+
+
+def flight_key(request: Request, route: str) -> Tuple:
+    """合并键：接口名、当前表版本号、(排序后的) 查询参数、副本位置与一致性令牌"""
+    return (route, table_version.current(), tuple(sorted(request.query_params.multi_items())),
+            getattr(request.state, REPLICA_POSITION, None), request.headers.get(CONSISTENCY_HEADER))
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """同步路由 (线程池) 使用：follower 阻塞等待 leader 完成"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Tuple, fn: Callable[[], bytes]) -> bytes:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        COALESCED_REQUESTS.inc(1, key[0], "executed" if leader else "coalesced")
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """异步路由使用：follower 等待 leader 的 Future"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Tuple, fn: Callable[[], Awaitable[bytes]]) -> bytes:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = asyncio.get_running_loop().create_future()
+                # 没有 follower 时异常无人读取，避免事件循环输出 "exception was never retrieved"
+                future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        COALESCED_REQUESTS.inc(1, key[0], "executed" if leader else "coalesced")
+        if not leader:
+            # shield：某个 follower 被取消不影响 leader 和其他 follower
+            return await asyncio.shield(future)
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
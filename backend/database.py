@@ -1,23 +1,121 @@
 # database.py - 包含数据库连接配置和 SQLAlchemy ORM 模型定义
 
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, text
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, Index, text, event, exc
 from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool, StaticPool
+from fastapi import Request
 from datetime import datetime
-import pymysql
+import logging
+import time
 from zoneinfo import ZoneInfo 
 
+from config import settings, Settings
+from metrics import POOL_CHECKOUT_WAIT
+from replica import READ_METHODS, CONSISTENCY_HEADER, REPLICA_POSITION, open_read_session
+
+logger = logging.getLogger("personnel.db")
+
+
+# --- 连接池 ---
+class _CheckoutTimingMixin:
+    """记录每次从连接池取连接的等待时间 (计入指标)，超过 pool_wait_warn_ms 时输出 WARNING 日志"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        connection_record = super()._do_get()
+        waited = time.perf_counter() - start
+        POOL_CHECKOUT_WAIT.observe(waited)
+        waited_ms = waited * 1000
+        if waited_ms >= settings.pool_wait_warn_ms:
+            logger.warning("连接池等待 %.1f ms (已借出 %d, 溢出 %d)", waited_ms, self.checkedout(), self.overflow())
+        else:
+            logger.debug("连接池等待 %.2f ms", waited_ms)
+        return connection_record
+
+
+class TimedQueuePool(_CheckoutTimingMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(cfg: Settings, url: str, is_async: bool = False) -> dict:
+    """根据配置生成 create_engine / create_async_engine 的参数 (同步/异步引擎共用)。"""
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith(":")):
+        # 内存数据库只能共享同一个连接
+        return {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+
+    pool_class = TimedAsyncQueuePool if is_async else TimedQueuePool
+    options = {
+        "poolclass": pool_class,
+        "pool_size": cfg.pool_size,
+        "max_overflow": cfg.max_overflow,
+        "pool_timeout": cfg.pool_timeout,
+        "pool_recycle": cfg.pool_recycle,
+        "pool_pre_ping": cfg.pre_ping == "always",
+    }
+    if url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False}
+    return options
+
+
+def install_engine_events(cfg: Settings, sync_engine):
+    """为引擎注册连接事件：SQLite PRAGMA 设置、按空闲时间探活 (同步/异步引擎共用)。"""
+    if sync_engine.dialect.name == "sqlite":
+        @event.listens_for(sync_engine, "connect")
+        def _set_sqlite_pragma(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            if cfg.sqlite_wal:
+                cursor.execute("PRAGMA journal_mode=WAL")
+                cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA busy_timeout=5000")
+            cursor.close()
+            # 关闭驱动自带的隐式事务 (它只在 DML 前发出 BEGIN，SELECT 不在事务内)，由下面的 begin 事件显式开始事务
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(sync_engine, "begin")
+        def _begin_sqlite(conn):
+            # 读取-修改-写入的路径带 sqlite_immediate 选项，开始时即取得写锁，相当于其他数据库的 SELECT ... FOR UPDATE
+            conn.exec_driver_sql("BEGIN IMMEDIATE" if conn.get_execution_options().get("sqlite_immediate") else "BEGIN")
+
+    if cfg.pre_ping == "idle":
+        @event.listens_for(sync_engine, "checkin")
+        def _mark_idle(dbapi_connection, connection_record):
+            connection_record.info["checkin_at"] = time.monotonic()
+
+        @event.listens_for(sync_engine, "checkout")
+        def _ping_if_idle(dbapi_connection, connection_record, connection_proxy):
+            checkin_at = connection_record.info.get("checkin_at")
+            if checkin_at is None or time.monotonic() - checkin_at < cfg.pre_ping_idle_seconds:
+                return
+            try:
+                cursor = dbapi_connection.cursor()
+                cursor.execute("SELECT 1")
+                cursor.close()
+            except Exception:
+                # 连接池会丢弃该连接并重新建立
+                raise exc.DisconnectionError()
+
+
 # --- 数据库连接配置 ---
-MYSQL_HOST = "localhost"
-MYSQL_PORT = 3306
-MYSQL_USER = "root" 
-MYSQL_PASSWORD = "118211yao" 
-DATABASE_NAME = "xinxi" 
-DATABASE_URL = f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{DATABASE_NAME}?charset=utf8mb4"
-
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+DATABASE_URL = settings.database_url
+
+engine = create_engine(DATABASE_URL, **engine_options(settings, DATABASE_URL))
+install_engine_events(settings, engine)
 Base = declarative_base()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 只读副本 (配置 replica_database_url 时)，GET 请求使用，见 replica.py
+REPLICA_DATABASE_URL = settings.replica_database_url
+replica_engine = None
+ReplicaSessionLocal = None
+if REPLICA_DATABASE_URL:
+    replica_engine = create_engine(REPLICA_DATABASE_URL, **engine_options(settings, REPLICA_DATABASE_URL))
+    install_engine_events(settings, replica_engine)
+    ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+
 # 定义东八区时区对象
 TIMEZONE_CN = ZoneInfo("Asia/Shanghai")
 # 定义一个获取当前东八区时间的可调用函数
@@ -29,19 +127,40 @@ def get_now_asia_CN():
 class Personnel(Base):
     """人员信息表模型 - 数据库映射对象"""
     __tablename__ = 'student'
+    __table_args__ = (
+        # 列表按 (created_time, pid) 排序与键集分页，也用于创建时间窗口过滤；已有数据库通过 migrate.py 补建
+        Index("ix_student_created_time_pid", "created_time", "pid"),
+    )
 
     pid = Column(Integer, primary_key=True, index=True, autoincrement=True)
     id = Column(String(13), unique=True, nullable=False, index=True) 
     name = Column(String(32), nullable=False) 
-    email = Column(String(255), nullable=False)
-    tel = Column(String(11), nullable=False)
+    email = Column(String(255), nullable=False, index=True)  # 列表接口按邮箱精确过滤
+    tel = Column(String(11), nullable=False, index=True)  # 列表接口按手机号精确过滤
     hobby = Column(String(128),nullable=False)
     created_time = Column(DateTime, default=get_now_asia_CN, nullable=False)
+
+
+class PersonnelStat(Base):
+    """人员统计聚合表 - 每个 (维度, 分组) 一行计数，与人员写操作在同一事务中增量维护"""
+    __tablename__ = 'student_stats'
+
+    dimension = Column(String(16), primary_key=True)  # hobby / year / day / week
+    bucket = Column(String(128), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
     
 # --- 数据库会话依赖函数 ---
-def get_db():
-    """FastAPI 依赖注入函数，用于获取和关闭数据库会话"""
-    db = SessionLocal()
+def get_db(request: Request):
+    """
+    FastAPI 依赖注入函数，用于获取和关闭数据库会话。
+    配置了只读副本时 GET 请求使用副本 (按一致性令牌可能改用主库)，其余请求使用主库。
+    """
+    if ReplicaSessionLocal is not None and request.method in READ_METHODS:
+        db = open_read_session(ReplicaSessionLocal, SessionLocal, request.headers.get(CONSISTENCY_HEADER),
+                               settings.replica_wait_seconds)
+        setattr(request.state, REPLICA_POSITION, db.info.get(REPLICA_POSITION))
+    else:
+        db = SessionLocal()
     try:
         yield db
     finally:
@@ -0,0 +1,52 @@
+# database_async.py - 异步数据库连接配置 (AsyncEngine / AsyncSession)
+# ORM 模型仍定义在 database.py 中，这里只提供异步引擎和会话。
+
+from fastapi import Request
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from config import settings
+from database import DATABASE_URL, REPLICA_DATABASE_URL, engine_options, install_engine_events
+from replica import READ_METHODS, CONSISTENCY_HEADER, REPLICA_POSITION, open_read_session_async
+
+
+def to_async_url(url: str) -> str:
+    """将同步驱动的数据库 URL 转换为对应的异步驱动 URL (pymysql -> aiomysql, sqlite -> aiosqlite)。"""
+    if url.startswith("mysql+pymysql://"):
+        return "mysql+aiomysql://" + url[len("mysql+pymysql://"):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+
+# --- 异步数据库连接配置 ---
+# 可通过配置项 async_database_url 单独指定，例如本地测试: sqlite+aiosqlite:///./personnel.db
+ASYNC_DATABASE_URL = settings.async_database_url or to_async_url(DATABASE_URL)
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(settings, ASYNC_DATABASE_URL, is_async=True))
+install_engine_events(settings, async_engine.sync_engine)
+# 提交后不使对象过期，避免在响应构造时触发额外的异步加载
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# 只读副本 (配置 replica_database_url 或 async_replica_database_url 时)，GET 请求使用，见 replica.py
+ASYNC_REPLICA_DATABASE_URL = settings.async_replica_database_url or (
+    to_async_url(REPLICA_DATABASE_URL) if REPLICA_DATABASE_URL else None)
+async_replica_engine = None
+AsyncReplicaSessionLocal = None
+if ASYNC_REPLICA_DATABASE_URL:
+    async_replica_engine = create_async_engine(
+        ASYNC_REPLICA_DATABASE_URL, **engine_options(settings, ASYNC_REPLICA_DATABASE_URL, is_async=True))
+    install_engine_events(settings, async_replica_engine.sync_engine)
+    AsyncReplicaSessionLocal = async_sessionmaker(bind=async_replica_engine, autoflush=False, expire_on_commit=False)
+
+
+# --- 异步数据库会话依赖函数 ---
+async def get_async_db(request: Request):
+    """FastAPI 依赖注入函数，用于获取和关闭异步数据库会话；配置了只读副本时 GET 请求使用副本，同 database.get_db"""
+    if AsyncReplicaSessionLocal is not None and request.method in READ_METHODS:
+        db = await open_read_session_async(AsyncReplicaSessionLocal, AsyncSessionLocal,
+                                           request.headers.get(CONSISTENCY_HEADER), settings.replica_wait_seconds)
+        setattr(request.state, REPLICA_POSITION, db.info.get(REPLICA_POSITION))
+    else:
+        db = AsyncSessionLocal()
+    async with db:
+        yield db
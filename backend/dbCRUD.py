@@ -1,88 +1,164 @@
 # personnel_crud.py - 数据访问层 (CRUD)
 from sqlalchemy.orm import Session
-from sqlalchemy import select, update, delete
-from typing import List, Optional, Dict, Any
+from sqlalchemy import insert, update, delete, bindparam
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime
 # 从 database.py 导入 ORM 模型
 from val import PersonnelCreate, PersonnelUpdate 
-from database import Personnel
+from database import Personnel, PersonnelStat, get_now_asia_CN
+# 查询走只读数据访问层 (Core 语句，返回 Row)
+from dbRead import STMT_BY_STUDENT_ID
+from stats import (
+    stat_deltas, delta_params, build_upsert_stmt, STAT_SOURCE_COLUMNS,
+    STMT_ADD_COUNT, STMT_STAT_SOURCE_FOR_UPDATE, STMT_STAT_SOURCES_FOR_UPDATE,
+)
 
+# 修改前加行锁读取现有记录，统计差值与 UPDATE 基于同一份数据
+STMT_BY_STUDENT_ID_FOR_UPDATE = STMT_BY_STUDENT_ID.with_for_update()
+# 按学号删除 (预构造，避免每次请求生成缓存键)；RETURNING 版本一条语句取回计算统计差值需要的列
+STMT_DELETE_BY_STUDENT_ID = delete(Personnel.__table__).where(Personnel.__table__.c.id == bindparam("student_id"))
+STMT_DELETE_RETURNING_STAT_SOURCE = STMT_DELETE_BY_STUDENT_ID.returning(*STAT_SOURCE_COLUMNS)
+# 读取-修改-写入事务的执行选项：SQLite 不支持 FOR UPDATE，改为以 BEGIN IMMEDIATE 开始事务 (见 database.install_engine_events)
+WRITE_TRANSACTION_OPTIONS = {"sqlite_immediate": True}
+
+
+def begin_write(db: Session) -> None:
+    """在先读后写的事务开始前调用 (必须是事务中的第一个操作)。"""
+    db.connection(execution_options=WRITE_TRANSACTION_OPTIONS)
+
+
+def new_created_time() -> datetime:
+    """
+    生成写入数据库的创建时间：东八区本地时间、精确到秒。
+    与 MySQL DATETIME 列存储的值一致，响应可以直接使用它而无需再查询一次。
+    """
+    return get_now_asia_CN().replace(tzinfo=None, microsecond=0)
 
 # CREATE(新增) 
-def create_personnel(db: Session, person_in: PersonnelCreate) -> Personnel:
+def create_personnel(db: Session, person_in: PersonnelCreate) -> Dict[str, Any]:
     """
     新增一条人员信息记录。
+    学号唯一性由 student.id 上的唯一索引保证，重复时抛出 IntegrityError。
     :param db: 数据库会话对象
     :param person_in: Pydantic PersonnelCreate 模型（输入数据）
-    :return: 新创建的 Personnel ORM 对象
+    :return: 新记录的全部字段 (pid 取自自增主键，不再 refresh 查询)
     """
-    # 将 Pydantic 输入模型转换为 ORM 模型
-    db_person = Personnel(
-        id=person_in.id,
-        name=person_in.name,
-        email=person_in.email,
-        tel=person_in.tel,  
-        hobby=person_in.hobby
-    )
-    db.add(db_person)
+    values = person_in.model_dump()
+    values["created_time"] = new_created_time()
+    result = db.execute(insert(Personnel.__table__).values(**values))
+    apply_stat_deltas(db, stat_deltas(added=[values]))
     db.commit()
-    db.refresh(db_person)
-    return db_person
-
-# --- READ (查询) ---
-def get_personnel_by_pid(db: Session, pid: int) -> Optional[Personnel]:
-    """根据内部主键 pid 查询单条记录。"""
-    stmt = select(Personnel).where(Personnel.pid == pid)
-    return db.execute(stmt).scalars().first()
+    values["pid"] = result.inserted_primary_key[0]
+    return values
 
-def get_personnel_by_student_id(db: Session, id: str) -> Optional[Personnel]:
-    """根据学号查询单条记录。"""
-    stmt = select(Personnel).where(Personnel.id ==id)
-    return db.execute(stmt).scalars().first()
-
-def get_all_personnel(db: Session, mode: str = "descend") -> List[Personnel]:
+def diff_personnel_update(db_person, person_update: PersonnelUpdate) -> Tuple[Dict[str, Any], Dict[str, Any]]:
     """
-    查询所有人员信息，并按创建时间排序。
-    :param mode: "ascend" (升序) 或 "descend" (降序)
-    :return: Personnel ORM 对象列表
+    对比现有记录与更新请求 (同步/异步 CRUD 共用)。
+    :return: (现有记录的全部字段, 真正发生变化的字段)
     """
-    stmt = select(Personnel)
-    if mode == "ascend":
-        stmt = stmt.order_by(Personnel.created_time.asc())
-    elif mode == "descend":
-        stmt = stmt.order_by(Personnel.created_time.desc())
-    # 默认保持降序
-    return db.execute(stmt).scalars().all()
-
+    current = db_person._asdict()
+    # 提取更新数据，排除未设置和显式为 null 的字段，只保留真正变化的值
+    update_data = person_update.model_dump(exclude_unset=True, exclude_none=True)
+    changes = {key: value for key, value in update_data.items() if current[key] != value}
+    return current, changes
 
-def update_personnel_by_student_id(db: Session, id: str, person_update: PersonnelUpdate) -> Optional[Personnel]:
+def update_personnel_by_student_id(db: Session, id: str, person_update: PersonnelUpdate) -> Optional[Dict[str, Any]]:
     """
     根据学号 (id) 修改记录的非空字段。
+    - 只写入与现有值不同的字段，没有变化时不执行 UPDATE。
+    - 新学号冲突由唯一索引保证，冲突时抛出 IntegrityError。
+    :return: 修改后的全部字段，记录不存在时返回 None
     """
-    # 查找现有记录
-    db_person = get_personnel_by_student_id(db, id)
+    # 查找现有记录 (加行锁)
+    begin_write(db)
+    db_person = db.execute(STMT_BY_STUDENT_ID_FOR_UPDATE, {"student_id": id}).first()
     if not db_person:
+        db.rollback()
         return None  # 记录不存在
-    # 提取更新数据，排除未设置的字段
-    update_data = person_update.model_dump(exclude_unset=True) 
-    # 更新字段
-    for key, value in update_data.items():
-        setattr(db_person, key, value)
-    db.add(db_person)
+    current, changes = diff_personnel_update(db_person, person_update)
+    if not changes:
+        db.rollback()
+        return current
+    result = db.execute(update(Personnel).where(Personnel.id == id).values(**changes))
+    if result.rowcount == 0:
+        db.rollback()
+        return None  # 查询之后记录已被删除
+    updated = {**current, **changes}
+    if "id" in changes or "hobby" in changes:
+        apply_stat_deltas(db, stat_deltas(removed=[current], added=[updated]))
     db.commit()
-    db.refresh(db_person)
-    return db_person
+    return updated
 
 # 删除（根据学号）
 def delete_personnel_by_student_id(db: Session, id: str) -> bool:
     """
-    根据学号 (id) 删除记录。
+    根据学号 (id) 删除记录，并在同一事务中扣减统计计数。
+    - 数据库支持 DELETE ... RETURNING 时一条语句完成删除并取回被删记录 (单条语句本身是原子的，不需要 BEGIN IMMEDIATE)；
+      否则以写事务开始，先加行锁读取，再删除。
     :return: 如果成功删除返回 True，否则返回 False
     """
-    db_person = get_personnel_by_student_id(db, id)
-    
-    if db_person:
-        db.delete(db_person)
-        db.commit()
-        return True
-    return False
+    params = {"student_id": id}
+    if db.get_bind().dialect.delete_returning:
+        removed = db.execute(STMT_DELETE_RETURNING_STAT_SOURCE, params).first()
+    else:
+        begin_write(db)
+        removed = db.execute(STMT_STAT_SOURCE_FOR_UPDATE, params).first()
+        if removed is not None:
+            db.execute(STMT_DELETE_BY_STUDENT_ID, params)
+    if removed is None:
+        db.rollback()
+        return False
+    apply_stat_deltas(db, stat_deltas(removed=[removed]))
+    db.commit()
+    return True
+
+# --- STATS (统计计数，不提交事务，与写操作在同一事务中执行) ---
+def apply_stat_deltas(db: Session, deltas) -> None:
+    """把计数差值 (stats.stat_deltas 的结果) 写入统计表。"""
+    if not deltas:
+        return
+    params = delta_params(deltas)
+    stmt = build_upsert_stmt(db.get_bind().dialect.name)
+    if stmt is not None:
+        db.execute(stmt, params)
+        return
+    for row in params:
+        result = db.execute(STMT_ADD_COUNT, {f"b_{key}": value for key, value in row.items()})
+        if result.rowcount == 0:
+            db.execute(insert(PersonnelStat.__table__), row)
+
+def get_stat_sources_for_update(db: Session, ids: List[str]) -> list:
+    """加行锁读取给定学号的 (id, hobby, created_time)，用于批量写入前后对比计算统计差值。"""
+    if not ids:
+        return []
+    return db.execute(STMT_STAT_SOURCES_FOR_UPDATE, {"ids": list(ids)}).all()
+
+# --- BATCH (批量操作，不提交事务，由服务层统一提交) ---
+def bulk_create_personnel(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """多行插入 (executemany)，整批使用同一个 new_created_time()，与单条新增的时间格式一致。"""
+    if rows:
+        created_time = new_created_time()
+        db.execute(insert(Personnel.__table__), [{**row, "created_time": created_time} for row in rows])
+
+def bulk_update_personnel(db: Session, fields: Tuple[str, ...], rows: List[Dict[str, Any]]) -> None:
+    """
+    批量修改同一组字段 (executemany)。
+    :param fields: 本组要修改的字段名
+    :param rows: 每项包含 "target_id" (原学号) 以及 "v_<字段名>" 形式的新值
+    """
+    if rows:
+        db.execute(build_bulk_update_stmt(fields), rows)
+
+def build_bulk_update_stmt(fields: Tuple[str, ...]):
+    """构造按原学号批量修改指定字段的 UPDATE 语句 (同步/异步 CRUD 共用)。"""
+    table = Personnel.__table__
+    return (
+        update(table)
+        .where(table.c.id == bindparam("target_id"))
+        .values({key: bindparam(f"v_{key}") for key in fields})
+    )
 
+def bulk_delete_personnel(db: Session, ids: List[str]) -> None:
+    """用一条 DELETE ... WHERE id IN (...) 删除多条记录。"""
+    if ids:
+        db.execute(delete(Personnel).where(Personnel.id.in_(ids)))
@@ -0,0 +1,201 @@
+# dbCRUD_async.py - 异步数据访问层 (CRUD)，与 dbCRUD.py 一一对应
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncConnection
+from sqlalchemy import insert, update, delete
+from sqlalchemy.engine import Row
+from typing import AsyncIterator, List, Optional, Dict, Any, Tuple
+from datetime import datetime
+
+import anyio
+
+from val import PersonnelCreate, PersonnelUpdate
+from database import Personnel, PersonnelStat
+# 语句构造与同步 CRUD 共用
+from dbCRUD import (
+    new_created_time, diff_personnel_update, build_bulk_update_stmt,
+    STMT_BY_STUDENT_ID_FOR_UPDATE, STMT_DELETE_BY_STUDENT_ID, STMT_DELETE_RETURNING_STAT_SOURCE,
+    WRITE_TRANSACTION_OPTIONS,
+)
+from stats import (
+    stat_deltas, delta_params, build_upsert_stmt,
+    STMT_ADD_COUNT, STMT_STAT_SOURCE_FOR_UPDATE, STMT_STAT_SOURCES_FOR_UPDATE,
+)
+from dbRead import (
+    STMT_BY_PID, STMT_BY_STUDENT_ID, STMT_BY_STUDENT_IDS, STMT_BY_PIDS,
+    STMT_SEARCH_DOCUMENTS, STMT_SEARCH_DOCUMENTS_BY_IDS, STMT_DIGEST_SOURCES, STMT_DIGEST_SOURCES_BY_IDS,
+    STMT_STATS, STMT_EXPORT, page_query, count_query,
+)
+
+
+async def begin_write(db: AsyncSession) -> None:
+    """在先读后写的事务开始前调用，同 dbCRUD.begin_write。"""
+    await db.connection(execution_options=WRITE_TRANSACTION_OPTIONS)
+
+
+# CREATE(新增)
+async def create_personnel(db: AsyncSession, person_in: PersonnelCreate) -> Dict[str, Any]:
+    """
+    新增一条人员信息记录。
+    学号唯一性由 student.id 上的唯一索引保证，重复时抛出 IntegrityError。
+    :return: 新记录的全部字段 (pid 取自自增主键)
+    """
+    values = person_in.model_dump()
+    values["created_time"] = new_created_time()
+    result = await db.execute(insert(Personnel.__table__).values(**values))
+    await apply_stat_deltas(db, stat_deltas(added=[values]))
+    await db.commit()
+    values["pid"] = result.inserted_primary_key[0]
+    return values
+
+# --- READ (查询，复用 dbRead 中预构造的 Core 语句，返回 Row) ---
+async def get_personnel_by_pid(db: AsyncSession, pid: int) -> Optional[Row]:
+    """根据内部主键 pid 查询单条记录。"""
+    return (await db.execute(STMT_BY_PID, {"pid": pid})).first()
+
+async def get_personnel_by_student_id(db: AsyncSession, id: str) -> Optional[Row]:
+    """根据学号查询单条记录。"""
+    return (await db.execute(STMT_BY_STUDENT_ID, {"student_id": id})).first()
+
+async def get_personnel_page(db: AsyncSession, mode: str = "descend", limit: int = 50,
+                             after: Optional[Tuple[datetime, int]] = None,
+                             fields: Optional[Tuple[str, ...]] = None,
+                             filters: Optional[Dict[str, Any]] = None) -> List[Row]:
+    """按 (created_time, pid) 键集分页查询人员信息，参数同 dbRead.get_personnel_page。"""
+    stmt, params = page_query(mode, limit, after, fields, filters)
+    return (await db.execute(stmt, params)).all()
+
+async def count_personnel(db: AsyncSession, filters: Optional[Dict[str, Any]] = None) -> int:
+    """统计 (满足过滤条件的) 人员记录数 (SELECT COUNT(*))。"""
+    stmt, params = count_query(filters)
+    return (await db.execute(stmt, params)).scalar_one()
+
+async def get_personnel_by_student_ids(db: AsyncSession, ids: List[str]) -> List[Row]:
+    """按学号列表取记录 (不保证顺序)，用于变更日志。"""
+    if not ids:
+        return []
+    return (await db.execute(STMT_BY_STUDENT_IDS, {"ids": list(ids)})).all()
+
+async def get_personnel_by_pids(db: AsyncSession, pids: List[int]) -> List[Row]:
+    """按 pid 列表取记录 (按 pid 升序)，用于搜索结果分页。"""
+    if not pids:
+        return []
+    return (await db.execute(STMT_BY_PIDS, {"pids": list(pids)})).all()
+
+async def get_search_documents(db: AsyncSession, ids: Optional[List[str]] = None) -> List[Row]:
+    """读取搜索索引需要的列；ids 为 None 时读取全表。"""
+    if ids is None:
+        return (await db.execute(STMT_SEARCH_DOCUMENTS)).all()
+    if not ids:
+        return []
+    return (await db.execute(STMT_SEARCH_DOCUMENTS_BY_IDS, {"ids": list(ids)})).all()
+
+async def get_digest_sources(db: AsyncSession, ids: Optional[List[str]] = None) -> List[Row]:
+    """读取内容摘要需要的列；ids 为 None 时读取全表。"""
+    if ids is None:
+        return (await db.execute(STMT_DIGEST_SOURCES)).all()
+    if not ids:
+        return []
+    return (await db.execute(STMT_DIGEST_SOURCES_BY_IDS, {"ids": list(ids)})).all()
+
+async def get_stats_rows(db: AsyncSession) -> List[Row]:
+    """读取统计聚合表中计数大于 0 的 (维度, 分组, 计数)。"""
+    return (await db.execute(STMT_STATS)).all()
+
+async def iter_export_chunks(conn: AsyncConnection, chunk_size: int) -> AsyncIterator[List[Row]]:
+    """
+    按 pid 顺序逐块读取全表 (服务端游标)，每块最多 chunk_size 行。
+    驱动调用本身不响应取消 (客户端断开)：在驱动调用中途取消会使 SQLAlchemy 作废并强制关闭连接；
+    取消在两次读取之间的检查点生效，此时连接处于空闲状态，可以正常归还。
+    """
+    with anyio.CancelScope(shield=True):
+        result = await conn.stream(STMT_EXPORT.execution_options(yield_per=chunk_size))
+    while True:
+        with anyio.CancelScope(shield=True):
+            rows = await result.fetchmany(chunk_size)
+        if not rows:
+            break
+        await anyio.lowlevel.checkpoint()
+        yield rows
+
+
+async def update_personnel_by_student_id(db: AsyncSession, id: str, person_update: PersonnelUpdate) -> Optional[Dict[str, Any]]:
+    """
+    根据学号 (id) 修改记录的非空字段，没有变化时不执行 UPDATE。
+    :return: 修改后的全部字段，记录不存在时返回 None
+    """
+    await begin_write(db)
+    db_person = (await db.execute(STMT_BY_STUDENT_ID_FOR_UPDATE, {"student_id": id})).first()
+    if not db_person:
+        await db.rollback()
+        return None  # 记录不存在
+    current, changes = diff_personnel_update(db_person, person_update)
+    if not changes:
+        await db.rollback()
+        return current
+    result = await db.execute(update(Personnel).where(Personnel.id == id).values(**changes))
+    if result.rowcount == 0:
+        await db.rollback()
+        return None  # 查询之后记录已被删除
+    updated = {**current, **changes}
+    if "id" in changes or "hobby" in changes:
+        await apply_stat_deltas(db, stat_deltas(removed=[current], added=[updated]))
+    await db.commit()
+    return updated
+
+# 删除（根据学号）
+async def delete_personnel_by_student_id(db: AsyncSession, id: str) -> bool:
+    """
+    根据学号 (id) 删除记录，并在同一事务中扣减统计计数 (方式同 dbCRUD)。
+    :return: 如果成功删除返回 True，否则返回 False
+    """
+    params = {"student_id": id}
+    if db.get_bind().dialect.delete_returning:
+        removed = (await db.execute(STMT_DELETE_RETURNING_STAT_SOURCE, params)).first()
+    else:
+        await begin_write(db)
+        removed = (await db.execute(STMT_STAT_SOURCE_FOR_UPDATE, params)).first()
+        if removed is not None:
+            await db.execute(STMT_DELETE_BY_STUDENT_ID, params)
+    if removed is None:
+        await db.rollback()
+        return False
+    await apply_stat_deltas(db, stat_deltas(removed=[removed]))
+    await db.commit()
+    return True
+
+# --- STATS (统计计数，不提交事务，与写操作在同一事务中执行) ---
+async def apply_stat_deltas(db: AsyncSession, deltas) -> None:
+    """把计数差值写入统计表，方式同 dbCRUD.apply_stat_deltas。"""
+    if not deltas:
+        return
+    params = delta_params(deltas)
+    stmt = build_upsert_stmt(db.get_bind().dialect.name)
+    if stmt is not None:
+        await db.execute(stmt, params)
+        return
+    for row in params:
+        result = await db.execute(STMT_ADD_COUNT, {f"b_{key}": value for key, value in row.items()})
+        if result.rowcount == 0:
+            await db.execute(insert(PersonnelStat.__table__), row)
+
+async def get_stat_sources_for_update(db: AsyncSession, ids: List[str]) -> list:
+    """加行锁读取给定学号的 (id, hobby, created_time)。"""
+    if not ids:
+        return []
+    return (await db.execute(STMT_STAT_SOURCES_FOR_UPDATE, {"ids": list(ids)})).all()
+
+# --- BATCH (批量操作，不提交事务，由服务层统一提交) ---
+async def bulk_create_personnel(db: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+    """多行插入 (executemany)，created_time 同 dbCRUD.bulk_create_personnel。"""
+    if rows:
+        created_time = new_created_time()
+        await db.execute(insert(Personnel.__table__), [{**row, "created_time": created_time} for row in rows])
+
+async def bulk_update_personnel(db: AsyncSession, fields: Tuple[str, ...], rows: List[Dict[str, Any]]) -> None:
+    """批量修改同一组字段 (executemany)，参数格式同 dbCRUD.bulk_update_personnel。"""
+    if rows:
+        await db.execute(build_bulk_update_stmt(fields), rows)
+
+async def bulk_delete_personnel(db: AsyncSession, ids: List[str]) -> None:
+    """用一条 DELETE ... WHERE id IN (...) 删除多条记录。"""
+    if ids:
+        await db.execute(delete(Personnel).where(Personnel.id.in_(ids)))
@@ -0,0 +1,200 @@
+# dbRead.py - 只读数据访问层
+#
+# 使用模块级预先构造的 Core 语句 (参数全部为 bindparam)，语句对象只构造一次，
+# SQLAlchemy 编译缓存每次都能命中；查询只选取列，返回轻量的 Row (命名元组)，
+# 不创建 Personnel ORM 实例，也不进入会话的身份映射 (identity map)。
+# Row 支持属性访问 (row.id、row.created_time)，服务层可以像使用 ORM 对象一样使用它。
+
+from sqlalchemy import select, func, or_, bindparam
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from functools import lru_cache
+from datetime import datetime
+
+from database import Personnel
+from stats import STMT_STATS
+
+_table = Personnel.__table__
+# 列顺序与 PersonnelInDB 的字段顺序一致，row._asdict() 可直接作为响应数据
+PERSONNEL_COLUMNS = (
+    _table.c.id, _table.c.name, _table.c.email, _table.c.tel, _table.c.hobby,
+    _table.c.pid, _table.c.created_time,
+)
+
+# --- 预构造的语句 ---
+STMT_BY_PID = select(*PERSONNEL_COLUMNS).where(_table.c.pid == bindparam("pid"))
+STMT_BY_STUDENT_ID = select(*PERSONNEL_COLUMNS).where(_table.c.id == bindparam("student_id"))
+STMT_COUNT = select(func.count()).select_from(_table)
+STMT_BY_STUDENT_IDS = select(*PERSONNEL_COLUMNS).where(_table.c.id.in_(bindparam("ids", expanding=True)))
+STMT_BY_PIDS = (select(*PERSONNEL_COLUMNS)
+                .where(_table.c.pid.in_(bindparam("pids", expanding=True)))
+                .order_by(_table.c.pid))
+# 搜索索引的数据来源 (全量加载 / 按学号刷新)
+SEARCH_COLUMNS = (_table.c.pid, _table.c.id, _table.c.name, _table.c.hobby, _table.c.email)
+STMT_SEARCH_DOCUMENTS = select(*SEARCH_COLUMNS)
+STMT_SEARCH_DOCUMENTS_BY_IDS = select(*SEARCH_COLUMNS).where(_table.c.id.in_(bindparam("ids", expanding=True)))
+# 内容摘要 (digest.DIGEST_FIELDS) 需要的列
+DIGEST_COLUMNS = (_table.c.id, _table.c.name, _table.c.email, _table.c.tel, _table.c.hobby)
+STMT_DIGEST_SOURCES = select(*DIGEST_COLUMNS)
+STMT_DIGEST_SOURCES_BY_IDS = select(*DIGEST_COLUMNS).where(_table.c.id.in_(bindparam("ids", expanding=True)))
+# 全表导出：按主键顺序读取全部列
+STMT_EXPORT = select(*PERSONNEL_COLUMNS).order_by(_table.c.pid)
+
+
+# 列表接口支持的精确过滤条件 (tel / email / created_time 上均有索引，见 database.Personnel)，值通过 f_<名称> 绑定
+FILTER_CONDITIONS = {
+    "tel": _table.c.tel == bindparam("f_tel"),
+    "email": _table.c.email == bindparam("f_email"),
+    "created_after": _table.c.created_time >= bindparam("f_created_after"),
+    "created_before": _table.c.created_time < bindparam("f_created_before"),
+}
+
+
+def projection_columns(fields: Optional[Tuple[str, ...]] = None) -> tuple:
+    """
+    分页查询选取的列：请求的字段在前 (保持请求顺序)，游标需要的 created_time / pid 不在其中时追加在后。
+    fields 为 None 时选取全部列。
+    """
+    if fields is None:
+        return PERSONNEL_COLUMNS
+    names = tuple(fields) + tuple(name for name in ("created_time", "pid") if name not in fields)
+    return tuple(_table.c[name] for name in names)
+
+
+@lru_cache(maxsize=256)
+def build_page_stmt(mode: str, with_cursor: bool, fields: Optional[Tuple[str, ...]] = None,
+                    filters: Tuple[str, ...] = ()):
+    """
+    构造按 (created_time, pid) 键集分页的语句，游标、条数与过滤值均为绑定参数。
+    同一组 (排序, 是否带游标, 字段, 过滤条件) 只构造一次。
+    """
+    stmt = select(*projection_columns(fields))
+    for name in filters:
+        stmt = stmt.where(FILTER_CONDITIONS[name])
+    after_time, after_pid = bindparam("after_time"), bindparam("after_pid")
+    if mode == "ascend":
+        if with_cursor:
+            # 只取排在游标之后的记录，利用 (created_time, pid) 顺序直接定位，不受页深影响
+            # 单独的 created_time >= 条件让数据库在 (created_time, pid) 索引上做范围定位；
+            # 只写 OR 条件时 SQLite / MySQL 会从索引一端扫描到游标位置，耗时随页深增长
+            stmt = stmt.where(_table.c.created_time >= after_time, or_(
+                _table.c.created_time > after_time, _table.c.pid > after_pid
+            ))
+        stmt = stmt.order_by(_table.c.created_time.asc(), _table.c.pid.asc())
+    else:
+        if with_cursor:
+            stmt = stmt.where(_table.c.created_time <= after_time, or_(
+                _table.c.created_time < after_time, _table.c.pid < after_pid
+            ))
+        stmt = stmt.order_by(_table.c.created_time.desc(), _table.c.pid.desc())
+    return stmt.limit(bindparam("limit"))
+
+
+@lru_cache(maxsize=64)
+def build_count_stmt(filters: Tuple[str, ...] = ()):
+    """构造带过滤条件的 COUNT 语句"""
+    stmt = STMT_COUNT
+    for name in filters:
+        stmt = stmt.where(FILTER_CONDITIONS[name])
+    return stmt
+
+
+def filter_params(filters: Optional[Dict[str, Any]]) -> Tuple[Tuple[str, ...], Dict[str, Any]]:
+    """把过滤条件 {名称: 值} 转换为 (有序的条件名, 绑定参数)，值为 None 的条件忽略。"""
+    if not filters:
+        return (), {}
+    names = tuple(name for name in FILTER_CONDITIONS if filters.get(name) is not None)
+    return names, {f"f_{name}": filters[name] for name in names}
+
+
+def page_query(mode: str = "descend", limit: int = 50, after: Optional[Tuple[datetime, int]] = None,
+               fields: Optional[Tuple[str, ...]] = None, filters: Optional[Dict[str, Any]] = None):
+    """
+    选择分页语句并生成参数 (同步/异步数据访问共用)。
+    :param fields: 只选取这些列 (None 为全部列)
+    :param filters: 过滤条件，键为 FILTER_CONDITIONS 中的名称
+    :return: (语句, 参数字典)
+    """
+    mode = "ascend" if mode == "ascend" else "descend"
+    names, params = filter_params(filters)
+    params["limit"] = limit
+    if after is not None:
+        params["after_time"], params["after_pid"] = after
+    return build_page_stmt(mode, after is not None, fields, names), params
+
+
+def count_query(filters: Optional[Dict[str, Any]] = None):
+    """选择 COUNT 语句并生成参数 (同步/异步数据访问共用)。"""
+    names, params = filter_params(filters)
+    return build_count_stmt(names), params
+
+
+# --- 查询函数 (db 可以是 Session 或 Connection) ---
+def get_personnel_by_pid(db: Session, pid: int) -> Optional[Row]:
+    """根据内部主键 pid 查询单条记录。"""
+    return db.execute(STMT_BY_PID, {"pid": pid}).first()
+
+def get_personnel_by_student_id(db: Session, id: str) -> Optional[Row]:
+    """根据学号查询单条记录。"""
+    return db.execute(STMT_BY_STUDENT_ID, {"student_id": id}).first()
+
+def get_personnel_page(db: Session, mode: str = "descend", limit: int = 50,
+                       after: Optional[Tuple[datetime, int]] = None,
+                       fields: Optional[Tuple[str, ...]] = None,
+                       filters: Optional[Dict[str, Any]] = None) -> List[Row]:
+    """
+    按 (created_time, pid) 键集分页查询人员信息。
+    :param mode: "ascend" (升序) 或 "descend" (降序，默认)
+    :param limit: 本页最多返回的记录数
+    :param after: 上一页最后一条记录的 (created_time, pid)，为 None 时从头开始
+    :param fields: 只选取这些列 (Row 中请求的列在前)，为 None 时选取全部列
+    :param filters: 精确过滤条件 tel / email / created_after / created_before
+    """
+    stmt, params = page_query(mode, limit, after, fields, filters)
+    return db.execute(stmt, params).all()
+
+def count_personnel(db: Session, filters: Optional[Dict[str, Any]] = None) -> int:
+    """统计 (满足过滤条件的) 人员记录数 (SELECT COUNT(*))。"""
+    stmt, params = count_query(filters)
+    return db.execute(stmt, params).scalar_one()
+
+def get_personnel_by_student_ids(db: Session, ids: List[str]) -> List[Row]:
+    """按学号列表取记录 (不保证顺序)，用于变更日志。"""
+    if not ids:
+        return []
+    return db.execute(STMT_BY_STUDENT_IDS, {"ids": list(ids)}).all()
+
+def get_personnel_by_pids(db: Session, pids: List[int]) -> List[Row]:
+    """按 pid 列表取记录 (按 pid 升序)，用于搜索结果分页。"""
+    if not pids:
+        return []
+    return db.execute(STMT_BY_PIDS, {"pids": list(pids)}).all()
+
+def get_search_documents(db: Session, ids: Optional[List[str]] = None) -> List[Row]:
+    """读取搜索索引需要的列 (pid, id, name, hobby, email)；ids 为 None 时读取全表。"""
+    if ids is None:
+        return db.execute(STMT_SEARCH_DOCUMENTS).all()
+    if not ids:
+        return []
+    return db.execute(STMT_SEARCH_DOCUMENTS_BY_IDS, {"ids": list(ids)}).all()
+
+def get_digest_sources(db: Session, ids: Optional[List[str]] = None) -> List[Row]:
+    """读取内容摘要需要的列 (id, name, email, tel, hobby)；ids 为 None 时读取全表。"""
+    if ids is None:
+        return db.execute(STMT_DIGEST_SOURCES).all()
+    if not ids:
+        return []
+    return db.execute(STMT_DIGEST_SOURCES_BY_IDS, {"ids": list(ids)}).all()
+
+def get_stats_rows(db: Session) -> List[Row]:
+    """读取统计聚合表中计数大于 0 的 (维度, 分组, 计数)。"""
+    return db.execute(STMT_STATS).all()
+
+def iter_export_chunks(db, chunk_size: int) -> Iterator[List[Row]]:
+    """
+    按 pid 顺序逐块读取全表，每块最多 chunk_size 行。
+    yield_per 使用服务端游标 (MySQL 为非缓冲游标)，驱动层也不会一次取回全部结果。
+    """
+    result = db.execute(STMT_EXPORT.execution_options(yield_per=chunk_size))
+    yield from result.partitions()
@@ -0,0 +1,123 @@
+# digest.py - 人员记录的内容摘要 (增量同步用)，服务端与 client_app 共用
+#
+# 两层摘要，相当于一棵浅 Merkle 树：
+# - 记录摘要：学号、姓名、邮箱、手机号、兴趣 (去除首尾空白后) 的 blake2b 摘要。
+# - 分桶摘要：按学号的哈希把记录分到 256 个桶 ("00" ~ "ff")，由桶内 (学号, 记录摘要) 按学号排序后计算。
+# - 根摘要：由全部非空桶的 (桶号, 桶摘要) 计算。
+# 同步时先比较根摘要和分桶摘要 (几 KB)，只取回不一致的桶内的记录摘要，再只发送有差异的记录。
+# 空桶不出现在分桶摘要中；pid 与创建时间不参与摘要。
+
+import hashlib
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from search import IncrementalIndex
+
+DIGEST_FIELDS = ("id", "name", "email", "tel", "hobby")
+BUCKET_COUNT = 256
+_DIGEST_SIZE = 8
+
+
+def _clean(value) -> str:
+    if value is None:
+        return ""
+    return value.strip() if isinstance(value, str) else str(value)
+
+
+def bucket_of(student_id: str) -> str:
+    """学号所属的桶 (两位十六进制)"""
+    return hashlib.blake2b(student_id.encode("utf-8"), digest_size=1).hexdigest()
+
+
+def record_digest(record: Mapping) -> str:
+    """单条记录的摘要 (record 为 dict 或 Row._mapping)"""
+    payload = "\x1f".join(_clean(record.get(field)) for field in DIGEST_FIELDS)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=_DIGEST_SIZE).hexdigest()
+
+
+def combine_digests(items: Mapping[str, str]) -> str:
+    """由 {键: 摘要} 计算上一层摘要 (按键排序，与插入顺序无关)"""
+    h = hashlib.blake2b(digest_size=_DIGEST_SIZE)
+    for key in sorted(items):
+        h.update(f"{key}:{items[key]}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def build_digest_tree(records: Iterable[Mapping]) -> Dict[str, Dict[str, str]]:
+    """把记录按桶整理为 {桶号: {学号: 记录摘要}}"""
+    tree: Dict[str, Dict[str, str]] = {}
+    for record in records:
+        student_id = _clean(record.get("id"))
+        tree.setdefault(bucket_of(student_id), {})[student_id] = record_digest(record)
+    return tree
+
+
+def summarize_tree(tree: Mapping[str, Mapping[str, str]]) -> Tuple[str, Dict[str, str]]:
+    """:return: (根摘要, {桶号: 桶摘要})"""
+    buckets = {bucket: combine_digests(records) for bucket, records in tree.items() if records}
+    return combine_digests(buckets), buckets
+
+
+_BUCKET_NAMES = frozenset(f"{i:02x}" for i in range(BUCKET_COUNT))
+
+
+def parse_buckets(buckets: Iterable[str]) -> Optional[List[str]]:
+    """校验桶号 (两位小写十六进制)，去重排序；有非法值时返回 None"""
+    result = sorted(set(buckets))
+    return result if _BUCKET_NAMES.issuperset(result) else None
+
+
+class DigestIndex(IncrementalIndex):
+    """
+    服务端的摘要树，与搜索索引一样按学号增量同步。
+    桶摘要在读取时按需计算并缓存，桶内记录变化时失效。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._tree: Dict[str, Dict[str, str]] = {}
+        self._bucket_digests: Dict[str, str] = {}
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def summary(self) -> Tuple[str, int, Dict[str, str]]:
+        """:return: (根摘要, 记录数, {桶号: 桶摘要})"""
+        with self._lock:
+            for bucket, records in self._tree.items():
+                if bucket not in self._bucket_digests:
+                    self._bucket_digests[bucket] = combine_digests(records)
+            buckets = dict(self._bucket_digests)
+            count = self._count
+        return combine_digests(buckets), count, buckets
+
+    def records(self, buckets: Iterable[str]) -> Dict[str, Dict[str, str]]:
+        """指定桶内的 {学号: 记录摘要}"""
+        with self._lock:
+            return {bucket: dict(self._tree.get(bucket, {})) for bucket in buckets}
+
+    # --- 内部 (调用方持有锁) ---
+    def _clear(self):
+        self._tree.clear()
+        self._bucket_digests.clear()
+        self._count = 0
+
+    def _add(self, row):
+        record = row._mapping
+        student_id = record["id"]
+        bucket = bucket_of(student_id)
+        records = self._tree.setdefault(bucket, {})
+        if student_id not in records:
+            self._count += 1
+        records[student_id] = record_digest(record)
+        self._bucket_digests.pop(bucket, None)
+
+    def _remove(self, student_id: str):
+        bucket = bucket_of(student_id)
+        records = self._tree.get(bucket)
+        if records is None or records.pop(student_id, None) is None:
+            return
+        self._count -= 1
+        if not records:
+            del self._tree[bucket]
+        self._bucket_digests.pop(bucket, None)
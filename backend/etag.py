@@ -0,0 +1,84 @@
+# etag.py - 基于表版本号的强 ETag 与条件 GET (If-None-Match) 支持
+
+import hashlib
+import secrets
+import threading
+from typing import Optional
+
+from fastapi import Request, Response
+
+from replica import request_is_current
+
+
+class TableVersion:
+    """
+    student 表的进程内版本号，由服务层写操作提交后递增。
+    ETag 只依赖版本号和请求参数，校验 ETag 无需读取数据库。
+    版本号带有进程启动标识，进程重启后旧 ETag 一律失效。
+    多 worker 模式下改用共享内存中的版本号 (share)，各 worker 签发的 ETag 一致。
+    """
+
+    def __init__(self):
+        self._boot_id = secrets.token_hex(4)
+        self._version = 0
+        self._lock = threading.Lock()
+        self._shared = None
+
+    def share(self, segment):
+        """改用 shared_cache.SharedSegment 中的版本号和启动标识"""
+        self._shared = segment
+
+    def current(self) -> str:
+        if self._shared is not None:
+            return f"{self._shared.boot_id}.{self._shared.table_version()}"
+        return f"{self._boot_id}.{self._version}"
+
+    def bump(self):
+        if self._shared is not None:
+            self._shared.bump_table_version()
+            return
+        with self._lock:
+            self._version += 1
+
+
+table_version = TableVersion()
+
+
+def make_etag(version: str, *parts) -> str:
+    """由表版本号和表示形式的参数 (接口、排序方式、分页等) 生成强 ETag。"""
+    digest = hashlib.blake2s("|".join(map(str, parts)).encode("utf-8"), digest_size=8).hexdigest()
+    return f'"{version}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """判断 If-None-Match 请求头是否与 ETag 匹配 (按 RFC 9110 对 If-None-Match 使用弱比较)。"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def check_not_modified(request: Request, response: Response, *parts) -> Optional[Response]:
+    """
+    条件 GET：必须在查询数据库之前调用。
+    - 请求头 If-None-Match 匹配当前 ETag 时返回 304 响应 (无响应体)，调用方直接返回它。
+    - 否则把 ETag 写入即将返回的响应头，返回 None。
+    - 读取的只读副本尚未包含本进程的全部写入时不下发 ETag (内容可能早于当前版本号)，匹配时仍返回 304。
+    """
+    etag = make_etag(table_version.current(), *parts)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    # 先取版本号再检查副本位置：版本号递增之前写入位置已登记 (serve.notify_personnel_changed)
+    if request_is_current(request):
+        response.headers.update(headers)
+    else:
+        response.headers["Cache-Control"] = "no-cache"
+    return None
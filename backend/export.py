@@ -0,0 +1,108 @@
+# export.py - 全表导出 (CSV / JSONL) 的逐块编码与增量 gzip 压缩，同步/异步服务层共用
+#
+# 导出不经过分页接口，也不把整张表读进内存：
+# - 服务层用独立连接执行一条按 pid 排序的查询，通过服务端游标 (yield_per) 每次取 EXPORT_CHUNK_SIZE 行。
+# - 每块行编码为字节后立即交给 StreamingResponse 发送。
+# - 开启 gzip 时整个响应共用一个压缩对象，每块数据增量压缩，最后输出 gzip 尾部。
+# 因此服务端内存只与块大小有关，与表大小无关。
+# 客户端中途断开时由 ExportResponse 关闭迭代器，导出占用的连接立即归还连接池。
+
+import csv
+import io
+import zlib
+from datetime import datetime
+from typing import Dict, Iterable, Tuple
+
+import anyio
+from starlette.responses import StreamingResponse
+
+from fastjson import PERSONNEL_FIELDS, dumps
+
+# 每次从游标读取的行数
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+}
+# zlib 的 wbits=31 表示输出带 gzip 头和尾 (与 gzip 命令行兼容)
+_GZIP_WBITS = 31
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()  # 与 JSON 输出一致
+    return value
+
+
+def encode_csv(rows: Iterable, header: bool = False) -> bytes:
+    """把一块查询结果 (Row，列顺序同 PERSONNEL_FIELDS) 编码为 CSV 字节；header 为真时先输出表头。"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(PERSONNEL_FIELDS)
+    writer.writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def encode_jsonl(rows: Iterable) -> bytes:
+    """把一块查询结果编码为 JSON Lines 字节 (每行一个对象)。"""
+    return b"".join(dumps(row._asdict()) + b"\n" for row in rows)
+
+
+class ExportEncoder:
+    """
+    一次导出的编码状态：CSV 表头只在第一块输出；compress 为真时输出 gzip 流。
+    encode 可能返回空字节 (压缩器尚未攒够一块输出)，调用方应跳过。
+    """
+
+    def __init__(self, fmt: str, compress: bool = False):
+        self.fmt = fmt
+        self._header_pending = fmt == "csv"
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, _GZIP_WBITS) if compress else None
+
+    def encode(self, rows) -> bytes:
+        if self.fmt == "csv":
+            data = encode_csv(rows, header=self._header_pending)
+            self._header_pending = False
+        else:
+            data = encode_jsonl(rows)
+        return self._compressor.compress(data) if self._compressor is not None else data
+
+    def finish(self) -> bytes:
+        """导出结束时调用：空表的 CSV 仍输出表头；压缩时输出剩余数据和 gzip 尾部。"""
+        data = self.encode([]) if self._header_pending else b""
+        if self._compressor is not None:
+            data += self._compressor.flush()
+        return data
+
+
+def export_headers(fmt: str, compress: bool = False) -> Tuple[str, Dict[str, str]]:
+    """:return: (media_type, 响应头)，压缩时以 .gz 文件下载"""
+    filename = f"personnel.{fmt}"
+    if compress:
+        return "application/gzip", {"Content-Disposition": f'attachment; filename="{filename}.gz"'}
+    return EXPORT_MEDIA_TYPES[fmt], {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+
+class ExportResponse(StreamingResponse):
+    """
+    导出用的流式响应。
+    StreamingResponse 在客户端断开时只取消发送，不关闭内容迭代器，迭代器持有的数据库连接要等到垃圾回收才归还；
+    这里在响应结束 (包括断开) 后显式关闭：同步生成器在线程池中 close，异步生成器 aclose。
+    """
+
+    def __init__(self, content, *args, **kwargs):
+        super().__init__(content, *args, **kwargs)
+        self._content = content
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                if hasattr(self._content, "aclose"):
+                    await self._content.aclose()
+                elif hasattr(self._content, "close"):
+                    await anyio.to_thread.run_sync(self._content.close)
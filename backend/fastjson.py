@@ -0,0 +1,57 @@
+# fastjson.py - 列表等大响应的快速 JSON 序列化 (优先使用 orjson)
+#
+# 从数据库读出的数据在写入时已经通过 Pydantic 校验，读取时不再重复校验：
+# 服务层用 Row._asdict() 得到响应字典，由 dumps 直接序列化为 JSON 字节，
+# 跳过 model_validate 和 FastAPI 按 response_model 的二次校验。
+# 列表、搜索等接口的响应体可能被合并的请求共用 (coalesce.py)，路由用 json_bytes_response 返回已序列化的字节；
+# 其他接口用 json_response (FastJSONResponse)。
+
+import json
+from datetime import datetime
+from typing import Any, Optional
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # 未安装 orjson 时退回标准库 json
+    orjson = None
+
+# 与 PersonnelInDB 的字段顺序一致
+PERSONNEL_FIELDS = ("id", "name", "email", "tel", "hobby", "pid", "created_time")
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"无法序列化的类型: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """序列化为 UTF-8 JSON 字节，datetime 输出为 ISO 8601 (与 Pydantic 的输出一致)。"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """直接序列化内容的 JSON 响应，不经过 jsonable_encoder"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def json_response(content: Any, response: Optional[Response] = None, status_code: int = 200) -> FastJSONResponse:
+    """
+    构造 FastJSONResponse；response 为路由注入的 Response 对象时沿用其中已设置的响应头 (例如 ETag)。
+    直接返回 Response 时 FastAPI 不会再合并注入对象上的响应头，因此需要在这里复制。
+    """
+    headers = dict(response.headers) if response is not None else None
+    return FastJSONResponse(content=content, status_code=status_code, headers=headers)
+
+
+def json_bytes_response(body: bytes, response: Optional[Response] = None) -> Response:
+    """用已序列化的 JSON 字节构造响应 (例如多个合并的请求共用的响应体)，响应头处理同 json_response。"""
+    headers = dict(response.headers) if response is not None else None
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,15 +1,107 @@
 # main.py - 主应用文件
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import asyncio
+from functools import partial
+import os
+import tempfile
+
+import anyio
+from fastapi import FastAPI, Response
 # 导入 CORS 中间件
 from fastapi.middleware.cors import CORSMiddleware 
-from router import router as personnel_router
+from config import settings
+from database import engine, replica_engine
+from serve import record_cache, shared_changes, sync_shared_changes
+from fastjson import json_response
+from startup import readiness, check_ready, ping, sync_warmup_phases
+from replica import CONSISTENCY_HEADER, ConsistencyTokenMiddleware, HeartbeatWriter, write_position
+import metrics
+
+# 数据库访问模式: "sync" (默认，PyMySQL + 线程池) 或 "async" (AsyncSession + async def 路由)
+if settings.db_mode.lower() == "async":
+    from router_async import router as personnel_router
+    from database_async import async_engine, async_replica_engine
+    from startup import async_warmup_phases, ping_async
+    metrics.install_sql_metrics(async_engine.sync_engine)
+    metrics.register_pool("async", async_engine.sync_engine)
+    if async_replica_engine is not None:
+        metrics.install_sql_metrics(async_replica_engine.sync_engine)
+        metrics.register_pool("async_replica", async_replica_engine.sync_engine)
+    warmup_phases = async_warmup_phases(async_engine, min(settings.warmup_connections, settings.pool_size),
+                                        settings.warmup_indexes, async_replica_engine)
+    ping_database = partial(ping_async, async_engine)
+else:
+    from router import router as personnel_router
+    warmup_phases = sync_warmup_phases(engine, min(settings.warmup_connections, settings.pool_size),
+                                       settings.warmup_indexes, replica_engine)
+    # abandon_on_cancel：检查超时后不再等待阻塞中的线程
+    ping_database = partial(anyio.to_thread.run_sync, ping, engine, abandon_on_cancel=True)
+# 同步引擎在两种模式下都会使用 (例如数据库初始化、批量工具)
+metrics.install_sql_metrics(engine)
+metrics.register_pool("sync", engine)
+if replica_engine is not None:
+    metrics.install_sql_metrics(replica_engine)
+    metrics.register_pool("replica", replica_engine)
+# 读写分离：写操作后在主库写复制心跳 (replica.py)，心跳写入使用同步引擎
+heartbeat = HeartbeatWriter(engine, write_position, settings.replica_heartbeat_interval) \
+    if settings.replica_database_url or settings.async_replica_database_url else None
+# 记录缓存计数器
+metrics.registry.register(metrics.Counter(
+    "personnel_record_cache_events_total", "Record cache lookups by result", ("result",),
+    func=lambda: {(key,): value for key, value in record_cache.stats().items()
+                  if key in ("hits", "negative_hits", "misses", "stale_hits", "evictions")}))
+# 启动各阶段耗时
+metrics.registry.register(metrics.Gauge(
+    "personnel_startup_phase_seconds", "Startup time by phase (import, connections, statements, indexes)",
+    ("phase",), func=lambda: {(name,): seconds for name, seconds in readiness.phases.items()}))
+
+
+async def poll_shared_changes():
+    from shared_cache import SHARED_POLL_INTERVAL
+    while True:
+        sync_shared_changes()
+        await asyncio.sleep(SHARED_POLL_INTERVAL)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    启动时在后台预热 (不阻塞开始监听，期间 /readyz 返回 503)；关闭时先标记为未就绪，再关闭连接池。
+    多 worker 模式下另有后台任务定期读取共享变更环 (唤醒等待其他 worker 写入的长轮询 / SSE)；
+    读写分离时启动复制心跳线程。
+    """
+    tasks = [asyncio.create_task(readiness.warm_up(warmup_phases, settings.startup_budget_seconds))]
+    if shared_changes is not None:
+        tasks.append(asyncio.create_task(poll_shared_changes()))
+    if heartbeat is not None:
+        heartbeat.start()
+    try:
+        yield
+    finally:
+        readiness.ready = False
+        if heartbeat is not None:
+            await anyio.to_thread.run_sync(heartbeat.stop)
+        for task in tasks:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if settings.db_mode.lower() == "async":
+            await async_engine.dispose()
+            if async_replica_engine is not None:
+                await async_replica_engine.dispose()
+        engine.dispose()
+        if replica_engine is not None:
+            replica_engine.dispose()
 
 
 # 创建应用实例
 app = FastAPI(
     title="Personnel Management System API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # --- 配置 CORS 中间件 ---
@@ -26,7 +118,13 @@ app.add_middleware(
     allow_credentials=True, # 允许携带 Cookie/授权头
     allow_methods=["*"], # 允许所有 HTTP 方法 (GET, POST, PUT, DELETE, OPTIONS等)
     allow_headers=["*"], # 允许所有请求头
+    expose_headers=[CONSISTENCY_HEADER], # 允许前端读取一致性令牌 (读写分离，见 replica.py)
 )
+# 写请求的响应带上一致性令牌 (配置了只读副本时)
+if heartbeat is not None:
+    app.add_middleware(ConsistencyTokenMiddleware)
+# 指标中间件放在最外层，统计包括 CORS 在内的完整处理时间
+app.add_middleware(metrics.MetricsMiddleware)
 # ------------------------------------
 # 挂载路由
 app.include_router(personnel_router)
@@ -34,4 +132,62 @@ app.include_router(personnel_router)
 
 @app.get("/")
 def read_root():
-    return {"message": "Welcome to the Personnel API"}
\ No newline at end of file
+    return {"message": "Welcome to the Personnel API"}
+
+
+@app.get("/cache/stats", summary="单条记录缓存的命中统计")
+def cache_stats():
+    return record_cache.stats()
+
+
+@app.get("/metrics", summary="Prometheus 指标", include_in_schema=False)
+def metrics_endpoint():
+    return Response(content=metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/healthz", summary="存活检查 (不访问数据库)")
+async def healthz():
+    return {"status": "ok"}
+
+
+@app.get("/readyz", summary="就绪检查：启动预热完成且数据库可用时返回 200，否则 503")
+async def readyz():
+    ready, result = await check_ready(ping_database)
+    return json_response(result, status_code=200 if ready else 503)
+
+
+def default_shared_path() -> str:
+    """共享内存文件的默认位置：/dev/shm (内存文件系统)，不存在时使用临时目录"""
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, f"personnel-{os.getpid()}.shm")
+
+
+def run_workers(argv=None):
+    """
+    多 worker 模式：python main.py --workers 4
+    各 worker 通过 PERSONNEL_SHARED_CACHE_PATH 映射同一个共享内存文件 (第一个 worker 初始化)，退出时删除该文件。
+    """
+    import argparse
+    import uvicorn
+    parser = argparse.ArgumentParser(description="以多个 worker 进程运行，记录缓存与变更通知通过共享内存共享")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker 进程数 (默认 CPU 核数)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--shared-path", default=settings.shared_cache_path or default_shared_path(),
+                        help="共享内存文件路径 (默认 /dev/shm/personnel-<pid>.shm)")
+    args = parser.parse_args(argv)
+
+    # 上次异常退出留下的文件中可能有过期的缓存内容，从空文件开始
+    if os.path.exists(args.shared_path):
+        os.remove(args.shared_path)
+    os.environ["PERSONNEL_SHARED_CACHE_PATH"] = args.shared_path
+    try:
+        uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers,
+                    app_dir=os.path.dirname(os.path.abspath(__file__)))
+    finally:
+        if os.path.exists(args.shared_path):
+            os.remove(args.shared_path)
+
+
+if __name__ == "__main__":
+    run_workers()
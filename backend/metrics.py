@@ -0,0 +1,262 @@
+# metrics.py - 进程内指标 (Counter / Gauge / Histogram) 与 Prometheus 文本格式输出
+
+import bisect
+import contextvars
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# 默认延迟分桶 (秒)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class _ValueMetric(_Metric):
+    """单值指标；传入 func 时在输出时调用它取值 (返回 {标签值元组: 数值})"""
+
+    def __init__(self, *args, func: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._func = func
+
+    def inc(self, amount: float = 1, *labels: str):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        if self._func is not None:
+            items = list(self._func().items())
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Counter(_ValueMetric):
+    """只增不减的计数器"""
+    type_name = "counter"
+
+
+class Gauge(_ValueMetric):
+    """可增可减的瞬时值"""
+    type_name = "gauge"
+
+    def dec(self, amount: float = 1, *labels: str):
+        self.inc(-amount, *labels)
+
+
+class Histogram(_Metric):
+    """分桶直方图 (输出时累加为 Prometheus 的累计分桶)"""
+    type_name = "histogram"
+
+    def __init__(self, *args, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # 标签值元组 -> [各分桶计数 (最后一个为 +Inf), 总和]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v[0]), v[1]) for k, v in self._series.items()]
+        lines = self.header()
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """指标注册表，render() 输出 Prometheus 文本格式 (text/plain; version=0.0.4)"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# --- HTTP 指标 ---
+HTTP_IN_FLIGHT = registry.register(Gauge(
+    "personnel_http_requests_in_flight", "Requests currently being processed"))
+HTTP_DURATION = registry.register(Histogram(
+    "personnel_http_request_duration_seconds", "Request latency by route and status code",
+    ("method", "route", "status")))
+HTTP_SQL_STATEMENTS = registry.register(Histogram(
+    "personnel_http_request_sql_statements", "SQL statements executed per request",
+    ("method", "route"), buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)))
+HTTP_SQL_DURATION = registry.register(Histogram(
+    "personnel_http_request_sql_duration_seconds", "Total SQL execution time per request",
+    ("method", "route")))
+
+# --- SQL / 连接池指标 ---
+SQL_STATEMENTS = registry.register(Counter(
+    "personnel_sql_statements_total", "SQL statements executed"))
+SQL_DURATION = registry.register(Counter(
+    "personnel_sql_duration_seconds_total", "Total SQL execution time"))
+POOL_CHECKOUT_WAIT = registry.register(Histogram(
+    "personnel_db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)))
+
+# --- 读请求合并 (coalesce.py) ---
+COALESCED_REQUESTS = registry.register(Counter(
+    "personnel_coalesce_requests_total",
+    "Read requests that executed the query (executed) or shared an in-flight result (coalesced)",
+    ("route", "result")))
+
+# --- 读写分离 (replica.py) ---
+READ_ROUTING = registry.register(Counter(
+    "personnel_read_routing_total",
+    "Read sessions by target: replica, primary (replica behind the consistency token) or fallback (replica error)",
+    ("target",)))
+
+
+# --- 每个请求的 SQL 统计 (通过 contextvar 传递给引擎事件，线程池中执行的同步路由同样可见) ---
+class _RequestSqlStats:
+    __slots__ = ("statements", "seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+
+
+_request_sql_stats: contextvars.ContextVar[Optional[_RequestSqlStats]] = contextvars.ContextVar(
+    "personnel_request_sql_stats", default=None)
+
+
+def install_sql_metrics(sync_engine):
+    """在引擎上注册语句执行事件，统计 SQL 条数与耗时 (异步引擎传入 async_engine.sync_engine)。"""
+    from sqlalchemy import event
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("personnel_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["personnel_query_start"].pop()
+        SQL_STATEMENTS.inc()
+        SQL_DURATION.inc(elapsed)
+        stats = _request_sql_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.seconds += elapsed
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("personnel_query_start"):
+            connection.info["personnel_query_start"].pop()
+
+
+# 已注册的连接池: 名称 -> Pool，状态指标在输出时读取
+_pools = {}
+
+
+def _pool_values(method: str) -> Dict[Tuple[str, ...], float]:
+    return {(name,): getattr(pool, method)() for name, pool in _pools.items()}
+
+
+def register_pool(name: str, sync_engine) -> None:
+    """登记引擎的连接池，输出已借出连接数、溢出连接数和池容量。"""
+    if hasattr(sync_engine.pool, "overflow"):
+        _pools[name] = sync_engine.pool
+
+
+registry.register(Gauge("personnel_db_pool_checked_out", "Connections currently checked out", ("pool",),
+                        func=lambda: _pool_values("checkedout")))
+registry.register(Gauge("personnel_db_pool_overflow", "Overflow connections in use (negative while below pool_size)",
+                        ("pool",), func=lambda: _pool_values("overflow")))
+registry.register(Gauge("personnel_db_pool_size", "Configured pool size", ("pool",),
+                        func=lambda: _pool_values("size")))
+
+
+class MetricsMiddleware:
+    """
+    纯 ASGI 中间件：记录进行中请求数、按路由模板和状态码的延迟直方图，以及每个请求的 SQL 条数与耗时。
+    路由使用模板路径 (例如 /personnel/{student_id})，未匹配的请求归为 "unmatched"，避免标签基数膨胀。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_holder = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+            await send(message)
+
+        stats = _RequestSqlStats()
+        token = _request_sql_stats.set(stats)
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            _request_sql_stats.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            HTTP_DURATION.observe(elapsed, method, route_path, str(status_holder[0]))
+            HTTP_SQL_STATEMENTS.observe(stats.statements, method, route_path)
+            HTTP_SQL_DURATION.observe(stats.seconds, method, route_path)
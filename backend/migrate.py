@@ -0,0 +1,268 @@
+# migrate.py - 数据库结构迁移 (版本化、可重复执行、不删除数据)
+#
+# 表结构以 database.py 中的模型为唯一来源，迁移只做增量变更 (建表、补建索引)，从不 drop 表或删除数据：
+# - 已执行的迁移记录在 schema_migrations 表中，upgrade 只执行尚未执行的迁移，每个迁移与其版本记录在同一事务中提交。
+# - 每个迁移自身也先检查对象是否已存在，对手工建过索引、或由旧版 inidb.py 建立的数据库重复执行同样安全。
+# - MySQL 上的索引通过 ALTER TABLE ... ALGORITHM=INPLACE, LOCK=NONE 在线创建，建索引期间读写不阻塞；
+#   不支持在线创建时数据库直接报错，不会退化为锁表。
+#
+# 用法:
+#   python migrate.py upgrade   # 执行尚未执行的迁移 (服务部署前运行)
+#   python migrate.py status    # 列出各迁移及执行时间
+#   python migrate.py check     # 用 EXPLAIN 确认列表与查询语句走索引，不满足时退出码为 1
+
+import argparse
+import sys
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Optional
+
+from sqlalchemy import (Column, DateTime, Index, Integer, MetaData, String, Table, inspect, insert, select,
+                        func, text)
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from database import Base, Personnel, PersonnelStat
+
+_people = Personnel.__table__
+_stats = PersonnelStat.__table__
+
+# 迁移记录表不属于业务模型，使用独立的 MetaData
+_migration_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _migration_metadata,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("description", String(128), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[Connection], None]
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, description: str):
+    """注册迁移；版本号必须递增，已发布的迁移不再修改，结构变化通过追加新迁移完成。"""
+    def decorator(fn):
+        assert not MIGRATIONS or version > MIGRATIONS[-1].version, "迁移版本号必须递增"
+        MIGRATIONS.append(Migration(version, description, fn))
+        return fn
+    return decorator
+
+
+# --- 工具函数 ---
+def _index_names(conn: Connection, table_name: str) -> set:
+    return {ix["name"] for ix in inspect(conn).get_indexes(table_name)}
+
+
+def _model_index(table: Table, name: str) -> Index:
+    return next(ix for ix in table.indexes if ix.name == name)
+
+
+def create_index_online(conn: Connection, index: Index) -> bool:
+    """
+    索引不存在时创建 (按模型中的定义)。
+    :return: 是否新建了索引
+    """
+    table = index.table
+    if index.name in _index_names(conn, table.name):
+        return False
+    if conn.dialect.name in ("mysql", "mariadb"):
+        quote = conn.dialect.identifier_preparer.quote
+        columns = ", ".join(quote(column.name) for column in index.columns)
+        unique = "UNIQUE " if index.unique else ""
+        conn.execute(text(f"ALTER TABLE {quote(table.name)} ADD {unique}INDEX {quote(index.name)} ({columns}), "
+                          f"ALGORITHM=INPLACE, LOCK=NONE"))
+    else:
+        index.create(conn)
+    print(f"  已创建索引 {index.name}")
+    return True
+
+
+def drop_index_if_exists(conn: Connection, table_name: str, name: str) -> bool:
+    if name not in _index_names(conn, table_name):
+        return False
+    quote = conn.dialect.identifier_preparer.quote
+    if conn.dialect.name in ("mysql", "mariadb"):
+        conn.execute(text(f"ALTER TABLE {quote(table_name)} DROP INDEX {quote(name)}, ALGORITHM=INPLACE, LOCK=NONE"))
+    else:
+        conn.execute(text(f"DROP INDEX {quote(name)}"))
+    print(f"  已删除索引 {name}")
+    return True
+
+
+# --- 迁移 ---
+@migration(1, "创建 student / student_stats 表")
+def _create_tables(conn: Connection):
+    # checkfirst：已存在的表保持不变 (包括其中的数据)
+    Base.metadata.create_all(conn, tables=[_people, _stats], checkfirst=True)
+
+
+@migration(2, "补建列表过滤与排序使用的索引")
+def _add_read_indexes(conn: Connection):
+    # 学号唯一索引 (按学号查询/批量查询) 与手机号、邮箱过滤索引；旧版 inidb.py 建立的表缺少后两个
+    for name in ("ix_student_id", "ix_student_tel", "ix_student_email", "ix_student_created_time_pid"):
+        create_index_online(conn, _model_index(_people, name))
+    # 单列 created_time 索引是 (created_time, pid) 的前缀，已被复合索引取代
+    drop_index_if_exists(conn, _people.name, "ix_student_created_time")
+
+
+@migration(3, "初始化统计聚合表计数")
+def _init_stats(conn: Connection):
+    # 统计表为空而人员表有数据 (统计表刚建立) 时计算一次；已有计数不重算
+    if conn.execute(select(func.count()).select_from(_stats)).scalar_one():
+        return
+    if conn.execute(select(_people.c.pid).limit(1)).first() is None:
+        return
+    from stats import rebuild_stats
+    # Session 加入迁移所在的事务，rebuild_stats 中的 commit 不会提前提交外层事务
+    with Session(bind=conn) as db:
+        total = rebuild_stats(db)
+    print(f"  已统计 {total} 条记录")
+
+
+@migration(4, "创建读写分离的复制心跳表")
+def _create_heartbeat(conn: Connection):
+    from replica import replication_heartbeat
+    replication_heartbeat.create(conn, checkfirst=True)
+
+
+# --- 执行 ---
+def applied_versions(conn: Connection) -> dict:
+    """{版本号: 执行时间}；迁移记录表不存在时为空"""
+    if not inspect(conn).has_table(schema_migrations.name):
+        return {}
+    return {row.version: row.applied_at for row in conn.execute(select(schema_migrations))}
+
+
+def upgrade(engine: Engine, target: Optional[int] = None) -> List[int]:
+    """
+    依次执行尚未执行的迁移 (版本号不超过 target)。
+    :return: 本次执行的版本号
+    """
+    with engine.begin() as conn:
+        _migration_metadata.create_all(conn, checkfirst=True)
+        done = applied_versions(conn)
+    executed = []
+    for item in MIGRATIONS:
+        if item.version in done or (target is not None and item.version > target):
+            continue
+        print(f"执行迁移 {item.version}: {item.description}")
+        with engine.begin() as conn:
+            item.apply(conn)
+            conn.execute(insert(schema_migrations).values(
+                version=item.version, description=item.description, applied_at=datetime.now()))
+        executed.append(item.version)
+    return executed
+
+
+def status(engine: Engine) -> List[tuple]:
+    """:return: [(版本号, 说明, 执行时间或 None)]"""
+    with engine.connect() as conn:
+        done = applied_versions(conn)
+    return [(item.version, item.description, done.get(item.version)) for item in MIGRATIONS]
+
+
+# --- 索引使用检查 (EXPLAIN) ---
+def _explain(conn: Connection, stmt, params: dict) -> List[str]:
+    """返回语句的执行计划 (每个步骤一行文本)，只支持 SQLite 与 MySQL。"""
+    # 绑定参数后展开 IN (...)，以驱动的参数格式执行 EXPLAIN
+    compiled = stmt.params(**params).compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    values = compiled.construct_params()
+    args = tuple(values[name] for name in compiled.positiontup)
+    if conn.dialect.name == "sqlite":
+        return [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + compiled.string, args)]
+    result = conn.exec_driver_sql("EXPLAIN " + compiled.string, args)
+    return [f"table={row['table']} type={row['type']} key={row['key']} extra={row['Extra']}"
+            for row in result.mappings()]
+
+
+# 对执行计划的要求：
+# - seek: 在索引上定位 (等值或范围)，不排序，耗时与表大小、页深无关
+# - ordered: 可以沿索引顺序扫描 (取到 LIMIT 行即停止)，不排序
+# - filtered: 通过索引定位，结果行数很少，允许定位后排序
+def _plan_problems(dialect: str, plan: List[str], expect: str) -> List[str]:
+    """执行计划中不满足要求的步骤"""
+    problems = []
+    for step in plan:
+        if dialect == "sqlite":
+            full_scan = step.startswith("SCAN ") and "INDEX" not in step
+            index_scan = step.startswith("SCAN ") and "INDEX" in step
+            sort = "TEMP B-TREE" in step
+        else:
+            full_scan = "type=ALL " in step
+            index_scan = "type=index " in step
+            sort = "Using filesort" in step
+        if full_scan:
+            problems.append("全表扫描")
+        elif index_scan and expect != "ordered":
+            problems.append("沿索引扫描而没有定位")
+        if sort and expect != "filtered":
+            problems.append("额外排序")
+    return problems
+
+
+def read_path_queries():
+    """读接口使用的语句与示例参数：(名称, 语句, 参数, 对执行计划的要求)"""
+    from dbRead import page_query, STMT_BY_STUDENT_ID, STMT_BY_STUDENT_IDS, STMT_BY_PID
+    after = (datetime(2025, 1, 1), 1000)
+    queries = []
+    for mode in ("descend", "ascend"):
+        queries.append((f"列表第一页 ({mode})", *page_query(mode, 51), "ordered"))
+        queries.append((f"列表翻页 ({mode})", *page_query(mode, 51, after), "seek"))
+    queries += [
+        ("按手机号过滤", *page_query("descend", 51, filters={"tel": "13800000000"}), "filtered"),
+        ("按邮箱过滤", *page_query("descend", 51, filters={"email": "a@example.com"}), "filtered"),
+        ("按创建时间窗口过滤", *page_query("descend", 51, after, filters={
+            "created_after": datetime(2024, 1, 1), "created_before": datetime(2025, 1, 1)}), "seek"),
+        ("按学号查询", STMT_BY_STUDENT_ID, {"student_id": "2024000000001"}, "seek"),
+        ("按学号批量查询", STMT_BY_STUDENT_IDS, {"ids": ["2024000000001", "2024000000002"]}, "seek"),
+        ("按 pid 查询", STMT_BY_PID, {"pid": 1}, "seek"),
+    ]
+    return queries
+
+
+def check(engine: Engine) -> bool:
+    """对读接口的语句执行 EXPLAIN 并输出执行计划；全部满足要求时返回 True。"""
+    ok = True
+    with engine.connect() as conn:
+        dialect = conn.dialect.name
+        if dialect not in ("sqlite", "mysql", "mariadb"):
+            print(f"不支持检查 {dialect} 的执行计划")
+            return False
+        for name, stmt, params, expect in read_path_queries():
+            plan = _explain(conn, stmt, params)
+            problems = _plan_problems(dialect, plan, expect)
+            ok = ok and not problems
+            print(f"[{'FAIL' if problems else 'OK'}] {name}: {' | '.join(plan)}")
+            for problem in problems:
+                print(f"       {problem}")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="数据库结构迁移")
+    parser.add_argument("command", nargs="?", default="upgrade", choices=["upgrade", "status", "check"],
+                        help="upgrade: 执行尚未执行的迁移；status: 列出迁移；check: 检查读语句是否走索引")
+    parser.add_argument("--target", type=int, help="upgrade 只执行到该版本")
+    args = parser.parse_args(argv)
+
+    from database import engine
+    if args.command == "upgrade":
+        executed = upgrade(engine, args.target)
+        print(f"已执行 {len(executed)} 个迁移。" if executed else "数据库结构已是最新。")
+    elif args.command == "status":
+        for version, description, applied_at in status(engine):
+            print(f"{version:>4}  {'已执行 ' + applied_at.isoformat(sep=' ', timespec='seconds') if applied_at else '未执行':<28}"
+                  f"{description}")
+    else:
+        if not check(engine):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+# replica.py - 读写分离：读请求使用只读副本，写请求使用主库，一致性令牌保证读到自己的写入
+#
+# 配置 replica_database_url 后，database.get_db / database_async.get_async_db 按请求方法选择会话：
+# GET / HEAD 请求使用只读副本，新增 / 修改 / 删除使用主库。
+# - 复制位置：每个进程 (多 worker 模式下每台机器) 在主库的 replication_heartbeat 表中有一行心跳 (source, position)，
+#   由后台线程 HeartbeatWriter 递增。副本按提交顺序应用主库的事务，副本上这一行的 position 就是它已应用到的位置。
+# - 写操作提交后 (serve.notify_personnel_changed) 调用 write_position.mark()：此后才开始的心跳一定晚于这次提交，
+#   它的序号就是这次写入的位置。mark 同时唤醒心跳线程立即写一次，副本的追赶时间约等于复制延迟。
+# - 写请求的响应头 X-Consistency-Token 带上令牌 (source.position)。客户端之后的读请求带上同一请求头：
+#   副本上该 source 的心跳达到令牌位置时使用副本；否则最多等待 replica_wait_seconds 秒，仍未追上时改用主库。
+# - 进程内的缓存 (记录缓存、记录总数、搜索索引、摘要树、ETag、请求合并) 只从包含本进程全部写入的会话填充：
+#   副本会话开始时读取本进程心跳在副本上的位置 (事务内的快照)，落后于 write_position 时不写缓存、不下发 ETag，
+#   索引改从主库同步。不带令牌的读请求可能读到复制延迟内的旧数据，但旧数据不会留在缓存中。
+# 本地测试：python -m bench.replication (两个 SQLite 文件，模拟复制延迟)。
+
+import asyncio
+import logging
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy import BigInteger, Column, DateTime, MetaData, String, Table, bindparam, delete, insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from metrics import READ_ROUTING
+
+logger = logging.getLogger("personnel.replica")
+
+CONSISTENCY_HEADER = "X-Consistency-Token"
+# 使用只读副本的请求方法
+READ_METHODS = ("GET", "HEAD")
+# 会话 info / request.state 中记录本进程心跳在副本上位置的键 (主库会话没有该项)
+REPLICA_POSITION = "replica_position"
+# 等待副本追上令牌时的检查间隔 (秒)
+REPLICA_WAIT_POLL = 0.01
+# 超过该时间没有更新的心跳行 (已退出的进程) 在心跳线程启动时删除
+HEARTBEAT_RETENTION = timedelta(days=1)
+
+# 心跳表不属于业务模型，使用独立的 MetaData (由 migrate.py 创建)
+heartbeat_metadata = MetaData()
+replication_heartbeat = Table(
+    "replication_heartbeat", heartbeat_metadata,
+    Column("source", String(16), primary_key=True),
+    Column("position", BigInteger, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+)
+_hb = replication_heartbeat.c
+STMT_HEARTBEAT_POSITIONS = select(_hb.source, _hb.position).where(_hb.source.in_(bindparam("sources", expanding=True)))
+
+
+class WritePosition:
+    """
+    本进程写入的复制位置：心跳序号的两个计数器。
+    - started: 已开始写入的最大心跳序号 (claim)；
+    - required: 已提交的写操作要求副本达到的心跳序号 (mark 时为 started + 1)。
+    """
+
+    def __init__(self):
+        self.source = secrets.token_hex(4)
+        self._lock = threading.Lock()
+        self._started = 0
+        self._required = 0
+        self._shared = None
+        # 写操作后唤醒心跳线程
+        self.wakeup = threading.Event()
+
+    def share(self, segment):
+        """多 worker 模式：来源标识与计数器改用 shared_cache.SharedSegment 中的，同一台机器的 worker 共用一行心跳"""
+        from shared_cache import REPLICATION_REQUIRED, REPLICATION_STARTED
+        self._shared = segment
+        self._started_offset, self._required_offset = REPLICATION_STARTED, REPLICATION_REQUIRED
+        self.source = segment.boot_id
+
+    def mark(self) -> int:
+        """写操作提交后调用，返回这次写入的位置 (令牌中的序号)"""
+        if self._shared is not None:
+            segment = self._shared
+            with segment.lock():
+                required = max(segment.read_counter(self._required_offset),
+                               segment.read_counter(self._started_offset) + 1)
+                segment.write_counter(self._required_offset, required)
+        else:
+            with self._lock:
+                self._required = required = max(self._required, self._started + 1)
+        self.wakeup.set()
+        return required
+
+    def claim(self) -> int:
+        """心跳线程写入前调用，返回这次心跳的序号"""
+        if self._shared is not None:
+            segment = self._shared
+            with segment.lock():
+                started = segment.read_counter(self._started_offset) + 1
+                segment.write_counter(self._started_offset, started)
+            return started
+        with self._lock:
+            self._started += 1
+            return self._started
+
+    def required(self) -> int:
+        if self._shared is not None:
+            return self._shared.read_counter(self._required_offset)
+        return self._required
+
+    def covers(self, replica_position: Optional[int]) -> bool:
+        """副本快照 (本进程心跳位置为 replica_position，主库为 None) 是否包含本进程已提交的全部写入"""
+        return replica_position is None or replica_position >= self.required()
+
+    def token(self) -> str:
+        """写请求响应中的一致性令牌 (不早于本进程已提交的全部写入)"""
+        return f"{self.source}.{self.required()}"
+
+
+write_position = WritePosition()
+
+
+def parse_token(token: Optional[str]) -> Optional[Tuple[str, int]]:
+    """
+    解析一致性令牌。
+    :return: (来源, 序号)；没有令牌时为 None，格式错误时抛出 ValueError
+    """
+    if not token:
+        return None
+    source, _, position = token.strip().rpartition(".")
+    if not source or not position.isdigit():
+        raise ValueError(f"无效的一致性令牌: {token}")
+    return source, int(position)
+
+
+# --- 心跳 (主库) ---
+def write_heartbeat(engine, source: str, position: int):
+    """把来源的心跳更新为 position (只增不减：多个 worker 共用一行时，后开始的心跳可能先提交)"""
+    now = datetime.now()
+    try:
+        with engine.begin() as conn:
+            updated = conn.execute(update(replication_heartbeat)
+                                   .where(_hb.source == source, _hb.position < position)
+                                   .values(position=position, updated_at=now)).rowcount
+            if not updated and conn.execute(select(_hb.position).where(_hb.source == source)).first() is None:
+                conn.execute(insert(replication_heartbeat).values(source=source, position=position, updated_at=now))
+    except IntegrityError:
+        pass  # 其他 worker 同时插入了这一行，之后的心跳更新它
+
+
+def prune_heartbeats(engine, retention: timedelta = HEARTBEAT_RETENTION) -> int:
+    """删除长时间没有更新的心跳行 (已退出的进程)"""
+    with engine.begin() as conn:
+        return conn.execute(delete(replication_heartbeat).where(_hb.updated_at < datetime.now() - retention)).rowcount
+
+
+class HeartbeatWriter:
+    """后台线程：写操作后立即、没有写操作时每 interval 秒在主库写一次本进程的心跳"""
+
+    def __init__(self, engine, position: WritePosition, interval: float = 1.0):
+        self._engine = engine
+        self._position = position
+        self._interval = interval
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="replication-heartbeat", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stopped.set()
+        self._position.wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            prune_heartbeats(self._engine)
+        except SQLAlchemyError as e:
+            logger.warning("清理复制心跳失败: %s", e)
+        while not self._stopped.is_set():
+            # 先清除唤醒标志再取序号：在 claim 之前 mark 的写入由这次心跳覆盖，之后 mark 的会再次唤醒
+            self._position.wakeup.wait(self._interval)
+            self._position.wakeup.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                write_heartbeat(self._engine, self._position.source, self._position.claim())
+            except SQLAlchemyError as e:
+                logger.warning("写入复制心跳失败: %s", e)
+                self._stopped.wait(self._interval)
+
+
+# --- 读请求选择会话 ---
+def _required_sources(required: Optional[Tuple[str, int]]) -> list:
+    sources = [write_position.source]
+    if required is not None and required[0] != write_position.source:
+        sources.append(required[0])
+    return sources
+
+
+def _choose(positions: Dict[str, int], required: Optional[Tuple[str, int]]) -> bool:
+    return required is None or positions.get(required[0], 0) >= required[1]
+
+
+def open_read_session(replica_factory: Callable, primary_factory: Callable, token: Optional[str], wait: float):
+    """
+    为读请求选择会话：副本已应用到令牌位置时返回副本会话，否则最多等待 wait 秒后返回主库会话；
+    令牌格式错误或副本不可用时使用主库。
+    副本会话的 info[REPLICA_POSITION] 为本进程心跳在副本快照中的位置。
+    """
+    try:
+        required = parse_token(token)
+    except ValueError:
+        READ_ROUTING.inc(1, "primary")
+        return primary_factory()
+    deadline = time.monotonic() + wait
+    while True:
+        db = replica_factory()
+        try:
+            positions = dict(db.execute(STMT_HEARTBEAT_POSITIONS, {"sources": _required_sources(required)}).all())
+        except SQLAlchemyError as e:
+            db.close()
+            logger.warning("读取只读副本失败，改用主库: %s", e)
+            READ_ROUTING.inc(1, "fallback")
+            return primary_factory()
+        if _choose(positions, required):
+            db.info[REPLICA_POSITION] = positions.get(write_position.source, 0)
+            READ_ROUTING.inc(1, "replica")
+            return db
+        db.close()
+        if time.monotonic() >= deadline:
+            READ_ROUTING.inc(1, "primary")
+            return primary_factory()
+        time.sleep(REPLICA_WAIT_POLL)
+
+
+async def open_read_session_async(replica_factory: Callable, primary_factory: Callable, token: Optional[str],
+                                  wait: float):
+    """open_read_session 的异步版本 (AsyncSession)"""
+    try:
+        required = parse_token(token)
+    except ValueError:
+        READ_ROUTING.inc(1, "primary")
+        return primary_factory()
+    deadline = time.monotonic() + wait
+    while True:
+        db = replica_factory()
+        try:
+            positions = dict((await db.execute(STMT_HEARTBEAT_POSITIONS,
+                                               {"sources": _required_sources(required)})).all())
+        except SQLAlchemyError as e:
+            await db.close()
+            logger.warning("读取只读副本失败，改用主库: %s", e)
+            READ_ROUTING.inc(1, "fallback")
+            return primary_factory()
+        if _choose(positions, required):
+            db.info[REPLICA_POSITION] = positions.get(write_position.source, 0)
+            READ_ROUTING.inc(1, "replica")
+            return db
+        await db.close()
+        if time.monotonic() >= deadline:
+            READ_ROUTING.inc(1, "primary")
+            return primary_factory()
+        await asyncio.sleep(REPLICA_WAIT_POLL)
+
+
+def request_is_current(request) -> bool:
+    """请求使用的会话是否包含本进程已提交的全部写入 (ETag、请求合并使用；get_db 记录在 request.state 中)"""
+    return write_position.covers(getattr(request.state, REPLICA_POSITION, None))
+
+
+class ConsistencyTokenMiddleware:
+    """纯 ASGI 中间件：写请求 (POST / PUT / PATCH / DELETE) 的响应头加上一致性令牌"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in READ_METHODS or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # 响应开始时服务层已提交并调用过 mark，此时的令牌不早于本请求的写入
+                headers = list(message.get("headers", []))
+                headers.append((CONSISTENCY_HEADER.lower().encode("latin-1"), write_position.token().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,13 +1,22 @@
 # personnel_router.py - 路由层
 
-from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi import APIRouter, Depends, status, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal, Optional
+from functools import partial
+from datetime import datetime
 
 # 导入数据库依赖函数
 from database import *
+from etag import check_not_modified
+from fastjson import json_response, json_bytes_response, dumps
+from coalesce import SingleFlight, flight_key
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from export import ExportResponse, export_headers
+from changes import MAX_CHANGES_WAIT, stream_changes
 # 导入 Pydantic 模型
-from val import PersonnelCreate, PersonnelUpdate, PersonnelInDB, PersonnelCollection
+from val import PersonnelCreate, PersonnelUpdate, PersonnelInDB, PersonnelCollection, PersonnelStats, PersonnelDigest, PersonnelChanges, BatchRequest, BatchResult
 # 导入服务层函数
 from serve import *
 
@@ -20,6 +29,8 @@ router = APIRouter(
 # --- 辅助依赖函数 ---
 # 用于获取数据库 Session 的依赖注入
 DbDependency = Depends(get_db)
+# 相同读请求的合并
+read_flight = SingleFlight()
 
 
 ## =================================================================
@@ -45,6 +56,178 @@ def create_personnel_route(
     return create_personnel_service(db, person_in)
 
 
+## =================================================================
+## POST /personnel/batch (批量新增/修改/删除)
+## =================================================================
+@router.post(
+    "/batch",
+    response_model=BatchResult,
+    summary="批量新增、修改、删除人员记录"
+)
+def batch_personnel_route(
+    batch: BatchRequest,
+    db: Session = DbDependency
+):
+    """
+    在一个请求中按顺序执行多条 create / update / delete 操作。
+    - **每条操作单独校验，失败不影响其他操作。**
+    - **成功的写操作合并为多行语句，在同一事务中提交。**
+    - 逐条返回结果状态：201/200/204 成功，404/409/422 失败。
+    """
+    return batch_personnel_service(db, batch.operations)
+
+
+## =================================================================
+## GET /personnel/search (按姓名 / 兴趣 / 邮箱搜索)
+## =================================================================
+@router.get(
+    "/search",
+    response_model=PersonnelCollection,
+    summary="按姓名、兴趣、邮箱搜索人员记录"
+)
+def search_personnel_route(
+    request: Request,
+    response: Response,
+    db: Session = DbDependency,
+    q: str = Query(..., min_length=1, max_length=SEARCH_QUERY_MAX_LENGTH, description="搜索关键字"),
+    match: Literal["prefix", "substring"] = Query("substring", description="prefix: 字段以关键字开头；substring: 字段包含关键字"),
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, description=f"每页条数 (最大 {MAX_PAGE_LIMIT})"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next 游标")
+):
+    """
+    在姓名、兴趣、邮箱中搜索关键字 (忽略大小写，支持中文)。
+    - 由进程内 n-gram 索引求出匹配记录，不扫描全表；写操作后索引自动同步。
+    - 结果按 pid 升序分页，count 为匹配总数，通过 next 游标翻页。
+    - 支持 ETag / If-None-Match，未变化时返回 304。
+    - 同时到达的相同请求只查询一次，共用同一份响应体 (coalesce.py)。
+    """
+    not_modified = check_not_modified(request, response, "search", q, match, limit, cursor)
+    if not_modified:
+        return not_modified
+    def build() -> bytes:
+        items, count, next_cursor = search_personnel_service(db, q, match=match, limit=limit, cursor=cursor)
+        return dumps({"items": items, "count": count, "next": next_cursor})
+    return json_bytes_response(read_flight.do(flight_key(request, "search"), build), response)
+
+
+## =================================================================
+## GET /personnel/stats (统计)
+## =================================================================
+@router.get(
+    "/stats",
+    response_model=PersonnelStats,
+    response_model_exclude_unset=True,
+    summary="按兴趣、入学年份、创建日期统计人数"
+)
+def get_personnel_stats_route(
+    request: Request,
+    response: Response,
+    db: Session = DbDependency,
+    dimension: Optional[List[Literal["hobby", "year", "day", "week"]]] = Query(
+        None, description="只返回这些维度，可重复指定；默认返回全部")
+):
+    """
+    返回人员统计：total 以及按兴趣 (hobby)、入学年份 (year)、创建日 (day)、创建周 (week) 的人数。
+    - 计数由新增 / 修改 / 删除在同一事务中增量维护，读取开销只与分组数有关。
+    - 支持 ETag / If-None-Match，未变化时返回 304。
+    """
+    not_modified = check_not_modified(request, response, "stats", dimension)
+    if not_modified:
+        return not_modified
+    body = read_flight.do(flight_key(request, "stats"), lambda: dumps(get_personnel_stats_service(db, dimension)))
+    return json_bytes_response(body, response)
+
+
+## =================================================================
+## GET /personnel/digest (内容摘要，增量同步用)
+## =================================================================
+@router.get(
+    "/digest",
+    response_model=PersonnelDigest,
+    response_model_exclude_unset=True,
+    summary="按桶返回记录内容摘要"
+)
+def get_personnel_digest_route(
+    request: Request,
+    response: Response,
+    db: Session = DbDependency,
+    bucket: Optional[List[str]] = Query(None, description="返回这些桶 (00 ~ ff) 内每条记录的摘要，可重复指定；默认返回各桶摘要")
+):
+    """
+    返回根摘要与各非空桶的摘要 (约几 KB)；指定 bucket 时返回这些桶内 学号 -> 记录摘要。
+    - 客户端按同样的算法 (digest.py) 计算本地摘要，只对不一致的桶取回记录摘要，再只发送有差异的记录。
+    - 支持 ETag / If-None-Match，未变化时返回 304。
+    """
+    not_modified = check_not_modified(request, response, "digest", bucket)
+    if not_modified:
+        return not_modified
+    body = read_flight.do(flight_key(request, "digest"), lambda: dumps(get_personnel_digest_service(db, bucket)))
+    return json_bytes_response(body, response)
+
+
+## =================================================================
+## GET /personnel/export (全表导出 CSV / JSONL)
+## =================================================================
+@router.get(
+    "/export",
+    response_class=ExportResponse,
+    summary="流式导出全部人员记录 (CSV / JSONL，可选 gzip)"
+)
+def export_personnel_route(
+    fmt: Literal["csv", "jsonl"] = Query("csv", alias="format", description="导出格式"),
+    gzip: bool = Query(False, description="以 gzip 压缩输出 (边读边压缩)")
+):
+    """
+    按 pid 顺序导出全部人员记录，供报表等需要全量数据的任务使用。
+    - CSV 带表头；JSONL 每行一个对象，字段与列表接口一致。
+    - 服务端通过游标逐块读取、编码并发送，内存占用与表大小无关；gzip=true 时以 .gz 文件下载。
+    """
+    media_type, headers = export_headers(fmt, gzip)
+    return ExportResponse(export_personnel_service(fmt, gzip), media_type=media_type, headers=headers)
+
+
+## =================================================================
+## GET /personnel/changes (变更日志：长轮询 / SSE)
+## =================================================================
+@router.get(
+    "/changes",
+    response_model=PersonnelChanges,
+    summary="返回游标之后新增、修改和删除的记录 (支持长轮询)"
+)
+async def get_personnel_changes_route(
+    since: Optional[str] = Query(None, description="上次返回的 cursor；不指定时只返回当前游标"),
+    wait: int = Query(0, ge=0, le=MAX_CHANGES_WAIT, description="没有新变更时最多等待的秒数 (长轮询)")
+):
+    """
+    客户端先取得当前游标再加载列表，之后用 since 只取回变化的记录，不必在每次写操作后重新下载整张表。
+    - 同一学号多次变化只返回一次当前状态；一次最多返回 1000 个学号，more 为真时立即继续读取。
+    - 游标过旧 (超出变更日志保留范围) 或服务已重启时 resync 为真，客户端应重新加载列表。
+    - 路由为 async def：等待在事件循环中进行，不占用线程池；读取数据库在线程池中执行。
+    """
+    if wait:
+        await change_log.wait(since, wait)
+    return json_response(await run_in_threadpool(get_personnel_changes_service, since))
+
+
+@router.get(
+    "/changes/stream",
+    response_class=StreamingResponse,
+    summary="以 Server-Sent Events 推送变更"
+)
+async def stream_personnel_changes_route(
+    request: Request,
+    since: Optional[str] = Query(None, description="起始游标；不指定时使用 Last-Event-ID 请求头，都没有时从当前开始")
+):
+    """
+    事件：ready (连接建立，data 中为当前游标)、changes (数据同 GET /personnel/changes)、resync (需重新加载列表)。
+    每个事件的 id 为游标，浏览器 EventSource 断线重连时自动通过 Last-Event-ID 续传。
+    """
+    since = since or request.headers.get("last-event-id")
+    read = partial(run_in_threadpool, get_personnel_changes_service)
+    return StreamingResponse(stream_changes(change_log, since, read), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 ## =================================================================
 ## 2. GET /personnel/{student_id} (查询单条记录)
 ## =================================================================
@@ -55,13 +238,19 @@ def create_personnel_route(
 )
 def get_personnel_route(
     student_id: str, # URL 路径参数
+    request: Request,
+    response: Response,
     db: Session = DbDependency
 ):
     """
     根据学号查询人员的详细信息。
     - **服务层检查记录是否存在。**
     - 记录不存在返回 404 Not Found。
+    - 支持 ETag / If-None-Match，未变化时返回 304 且不查询数据库。
     """
+    not_modified = check_not_modified(request, response, "item", student_id)
+    if not_modified:
+        return not_modified
     # 直接调用服务层，服务层负责处理记录不存在的异常（404）
     return get_personnel_by_id_service(db, student_id)
 
@@ -72,21 +261,46 @@ def get_personnel_route(
 @router.get(
     "/",
     response_model=PersonnelCollection, # 使用包含列表的集合模型
-    summary="查询所有人员记录列表"
+    summary="分页查询人员记录列表"
 )
 def get_all_personnel_route(
+    request: Request,
+    response: Response,
     db: Session = DbDependency,
-    mode: str = "descend" # 可选的查询参数，用于排序
+    mode: str = "descend", # 可选的查询参数，用于排序
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, description=f"每页条数 (最大 {MAX_PAGE_LIMIT})"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next 游标"),
+    fields: Optional[str] = Query(None, description="只返回这些字段，逗号分隔，例如 id,name"),
+    tel: Optional[str] = Query(None, description="按手机号精确过滤"),
+    email: Optional[str] = Query(None, description="按邮箱精确过滤"),
+    created_after: Optional[datetime] = Query(None, description="创建时间不早于 (包含)"),
+    created_before: Optional[datetime] = Query(None, description="创建时间早于 (不包含)")
 ):
     """
-    获取系统中所有人员的列表。
+    分页获取系统中的人员列表。
     - 支持按 created_time 排序（mode: 'ascend' 或 'descend'）。
+    - 基于 (created_time, pid) 的键集分页，通过 next 游标翻页，每页开销与页深无关。
+    - count 为记录总数，来自独立的 COUNT 查询并短暂缓存；带过滤条件时为满足条件的记录数。
+    - fields 只从数据库读取并输出指定的列。
+    - tel / email / created_after / created_before 过滤均使用对应列上的索引。
+    - 支持 ETag / If-None-Match，未变化时返回 304 且不查询数据库。
+    - 数据库中的数据直接序列化为 JSON，跳过 response_model 的二次校验 (response_model 仅用于文档)。
     """
-    # 调用服务层获取列表
-    personnel_list = get_all_personnel_service(db, mode=mode)
-    
-    # 将列表包装到 PersonnelCollection 模型中返回
-    return {"items": personnel_list, "count": len(personnel_list)}
+    not_modified = check_not_modified(request, response, "list", mode, limit, cursor, fields,
+                                      tel, email, created_after, created_before)
+    if not_modified:
+        return not_modified
+    filters = resolve_list_filters(tel, email, created_after, created_before)
+
+    def build() -> bytes:
+        # 调用服务层获取本页数据和下一页游标
+        personnel_list, next_cursor = get_personnel_page_service(db, mode=mode, limit=limit, cursor=cursor,
+                                                                 fields=fields, filters=filters)
+        # 按 PersonnelCollection 的结构直接序列化
+        return dumps({"items": personnel_list, "count": count_personnel_service(db, filters), "next": next_cursor})
+
+    # 同时到达的相同请求 (例如大量浏览器同时打开页面) 只查询一次，共用同一份响应体
+    return json_bytes_response(read_flight.do(flight_key(request, "list"), build), response)
 
 
 
@@ -0,0 +1,196 @@
+# search.py - 进程内 n-gram 搜索索引 (姓名 / 兴趣 / 邮箱)
+#
+# 每个字段的值统一转小写后切成单字 (unigram) 和相邻双字 (bigram)，倒排到 pid 集合。
+# 查询时取查询串所有 n-gram 的倒排集合求交得到候选，再逐个核对前缀/子串，
+# 因此一次搜索只接触候选记录，不会扫描整张表；按字符切分，中文姓名无需分词。
+#
+# 与数据库的同步：
+# - 第一次搜索时全量加载一次 (build)。
+# - 写操作提交后通过 mark_dirty 登记涉及的学号，下次搜索前只重新读取这些学号 (refresh)。
+# - 每次登记带递增序号，并发刷新时只应用比已应用序号更新的结果，避免旧数据覆盖新数据。
+
+import threading
+from typing import Dict, Iterable, List, Set, Tuple
+
+# 参与搜索的字段
+SEARCH_FIELDS = ("name", "hobby", "email")
+MATCH_MODES = ("prefix", "substring")
+
+
+def normalize(text: str) -> str:
+    return text.strip().casefold()
+
+
+def ngrams(text: str) -> Set[str]:
+    """单字与相邻双字"""
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def query_grams(query: str) -> Set[str]:
+    """查询串用于求交的 n-gram：长度 1 用单字，否则用全部双字"""
+    if len(query) == 1:
+        return {query}
+    return {query[i:i + 2] for i in range(len(query) - 1)}
+
+
+class IncrementalIndex:
+    """
+    按学号增量同步的进程内索引的基类 (全量加载 + 按登记的学号刷新，见文件头说明)。
+    子类实现 _add (加入一行查询结果)、_remove (按学号移除) 和 _clear (清空)，均在持有 self._lock 时被调用。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built = False
+        self._seq = 0
+        self._dirty: Dict[str, int] = {}     # 学号 -> 登记序号
+        self._applied: Dict[str, int] = {}   # 学号 -> 已应用的登记序号
+        self._reset_seq = 0
+
+    @property
+    def built(self) -> bool:
+        return self._built
+
+    # --- 同步 ---
+    def mark_dirty(self, student_ids: Iterable[str]):
+        """写操作提交后调用：登记需要重新读取的学号 (包括修改学号时的新旧学号)。"""
+        with self._lock:
+            for student_id in student_ids:
+                self._seq += 1
+                self._dirty[student_id] = self._seq
+
+    def begin_build(self) -> int:
+        """全量加载前调用，返回当前登记序号，传给 finish_build。"""
+        with self._lock:
+            return self._seq
+
+    def reset(self):
+        """
+        清空索引，下次使用时重新全量加载 (无法得知哪些学号变化时调用，例如多 worker 模式下丢失了共享变更)。
+        reset 之前开始的全量加载结果不再采用。
+        """
+        with self._lock:
+            self._seq += 1
+            self._reset_seq = self._seq
+            self._built = False
+            self._dirty = {}
+            self._applied = {}
+            self._clear()
+
+    def finish_build(self, rows: Iterable, seq: int):
+        """
+        用全量查询结果 (Row) 建立索引。
+        - 加载开始前登记的学号已包含在查询结果中，清除；之后登记的保留，下次刷新。
+        """
+        with self._lock:
+            if self._built or seq < self._reset_seq:
+                return
+            for row in rows:
+                self._add(row)
+            self._dirty = {key: value for key, value in self._dirty.items() if value > seq}
+            self._built = True
+
+    def take_dirty(self) -> Dict[str, int]:
+        """取出待刷新的学号及其登记序号。"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            return dirty
+
+    def apply_refresh(self, dirty: Dict[str, int], rows: Iterable):
+        """
+        用按学号重新查询的结果刷新索引；dirty 为 take_dirty 的返回值。
+        查询结果中不存在的学号视为已删除。
+        """
+        found = {row.id: row for row in rows}
+        with self._lock:
+            for student_id, seq in dirty.items():
+                if self._applied.get(student_id, 0) >= seq:
+                    continue  # 已有更新的刷新结果
+                self._applied[student_id] = seq
+                self._remove(student_id)
+                row = found.get(student_id)
+                if row is not None:
+                    self._add(row)
+
+    def _add(self, row):
+        raise NotImplementedError
+
+    def _remove(self, student_id: str):
+        raise NotImplementedError
+
+    def _clear(self):
+        raise NotImplementedError
+
+
+class SearchIndex(IncrementalIndex):
+    """
+    线程安全的倒排索引，文档键为内部主键 pid。
+    - 文档内容: pid -> (学号, 各搜索字段的规范化值)
+    - 倒排表:   n-gram -> pid 集合
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._docs: Dict[int, Tuple[str, Tuple[str, ...]]] = {}
+        self._by_student_id: Dict[str, int] = {}
+        self._postings: Dict[str, Set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    # --- 查询 ---
+    def search(self, query: str, match: str = "substring") -> List[int]:
+        """返回匹配的 pid (升序)。"""
+        query = normalize(query)
+        if not query:
+            return []
+        with self._lock:
+            postings = [self._postings.get(gram) for gram in query_grams(query)]
+            if not all(postings):
+                return []
+            postings.sort(key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+            if match == "prefix":
+                matched = [pid for pid in candidates
+                           if any(value.startswith(query) for value in self._docs[pid][1])]
+            else:
+                matched = [pid for pid in candidates
+                           if any(query in value for value in self._docs[pid][1])]
+        matched.sort()
+        return matched
+
+    # --- 内部 (调用方持有锁) ---
+    def _clear(self):
+        self._docs.clear()
+        self._by_student_id.clear()
+        self._postings.clear()
+
+    def _add(self, row):
+        # 修改学号时同一 pid 可能仍以旧学号登记，先移除
+        self._remove_pid(row.pid)
+        values = tuple(normalize(getattr(row, field) or "") for field in SEARCH_FIELDS)
+        self._docs[row.pid] = (row.id, values)
+        self._by_student_id[row.id] = row.pid
+        for gram in set().union(*(ngrams(value) for value in values)):
+            self._postings.setdefault(gram, set()).add(row.pid)
+
+    def _remove(self, student_id: str):
+        pid = self._by_student_id.get(student_id)
+        if pid is not None:
+            self._remove_pid(pid)
+
+    def _remove_pid(self, pid: int):
+        doc = self._docs.pop(pid, None)
+        if doc is None:
+            return
+        student_id, values = doc
+        if self._by_student_id.get(student_id) == pid:
+            del self._by_student_id[student_id]
+        for gram in set().union(*(ngrams(value) for value in values)):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(pid)
+                if not posting:
+                    del self._postings[gram]
@@ -1,80 +1,569 @@
 # personnel_service.py - 服务层 (Business Logic)
 
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError, OperationalError, InterfaceError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from pydantic import ValidationError
 from fastapi import HTTPException
-from typing import List
+from typing import Iterator, List, Optional, Tuple
+from contextlib import contextmanager
+from datetime import datetime
+import base64
+import bisect
+import json
+import threading
+import time
+
+import orjson
 
 from dbCRUD import *
-from val import PersonnelCreate, PersonnelUpdate, PersonnelInDB 
+from dbRead import *
+from val import PersonnelCreate, PersonnelUpdate, PersonnelInDB, BatchOperation
+from val_bulk import validate_personnel_batch
+from config import settings
+from cache import RecordCache, NOT_FOUND
+from search import SearchIndex
+from digest import DigestIndex, BUCKET_COUNT, parse_buckets
+from stats import stat_deltas, format_stats
+from fastjson import PERSONNEL_FIELDS
+from export import ExportEncoder, EXPORT_CHUNK_SIZE
+from changes import ChangeLog, build_changes_result
+from database import TIMEZONE_CN, engine, SessionLocal
+from etag import table_version
+from replica import write_position, REPLICA_POSITION
+
+
+
+def encode_cached_personnel(person: PersonnelInDB) -> bytes:
+    """共享记录缓存中存放的 JSON"""
+    return orjson.dumps(person.model_dump())
+
+
+def decode_cached_personnel(data: dict) -> PersonnelInDB:
+    # 缓存中的数据写入前已校验，跳过校验直接构造
+    data["created_time"] = datetime.fromisoformat(data["created_time"])
+    return PersonnelInDB.model_construct(**data)
+
+
+# 姓名 / 兴趣 / 邮箱的 n-gram 搜索索引，进程内共享
+search_index = SearchIndex()
+# 增量同步用的内容摘要树，进程内共享
+digest_index = DigestIndex()
+if settings.shared_cache_path:
+    # 多 worker 模式：记录缓存、表版本号和变更通知放在同一台机器上所有 worker 共享的内存中 (见 shared_cache.py)
+    from shared_cache import SharedSegment, SharedRecordCache, SharedChangeRing, RING_INSERTED, RING_COUNT_CHANGED
+    shared_segment = SharedSegment(settings.shared_cache_path, capacity=settings.record_cache_size)
+    table_version.share(shared_segment)
+    write_position.share(shared_segment)
+    shared_changes = SharedChangeRing(shared_segment)
+    record_cache = SharedRecordCache(
+        shared_segment, encode_cached_personnel, decode_cached_personnel,
+        ttl=settings.record_cache_ttl,
+        negative_ttl=settings.record_cache_negative_ttl,
+        stale_if_error=settings.record_cache_stale_if_error,
+    )
+    # 最近写操作涉及的学号 (GET /personnel/changes)，与共享变更环的序号一致，游标可以发给任意 worker
+    change_log = ChangeLog(settings.change_log_size, boot_id=shared_segment.boot_id, start_seq=shared_changes.last_seq)
+else:
+    shared_changes = None
+    # 单条记录读穿缓存 (按学号)，进程内共享
+    record_cache = RecordCache(
+        max_size=settings.record_cache_size,
+        ttl=settings.record_cache_ttl,
+        negative_ttl=settings.record_cache_negative_ttl,
+        stale_if_error=settings.record_cache_stale_if_error,
+    )
+    # 最近写操作涉及的学号 (GET /personnel/changes)，进程内共享
+    change_log = ChangeLog(settings.change_log_size)
+_shared_sync_lock = threading.Lock()
+# 视为“数据库不可用”的异常，stale_if_error 开启时返回缓存旧值
+DB_UNAVAILABLE_ERRORS = (OperationalError, InterfaceError, PoolTimeoutError)
+
+
+def notify_personnel_changed(student_ids, count_changed: bool = False, inserted=()):
+    """
+    写操作提交后统一调用 (同步/异步服务层共用)。
+    - 使涉及学号的记录缓存失效 (包括修改学号时的新旧学号)。
+    - 新增/删除时使记录总数缓存失效。
+    - 递增表版本号，使之前下发的 ETag 失效。
+    - 登记搜索索引和摘要树需要刷新的学号。
+    - 追加到变更日志并唤醒等待中的长轮询 / SSE；inserted 为其中新出现的学号。
+    多 worker 模式下记录缓存与表版本号直接在共享内存中修改，其余通过共享变更环通知所有 worker (包括本进程)。
+    读写分离时先登记写入位置 (replica.py)，之后开始的副本读取才会写入上述缓存。
+    """
+    student_ids = list(student_ids)
+    write_position.mark()
+    table_version.bump()
+    record_cache.invalidate(*student_ids)
+    if shared_changes is not None:
+        shared_changes.publish(student_ids, inserted, count_changed)
+        sync_shared_changes()
+        return
+    search_index.mark_dirty(student_ids)
+    digest_index.mark_dirty(student_ids)
+    change_log.append(student_ids, inserted)
+    if count_changed:
+        invalidate_count_cache()
+
+
+def session_is_current(db) -> bool:
+    """
+    会话是否包含本进程已提交的全部写入：主库会话总是包含；只读副本会话落后时，查询结果不写入进程内缓存。
+    须在读取缓存代数 (lookup / get_cached_count / take_dirty 等) 之后调用。
+    """
+    return write_position.covers(db.info.get(REPLICA_POSITION))
+
+
+@contextmanager
+def consistent_session(db: Session):
+    """db 包含本进程全部写入时直接使用，否则 (只读副本落后) 临时打开主库会话"""
+    if session_is_current(db):
+        yield db
+    else:
+        with SessionLocal() as primary:
+            yield primary
+
+
+def sync_shared_changes():
+    """
+    多 worker 模式：把其他 worker (以及本进程) 发布到共享变更环的变更应用到进程内的搜索索引、摘要树、
+    变更日志和记录总数缓存。读取这些数据前调用，main.py 中的后台任务也定期调用；没有新变更时不加锁。
+    """
+    if shared_changes is None or not shared_changes.pending():
+        return
+    with _shared_sync_lock:
+        entries, lost, seq = shared_changes.poll()
+        if lost:
+            # 落后超过变更环容量，无法得知哪些学号变化：索引全量重建，变更日志的游标全部要求重新同步
+            search_index.reset()
+            digest_index.reset()
+            change_log.reset(seq)
+            invalidate_count_cache()
+            return
+        if not entries:
+            return
+        student_ids = [student_id for student_id, _ in entries]
+        search_index.mark_dirty(student_ids)
+        digest_index.mark_dirty(student_ids)
+        change_log.extend((student_id, bool(flags & RING_INSERTED)) for student_id, flags in entries)
+        if any(flags & RING_COUNT_CHANGED for _, flags in entries):
+            invalidate_count_cache()
 
 # 新增人员 POST
 def create_personnel_service(db: Session, person_in: PersonnelCreate) -> PersonnelInDB:
     """
     业务逻辑：新增人员。
-    - 检查学号是否已存在 (业务唯一性检查)。
-    - 调用 CRUD 层进行创建。
+    - 调用 CRUD 层直接插入，学号唯一性由数据库唯一索引保证。
+    - 唯一索引冲突 (IntegrityError) 转换为 409。
     """
-    # 业务检查: 检查学号是否已存在
-    db_person = get_personnel_by_student_id(db, person_in.id)
-    if db_person:
+    try:
+        new_person = create_personnel(db, person_in)
+    except IntegrityError:
+        db.rollback()
         # 如果学号存在，抛出 409 冲突异常
-        raise HTTPException(status_code=409, detail=f"新增失败：学号 {person_in.id} 已存在于系统中。")  
-    # 调用 CRUD 层创建记录 (CRUD 返回 ORM 对象)
-    new_person_orm = create_personnel(db, person_in)
-    # 将 ORM 对象转换为 Pydantic 响应模型
-    return PersonnelInDB.model_validate(new_person_orm)
+        raise HTTPException(status_code=409, detail=f"新增失败：学号 {person_in.id} 已存在于系统中。")
+    notify_personnel_changed([person_in.id], count_changed=True, inserted=[person_in.id])
+    # 用已知字段构造 Pydantic 响应模型
+    return PersonnelInDB.model_validate(new_person)
 
 
 # --- 2. 查询单个人员 (READ - GET /personnel/{id}) ---
-def get_personnel_by_id_service(db: Session, student_id: str) -> PersonnelInDB:
+def lookup_cached_personnel(student_id: str) -> Tuple[Optional[PersonnelInDB], int]:
     """
-    业务逻辑：根据学号 (id) 查询单个人员。
-    - 检查记录是否存在。
+    先查记录缓存 (同步/异步服务层共用)。
+    - 负缓存命中直接抛出 404。
+    :return: (缓存的记录，未命中为 None, 缓存代数)
+    """
+    cached, generation = record_cache.lookup(student_id)
+    if cached is NOT_FOUND:
+        raise HTTPException(status_code=404, detail=f"查询失败：未找到学号 {student_id} 对应的记录。")
+    return cached, generation
+
+
+def cache_personnel_result(student_id: str, db_person, generation: int, store: bool = True) -> PersonnelInDB:
+    """
+    把数据库查询结果写入记录缓存并返回响应模型 (同步/异步服务层共用)。
+    - 记录不存在时写入负缓存并抛出 404。
+    - store 为假 (结果来自落后的只读副本) 时只返回，不写入缓存。
     """
-    db_person = get_personnel_by_student_id(db, student_id)
     if not db_person:
+        if store:
+            record_cache.store(student_id, NOT_FOUND, generation)
         # 如果记录不存在，抛出 404 异常
         raise HTTPException(status_code=404, detail=f"查询失败：未找到学号 {student_id} 对应的记录。")
-        
-    # 将 ORM 对象转换为 Pydantic 响应模型
-    return PersonnelInDB.model_validate(db_person)
+    # 查询结果来自数据库 (写入时已校验)，直接构造响应模型，不再逐字段校验
+    person = PersonnelInDB.model_construct(**db_person._asdict())
+    if store:
+        record_cache.store(student_id, person, generation)
+    return person
 
 
-# --- 3. 查询所有人员 (LIST - GET /personnel) ---
-def get_all_personnel_service(db: Session, mode: str = "descend") -> List[PersonnelInDB]:
+def get_personnel_by_id_service(db: Session, student_id: str) -> PersonnelInDB:
     """
-    业务逻辑：查询所有人员列表。
-    - 直接调用 CRUD 层，处理排序逻辑。
+    业务逻辑：根据学号 (id) 查询单个人员。
+    - 先查记录缓存，未命中再查询数据库并回填。
+    - 数据库不可用且开启 stale_if_error 时，返回最后一次已知的值。
     """
-    personnel_list_orm = get_all_personnel(db, mode=mode)
-    
-    # 将 ORM 对象列表转换为 Pydantic 模型列表
-    return [PersonnelInDB.model_validate(p) for p in personnel_list_orm]
+    cached, generation = lookup_cached_personnel(student_id)
+    if cached is not None:
+        return cached
+    try:
+        db_person = get_personnel_by_student_id(db, student_id)
+    except DB_UNAVAILABLE_ERRORS:
+        stale = record_cache.get_stale(student_id)
+        if stale is None:
+            raise
+        return stale
+    return cache_personnel_result(student_id, db_person, generation, store=session_is_current(db))
+
+
+# --- 3. 分页查询人员 (LIST - GET /personnel) ---
+# 单页默认条数与服务端强制的最大条数
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 500
+# 记录总数缓存的有效期 (秒)
+COUNT_CACHE_TTL = 5.0
+
+_count_cache = {"value": None, "expires_at": 0.0, "generation": 0}
+_count_cache_lock = threading.Lock()
+
+
+def encode_cursor(mode: str, created_time: datetime, pid: int) -> str:
+    """将排序方式和本页最后一条记录的 (created_time, pid) 编码为不透明的游标字符串。"""
+    raw = json.dumps([mode, created_time.isoformat(), pid], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, mode: str) -> Tuple[datetime, int]:
+    """解析游标字符串，返回 (created_time, pid)；格式错误或与排序方式不符时抛出 400。"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_mode, created_time, pid = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        after = (datetime.fromisoformat(created_time), int(pid))
+    except (ValueError, TypeError, UnicodeError):
+        raise HTTPException(status_code=400, detail="查询失败：分页游标无效。")
+    if cursor_mode != mode:
+        raise HTTPException(status_code=400, detail="查询失败：分页游标与排序方式不匹配。")
+    return after
+
+
+def resolve_page_args(mode: str, limit: int, cursor: Optional[str]) -> Tuple[str, int, Optional[Tuple[datetime, int]]]:
+    """
+    规范化分页参数 (同步/异步服务层共用)。
+    - 未知的排序方式按降序处理，limit 超过上限时截断为 MAX_PAGE_LIMIT。
+    :return: (排序方式, 每页条数, 游标位置)
+    """
+    mode = "ascend" if mode == "ascend" else "descend"
+    limit = max(1, min(limit, MAX_PAGE_LIMIT))
+    after = decode_cursor(cursor, mode) if cursor else None
+    return mode, limit, after
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    解析 fields 参数 (逗号分隔的字段名)，去重并保持顺序；未指定时返回 None (全部字段)。
+    未知字段抛出 400。
+    """
+    if fields is None:
+        return None
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in PERSONNEL_FIELDS]
+    if not names or unknown:
+        raise HTTPException(status_code=400, detail=f"查询失败：fields 只能包含 {', '.join(PERSONNEL_FIELDS)}。")
+    return names
+
+
+def to_db_time(value: datetime) -> datetime:
+    """带时区的时间转换为数据库中存储的东八区本地时间 (不带时区)。"""
+    if value.tzinfo is not None:
+        value = value.astimezone(TIMEZONE_CN).replace(tzinfo=None)
+    return value
+
+
+def resolve_list_filters(tel: Optional[str] = None, email: Optional[str] = None,
+                         created_after: Optional[datetime] = None,
+                         created_before: Optional[datetime] = None) -> dict:
+    """
+    规范化列表过滤条件 (同步/异步服务层共用)，未指定的条件不出现在结果中。
+    - tel / email 精确匹配 (去除首尾空白，与写入时一致)。
+    - created_after 包含边界，created_before 不包含边界。
+    """
+    filters = {}
+    if tel is not None:
+        filters["tel"] = tel.strip()
+    if email is not None:
+        filters["email"] = email.strip()
+    if created_after is not None:
+        filters["created_after"] = to_db_time(created_after)
+    if created_before is not None:
+        filters["created_before"] = to_db_time(created_before)
+    return filters
+
+
+def build_page_result(rows, mode: str, limit: int,
+                      fields: Optional[Tuple[str, ...]] = None) -> Tuple[List[dict], Optional[str]]:
+    """
+    将多取一条的查询结果 (Row) 转换为 (本页数据, 下一页游标) (同步/异步服务层共用)。
+    - 数据写入时已校验，这里直接转换为 dict，不再逐行执行 PersonnelInDB 校验。
+    - Row 的列顺序与响应字段一致，_asdict() 即为响应数据。
+    - 指定 fields 时 Row 中请求的列在前，只输出这些列 (游标用的 created_time / pid 不输出)。
+    """
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(mode, last.created_time, last.pid)
+
+    if fields is None:
+        return [row._asdict() for row in rows], next_cursor
+    return [dict(zip(fields, row)) for row in rows], next_cursor
+
+
+def get_personnel_page_service(db: Session, mode: str = "descend", limit: int = DEFAULT_PAGE_LIMIT,
+                               cursor: Optional[str] = None, fields: Optional[str] = None,
+                               filters: Optional[dict] = None) -> Tuple[List[dict], Optional[str]]:
+    """
+    业务逻辑：按创建时间分页查询人员列表。
+    - 多查询一条用来判断是否还有下一页，有则返回下一页游标，否则为 None。
+    - fields 只查询并输出指定的列；filters 为 resolve_list_filters 的结果。
+    """
+    mode, limit, after = resolve_page_args(mode, limit, cursor)
+    columns = parse_fields(fields)
+    rows = get_personnel_page(db, mode=mode, limit=limit + 1, after=after, fields=columns, filters=filters)
+    return build_page_result(rows, mode, limit, columns)
+
+
+def get_cached_count() -> Tuple[Optional[int], int]:
+    """
+    读取记录总数缓存。
+    :return: (缓存的总数，过期或失效时为 None, 当前缓存代数)
+    """
+    with _count_cache_lock:
+        if _count_cache["value"] is not None and time.monotonic() < _count_cache["expires_at"]:
+            return _count_cache["value"], _count_cache["generation"]
+        return None, _count_cache["generation"]
+
+
+def store_cached_count(count: int, generation: int):
+    """写入记录总数缓存；查询期间缓存已被失效 (代数变化) 时丢弃结果。"""
+    with _count_cache_lock:
+        if _count_cache["generation"] == generation:
+            _count_cache["value"] = count
+            _count_cache["expires_at"] = time.monotonic() + COUNT_CACHE_TTL
+
+
+def count_personnel_service(db: Session, filters: Optional[dict] = None) -> int:
+    """
+    业务逻辑：查询记录总数。
+    - 结果缓存 COUNT_CACHE_TTL 秒，新增/删除时主动失效。
+    - 带过滤条件时直接统计 (走 tel / email / created_time 索引)，不缓存。
+    """
+    if filters:
+        return count_personnel(db, filters)
+    sync_shared_changes()
+    count, generation = get_cached_count()
+    if count is None:
+        count = count_personnel(db)
+        if session_is_current(db):
+            store_cached_count(count, generation)
+    return count
+
+
+def invalidate_count_cache():
+    """使记录总数缓存失效。"""
+    with _count_cache_lock:
+        _count_cache["value"] = None
+        _count_cache["generation"] += 1
+
+
+# --- 3.1 搜索人员 (SEARCH - GET /personnel/search) ---
+SEARCH_QUERY_MAX_LENGTH = 64
+
+
+def encode_search_cursor(match: str, query: str, pid: int) -> str:
+    """将匹配方式、查询串和本页最后一条记录的 pid 编码为游标。"""
+    raw = json.dumps(["search", match, query, pid], separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_search_cursor(cursor: str, match: str, query: str) -> int:
+    """解析搜索游标，返回上一页最后一条记录的 pid；格式错误或与本次查询不符时抛出 400。"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        kind, cursor_match, cursor_query, pid = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        pid = int(pid)
+    except (ValueError, TypeError, UnicodeError):
+        raise HTTPException(status_code=400, detail="搜索失败：分页游标无效。")
+    if kind != "search" or cursor_match != match or cursor_query != query:
+        raise HTTPException(status_code=400, detail="搜索失败：分页游标与查询条件不匹配。")
+    return pid
+
+
+def paginate_search(pids: List[int], match: str, query: str, limit: int,
+                    cursor: Optional[str]) -> Tuple[List[int], Optional[str]]:
+    """
+    在升序的匹配 pid 列表上分页 (同步/异步服务层共用)。
+    :return: (本页 pid, 下一页游标)
+    """
+    limit = max(1, min(limit, MAX_PAGE_LIMIT))
+    start = bisect.bisect_right(pids, decode_search_cursor(cursor, match, query)) if cursor else 0
+    page = pids[start:start + limit]
+    next_cursor = None
+    if start + limit < len(pids):
+        next_cursor = encode_search_cursor(match, query, page[-1])
+    return page, next_cursor
+
+
+# 刷新索引时每条 IN 查询的学号数 (大批量写入后登记的学号可能很多)
+INDEX_REFRESH_CHUNK = 1000
+
+
+def sync_index(db: Session, index, load):
+    """
+    使用前同步进程内索引 (搜索索引 / 摘要树)：第一次使用时全量加载，之后只重新读取写操作登记过的学号。
+    :param load: load(db, ids=None) 读取全表或指定学号的行
+    只读副本落后于本进程的写入时改从主库读取 (在登记读取范围之后检查)，索引中不会留下旧数据。
+    """
+    sync_shared_changes()
+    if not index.built:
+        seq = index.begin_build()
+        with consistent_session(db) as source:
+            index.finish_build(load(source), seq)
+    dirty = index.take_dirty()
+    if dirty:
+        ids = list(dirty)
+        try:
+            with consistent_session(db) as source:
+                rows = [row for start in range(0, len(ids), INDEX_REFRESH_CHUNK)
+                        for row in load(source, ids[start:start + INDEX_REFRESH_CHUNK])]
+        except Exception:
+            index.mark_dirty(dirty)  # 读取失败，下次使用时重试
+            raise
+        index.apply_refresh(dirty, rows)
+
+
+def sync_search_index(db: Session):
+    sync_index(db, search_index, get_search_documents)
+
+
+def warm_up_indexes(db: Session):
+    """启动预热：加载搜索索引和摘要树 (配置 warmup_indexes 开启时)"""
+    sync_search_index(db)
+    sync_index(db, digest_index, get_digest_sources)
+
+
+def search_personnel_service(db: Session, query: str, match: str = "substring", limit: int = DEFAULT_PAGE_LIMIT,
+                             cursor: Optional[str] = None) -> Tuple[List[dict], int, Optional[str]]:
+    """
+    业务逻辑：按姓名 / 兴趣 / 邮箱搜索人员 (前缀或子串匹配，忽略大小写)。
+    - 通过 n-gram 索引求出匹配的 pid，本页记录用一条 pid IN 查询取回，不扫描全表。
+    - 结果按 pid 升序分页，count 为匹配总数。
+    :return: (本页数据, 匹配总数, 下一页游标)
+    """
+    sync_search_index(db)
+    pids = search_index.search(query, match)
+    page, next_cursor = paginate_search(pids, match, query, limit, cursor)
+    rows = get_personnel_by_pids(db, page)
+    return [row._asdict() for row in rows], len(pids), next_cursor
+
+
+# --- 3.2 人员统计 (STATS - GET /personnel/stats) ---
+def get_personnel_stats_service(db: Session, dimensions: Optional[List[str]] = None) -> dict:
+    """
+    业务逻辑：读取统计聚合表 (按兴趣 / 入学年份 / 创建日 / 创建周计数)。
+    - 计数由写操作在同一事务中增量维护，这里只读取分组行，开销与记录数无关。
+    - dimensions 指定只返回部分维度，为空时返回全部。
+    """
+    return format_stats(get_stats_rows(db), dimensions or None)
+
+
+# --- 3.3 内容摘要 (DIGEST - GET /personnel/digest) ---
+def resolve_digest_buckets(buckets: Optional[List[str]]) -> Optional[List[str]]:
+    """校验 bucket 参数 (同步/异步服务层共用)，非法时返回 400。"""
+    if not buckets:
+        return None
+    parsed = parse_buckets(buckets)
+    if parsed is None:
+        raise HTTPException(status_code=400, detail="bucket 必须是 00 ~ ff 之间的两位小写十六进制数。")
+    return parsed
+
+
+def build_digest_result(buckets: Optional[List[str]]) -> dict:
+    """由已同步的摘要树构造响应 (同步/异步服务层共用)。"""
+    root, count, digests = digest_index.summary()
+    result = {"buckets": BUCKET_COUNT, "count": count, "root": root}
+    if buckets is None:
+        result["digests"] = digests
+    else:
+        result["records"] = digest_index.records(buckets)
+    return result
+
+
+def get_personnel_digest_service(db: Session, buckets: Optional[List[str]] = None) -> dict:
+    """
+    业务逻辑：返回内容摘要，供客户端增量同步。
+    - 不指定 buckets 时返回根摘要和各非空桶的摘要；指定时返回这些桶内每条记录的摘要。
+    - 摘要树常驻内存，与搜索索引一样按写操作登记的学号增量刷新，不每次扫描全表。
+    """
+    buckets = resolve_digest_buckets(buckets)
+    sync_index(db, digest_index, get_digest_sources)
+    return build_digest_result(buckets)
+
+
+# --- 3.4 全表导出 (EXPORT - GET /personnel/export) ---
+def export_personnel_service(fmt: str = "csv", compress: bool = False) -> Iterator[bytes]:
+    """
+    业务逻辑：逐块导出全部人员记录，返回交给 StreamingResponse 的字节迭代器。
+    - 使用独立连接而不是请求的会话：响应体在路由函数返回后才开始发送，连接随迭代结束 (或客户端断开) 归还。
+    - 一条按 pid 排序的查询通过服务端游标每次读取 EXPORT_CHUNK_SIZE 行，导出内容为同一时刻的快照。
+    - 每块编码 (及压缩) 后立即输出，内存占用与表大小无关。
+    """
+    encoder = ExportEncoder(fmt, compress)
+    with engine.connect() as conn:
+        for rows in iter_export_chunks(conn, EXPORT_CHUNK_SIZE):
+            data = encoder.encode(rows)
+            if data:
+                yield data
+    yield encoder.finish()
+
+
+# --- 3.5 变更日志 (CHANGES - GET /personnel/changes) ---
+def get_personnel_changes_service(since: Optional[str] = None) -> dict:
+    """
+    业务逻辑：返回游标之后新增 / 修改 / 删除的记录，每个学号只返回一次当前状态。
+    - 使用独立的会话：长轮询和 SSE 在等待期间不占用请求会话，每次读取只有一条 IN 查询。
+    - 游标失效时 resync 为真，客户端应重新加载列表。
+    """
+    sync_shared_changes()
+    changed, cursor, resync, more = change_log.read(since)
+    rows = []
+    if changed:
+        with SessionLocal() as db:
+            rows = get_personnel_by_student_ids(db, list(changed))
+    return build_changes_result(changed, rows, cursor, resync, more)
 
 
 # 修改人员信息 (UPDATE - PUT/PATCH）
 def update_personnel_by_id_service(db: Session, student_id: str, person_update: PersonnelUpdate) -> PersonnelInDB:
     """
     业务逻辑：根据学号 (id) 修改人员信息。
-    - 检查请求体中的新学号 (如果存在) 是否与系统中其他记录冲突。
-    - 调用 CRUD 层进行更新。
-    """
-    # 如果请求中包含新的学号 (id)，需要进行唯一性检查
-    if person_update.id is not None and person_update.id != student_id:
-        # 查找系统中是否有其他记录使用了这个新学号
-        existing_person_with_new_id = get_personnel_by_student_id(db, person_update.id)
-        if existing_person_with_new_id:
-            # 如果找到记录，则冲突
-            raise HTTPException(
-                status_code=409, 
-                detail=f"修改失败：新的学号 {person_update.id} 已被其他记录占用。"
-            )
-    # 调用 CRUD 层执行更新操作
-    updated_person_orm = update_personnel_by_student_id(db, student_id, person_update)
-    if not updated_person_orm:
+    - 调用 CRUD 层执行更新，新学号的唯一性由数据库唯一索引保证。
+    - 唯一索引冲突 (IntegrityError) 转换为 409，记录不存在返回 404。
+    """
+    try:
+        updated_person = update_personnel_by_student_id(db, student_id, person_update)
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=409, 
+            detail=f"修改失败：新的学号 {person_update.id} 已被其他记录占用。"
+        )
+    if not updated_person:
         # 如果 CRUD 层返回 None，说明原学号不存在
         raise HTTPException(status_code=404, detail=f"修改失败：未找到学号 {student_id} 对应的记录。")
-    return PersonnelInDB.model_validate(updated_person_orm)
+    # 修改学号时，对按学号跟踪记录的客户端而言新学号是新增、旧学号是删除
+    notify_personnel_changed({student_id, updated_person["id"]}, inserted={updated_person["id"]} - {student_id})
+    return PersonnelInDB.model_validate(updated_person)
 
 
 # --- 5. 删除人员 (DELETE - DELETE /personnel/{id}) ---
@@ -87,9 +576,165 @@ def delete_personnel_by_id_service(db: Session, student_id: str) -> bool:
     
     # 调用 CRUD 层执行删除操作 (使用基于 ID 的 CRUD 函数)
     is_deleted = delete_personnel_by_student_id(db, student_id)
-    
     if not is_deleted:
         # 如果删除失败（CRUD 返回 False），说明学号不存在
         raise HTTPException(status_code=404, detail=f"删除失败：未找到学号 {student_id} 对应的记录。")
-        
-    return True # 返回 True 表示删除成功
\ No newline at end of file
+    notify_personnel_changed([student_id], count_changed=True)
+    return True # 返回 True 表示删除成功
+
+# --- 6. 批量操作 (BATCH - POST /personnel/batch) ---
+def _batch_item(index: int, op: str, student_id: Optional[str], status: int, detail=None) -> dict:
+    return {"index": index, "op": op, "id": student_id, "status": status, "detail": detail}
+
+
+def validate_batch(operations: List[BatchOperation]) -> Tuple[list, list]:
+    """
+    第一步：校验每个操作 (同步/异步服务层共用)。
+    - create 的数据整批交给 val_bulk 按列校验 (规则和错误信息与 PersonnelCreate 一致)。
+    - update 的数据逐条用 PersonnelUpdate 校验。
+    :return: (逐条结果，校验失败的位置已填入 422, 待执行的操作 [(下标, 类型, 学号, 数据)])
+    """
+    results = [None] * len(operations)
+    planned = []
+    creates = validate_personnel_batch(
+        [operation.data or {} for operation in operations if operation.op == "create"])
+    create_position = 0
+    for index, operation in enumerate(operations):
+        if operation.op == "create":
+            position, create_position = create_position, create_position + 1
+            record = creates.records[position]
+            if record is None:
+                data = operation.data or {}
+                results[index] = _batch_item(index, "create", data.get("id"), 422, creates.errors[position])
+                continue
+            planned.append((index, "create", record["id"], record))
+            continue
+
+        if not operation.id:
+            results[index] = _batch_item(index, operation.op, None, 422, "缺少目标学号 id。")
+            continue
+        if operation.op == "update":
+            try:
+                person_update = PersonnelUpdate.model_validate(operation.data or {})
+            except ValidationError as e:
+                results[index] = _batch_item(index, "update", operation.id, 422,
+                                             e.errors(include_url=False, include_context=False))
+                continue
+            # 显式传入的 null 视为不修改，避免写入非空列
+            planned.append((index, "update", operation.id, person_update.model_dump(exclude_none=True)))
+        else:
+            planned.append((index, "delete", operation.id, None))
+    return results, planned
+
+
+def collect_batch_ids(planned: list) -> List[str]:
+    """收集所有涉及的学号 (原学号和修改后的新学号)，用于一次 IN 查询。"""
+    affected_ids = set()
+    for _, op, student_id, payload in planned:
+        affected_ids.add(student_id)
+        if op == "update" and payload.get("id"):
+            affected_ids.add(payload["id"])
+    return list(affected_ids)
+
+
+def plan_batch(results: list, planned: list, existing: set) -> list:
+    """
+    第二步：按顺序在内存中模拟执行，判定冲突 (409) 与不存在 (404) (同步/异步服务层共用)。
+    :param existing: 涉及学号中已存在于系统中的部分，会被原地修改
+    :return: 合并后的写入分段 [[分段键, 行数据列表, 操作下标列表], ...]，相邻且同类的写操作合并为一段
+    """
+    segments = []
+    def add_to_segment(key, row, index):
+        if not segments or segments[-1][0] != key:
+            segments.append([key, [], []])
+        segments[-1][1].append(row)
+        segments[-1][2].append(index)
+
+    for index, op, student_id, payload in planned:
+        if op == "create":
+            if student_id in existing:
+                results[index] = _batch_item(index, op, student_id, 409, f"新增失败：学号 {student_id} 已存在于系统中。")
+                continue
+            existing.add(student_id)
+            add_to_segment(("create",), payload, index)
+            results[index] = _batch_item(index, op, student_id, 201)
+        elif op == "update":
+            if student_id not in existing:
+                results[index] = _batch_item(index, op, student_id, 404, f"修改失败：未找到学号 {student_id} 对应的记录。")
+                continue
+            new_id = payload.get("id")
+            if new_id is not None and new_id != student_id:
+                if new_id in existing:
+                    results[index] = _batch_item(index, op, student_id, 409, f"修改失败：新的学号 {new_id} 已被其他记录占用。")
+                    continue
+                existing.discard(student_id)
+                existing.add(new_id)
+            if payload:
+                fields = tuple(sorted(payload))
+                row = {"target_id": student_id}
+                row.update({f"v_{key}": value for key, value in payload.items()})
+                add_to_segment(("update", fields), row, index)
+            results[index] = _batch_item(index, op, student_id, 200)
+        else:
+            if student_id not in existing:
+                results[index] = _batch_item(index, op, student_id, 404, f"删除失败：未找到学号 {student_id} 对应的记录。")
+                continue
+            existing.discard(student_id)
+            add_to_segment(("delete",), student_id, index)
+            results[index] = _batch_item(index, op, student_id, 204)
+    return segments
+
+
+def fail_batch_segments(results: list, segments: list):
+    """写入时发生唯一索引冲突、整批回滚后，把本应成功的操作改记为 409。"""
+    for _, _, indexes in segments:
+        for index in indexes:
+            item = results[index]
+            results[index] = _batch_item(index, item["op"], item["id"], 409,
+                                         "批量操作失败：写入时发生学号冲突，本批次未生效，请重试。")
+
+
+def summarize_batch(results: list) -> dict:
+    """汇总逐条结果，构造 BatchResult 响应。"""
+    succeeded = sum(1 for item in results if item["status"] < 400)
+    return {"results": results, "succeeded": succeeded, "failed": len(results) - succeeded}
+
+
+def batch_personnel_service(db: Session, operations: List[BatchOperation]) -> dict:
+    """
+    业务逻辑：按顺序执行一组新增/修改/删除操作。
+    - create 整批按列校验，update 用 PersonnelUpdate 逐条校验，失败的操作记为 422。
+    - 用一条 IN 查询 (加行锁) 取出所有涉及学号的现状，在内存中按顺序判定 404 / 409。
+    - 通过判定的操作按相邻同类合并为多行语句，在同一个事务中写入。
+    - 写入后再读取一次涉及学号，按前后差值在同一事务中更新统计计数。
+    """
+    results, planned = validate_batch(operations)
+    affected_ids = collect_batch_ids(planned)
+    # 加行锁读取涉及学号的现状：既用于判定 404 / 409，也是统计差值的“写入前”数据
+    begin_write(db)
+    before = get_stat_sources_for_update(db, affected_ids)
+    segments = plan_batch(results, planned, {row.id for row in before})
+
+    # 第三步：按分段顺序执行多行语句，整批在一个事务中提交
+    if segments:
+        inserted = set()
+        try:
+            for key, rows, _ in segments:
+                if key[0] == "create":
+                    bulk_create_personnel(db, rows)
+                elif key[0] == "update":
+                    bulk_update_personnel(db, key[1], rows)
+                else:
+                    bulk_delete_personnel(db, rows)
+            after = get_stat_sources_for_update(db, affected_ids)
+            apply_stat_deltas(db, stat_deltas(removed=before, added=after))
+            db.commit()
+            inserted = {row.id for row in after} - {row.id for row in before}
+        except IntegrityError:
+            # 校验之后有其他请求写入了相同学号，整批回滚
+            db.rollback()
+            fail_batch_segments(results, segments)
+        notify_personnel_changed(affected_ids, count_changed=True, inserted=inserted)
+    else:
+        db.rollback()  # 释放行锁
+    return summarize_batch(results)
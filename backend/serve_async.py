@@ -0,0 +1,252 @@
+# serve_async.py - 异步服务层，与 serve.py 一一对应
+# 参数规范化、游标、总数缓存和批量判定等纯逻辑直接复用 serve.py。
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from fastapi import HTTPException
+from typing import AsyncIterator, List, Optional, Tuple
+from contextlib import asynccontextmanager
+
+from dbCRUD_async import *
+from val import PersonnelCreate, PersonnelUpdate, PersonnelInDB, BatchOperation
+from stats import stat_deltas, format_stats
+from export import ExportEncoder, EXPORT_CHUNK_SIZE
+from database_async import async_engine, AsyncSessionLocal
+from changes import build_changes_result
+from serve import (
+    DEFAULT_PAGE_LIMIT, resolve_page_args, parse_fields, build_page_result,
+    get_cached_count, store_cached_count, notify_personnel_changed,
+    search_index, paginate_search, change_log, INDEX_REFRESH_CHUNK, digest_index, resolve_digest_buckets, build_digest_result,
+    record_cache, DB_UNAVAILABLE_ERRORS, sync_shared_changes, session_is_current, lookup_cached_personnel, cache_personnel_result,
+    validate_batch, collect_batch_ids, plan_batch, fail_batch_segments, summarize_batch,
+)
+
+# 新增人员 POST
+async def create_personnel_service(db: AsyncSession, person_in: PersonnelCreate) -> PersonnelInDB:
+    """
+    业务逻辑：新增人员。
+    - 学号唯一性由数据库唯一索引保证，冲突 (IntegrityError) 转换为 409。
+    """
+    try:
+        new_person = await create_personnel(db, person_in)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=f"新增失败：学号 {person_in.id} 已存在于系统中。")
+    notify_personnel_changed([person_in.id], count_changed=True, inserted=[person_in.id])
+    return PersonnelInDB.model_validate(new_person)
+
+
+# --- 2. 查询单个人员 (READ - GET /personnel/{id}) ---
+async def get_personnel_by_id_service(db: AsyncSession, student_id: str) -> PersonnelInDB:
+    """
+    业务逻辑：根据学号 (id) 查询单个人员，与同步服务层共用记录缓存。
+    """
+    cached, generation = lookup_cached_personnel(student_id)
+    if cached is not None:
+        return cached
+    try:
+        db_person = await get_personnel_by_student_id(db, student_id)
+    except DB_UNAVAILABLE_ERRORS:
+        stale = record_cache.get_stale(student_id)
+        if stale is None:
+            raise
+        return stale
+    return cache_personnel_result(student_id, db_person, generation, store=session_is_current(db))
+
+
+# --- 3. 分页查询人员 (LIST - GET /personnel) ---
+async def get_personnel_page_service(db: AsyncSession, mode: str = "descend", limit: int = DEFAULT_PAGE_LIMIT,
+                                     cursor: Optional[str] = None, fields: Optional[str] = None,
+                                     filters: Optional[dict] = None) -> Tuple[List[dict], Optional[str]]:
+    """
+    业务逻辑：按创建时间分页查询人员列表。
+    - 多查询一条用来判断是否还有下一页，有则返回下一页游标，否则为 None。
+    - fields 只查询并输出指定的列；filters 为 resolve_list_filters 的结果。
+    """
+    mode, limit, after = resolve_page_args(mode, limit, cursor)
+    columns = parse_fields(fields)
+    rows = await get_personnel_page(db, mode=mode, limit=limit + 1, after=after, fields=columns, filters=filters)
+    return build_page_result(rows, mode, limit, columns)
+
+
+async def count_personnel_service(db: AsyncSession, filters: Optional[dict] = None) -> int:
+    """
+    业务逻辑：查询记录总数，与同步服务层共用同一份缓存；带过滤条件时直接统计，不缓存。
+    """
+    if filters:
+        return await count_personnel(db, filters)
+    sync_shared_changes()
+    count, generation = get_cached_count()
+    if count is None:
+        count = await count_personnel(db)
+        if session_is_current(db):
+            store_cached_count(count, generation)
+    return count
+
+
+# --- 3.1 搜索人员 (SEARCH - GET /personnel/search) ---
+@asynccontextmanager
+async def consistent_session(db: AsyncSession):
+    """同 serve.consistent_session：只读副本落后时临时打开主库会话"""
+    if session_is_current(db):
+        yield db
+    else:
+        async with AsyncSessionLocal() as primary:
+            yield primary
+
+
+async def sync_index(db: AsyncSession, index, load):
+    """使用前同步进程内索引，同 serve.sync_index (与同步服务层共用同一个索引)。"""
+    sync_shared_changes()
+    if not index.built:
+        seq = index.begin_build()
+        async with consistent_session(db) as source:
+            index.finish_build(await load(source), seq)
+    dirty = index.take_dirty()
+    if dirty:
+        ids = list(dirty)
+        try:
+            rows = []
+            async with consistent_session(db) as source:
+                for start in range(0, len(ids), INDEX_REFRESH_CHUNK):
+                    rows.extend(await load(source, ids[start:start + INDEX_REFRESH_CHUNK]))
+        except Exception:
+            index.mark_dirty(dirty)  # 读取失败，下次使用时重试
+            raise
+        index.apply_refresh(dirty, rows)
+
+
+async def sync_search_index(db: AsyncSession):
+    await sync_index(db, search_index, get_search_documents)
+
+
+async def warm_up_indexes(db: AsyncSession):
+    """启动预热：加载搜索索引和摘要树，同 serve.warm_up_indexes"""
+    await sync_search_index(db)
+    await sync_index(db, digest_index, get_digest_sources)
+
+
+async def search_personnel_service(db: AsyncSession, query: str, match: str = "substring",
+                                   limit: int = DEFAULT_PAGE_LIMIT,
+                                   cursor: Optional[str] = None) -> Tuple[List[dict], int, Optional[str]]:
+    """
+    业务逻辑：按姓名 / 兴趣 / 邮箱搜索人员，本页记录用一条 pid IN 查询取回。
+    """
+    await sync_search_index(db)
+    pids = search_index.search(query, match)
+    page, next_cursor = paginate_search(pids, match, query, limit, cursor)
+    rows = await get_personnel_by_pids(db, page)
+    return [row._asdict() for row in rows], len(pids), next_cursor
+
+
+# --- 3.2 人员统计 (STATS - GET /personnel/stats) ---
+async def get_personnel_stats_service(db: AsyncSession, dimensions: Optional[List[str]] = None) -> dict:
+    """
+    业务逻辑：读取统计聚合表，开销与记录数无关。
+    """
+    return format_stats(await get_stats_rows(db), dimensions or None)
+
+
+# --- 3.3 内容摘要 (DIGEST - GET /personnel/digest) ---
+async def get_personnel_digest_service(db: AsyncSession, buckets: Optional[List[str]] = None) -> dict:
+    """
+    业务逻辑：返回根摘要和分桶摘要，或指定桶内的记录摘要；与同步服务层共用同一棵摘要树。
+    """
+    buckets = resolve_digest_buckets(buckets)
+    await sync_index(db, digest_index, get_digest_sources)
+    return build_digest_result(buckets)
+
+
+# --- 3.4 全表导出 (EXPORT - GET /personnel/export) ---
+async def export_personnel_service(fmt: str = "csv", compress: bool = False) -> AsyncIterator[bytes]:
+    """
+    业务逻辑：逐块导出全部人员记录 (独立的异步连接 + 服务端游标)，同 serve.export_personnel_service。
+    """
+    encoder = ExportEncoder(fmt, compress)
+    async with async_engine.connect() as conn:
+        async for rows in iter_export_chunks(conn, EXPORT_CHUNK_SIZE):
+            data = encoder.encode(rows)
+            if data:
+                yield data
+    yield encoder.finish()
+
+
+# --- 3.5 变更日志 (CHANGES - GET /personnel/changes) ---
+async def get_personnel_changes_service(since: Optional[str] = None) -> dict:
+    """
+    业务逻辑：返回游标之后新增 / 修改 / 删除的记录 (独立的异步会话)，同 serve.get_personnel_changes_service。
+    """
+    sync_shared_changes()
+    changed, cursor, resync, more = change_log.read(since)
+    rows = []
+    if changed:
+        async with AsyncSessionLocal() as db:
+            rows = await get_personnel_by_student_ids(db, list(changed))
+    return build_changes_result(changed, rows, cursor, resync, more)
+
+
+# 修改人员信息 (UPDATE - PUT/PATCH）
+async def update_personnel_by_id_service(db: AsyncSession, student_id: str, person_update: PersonnelUpdate) -> PersonnelInDB:
+    """
+    业务逻辑：根据学号 (id) 修改人员信息。
+    - 唯一索引冲突 (IntegrityError) 转换为 409，记录不存在返回 404。
+    """
+    try:
+        updated_person = await update_personnel_by_student_id(db, student_id, person_update)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail=f"修改失败：新的学号 {person_update.id} 已被其他记录占用。"
+        )
+    if not updated_person:
+        raise HTTPException(status_code=404, detail=f"修改失败：未找到学号 {student_id} 对应的记录。")
+    notify_personnel_changed({student_id, updated_person["id"]}, inserted={updated_person["id"]} - {student_id})
+    return PersonnelInDB.model_validate(updated_person)
+
+
+# --- 5. 删除人员 (DELETE - DELETE /personnel/{id}) ---
+async def delete_personnel_by_id_service(db: AsyncSession, student_id: str) -> bool:
+    """
+    业务逻辑：根据学号 (id) 删除人员，学号不存在返回 404。
+    """
+    is_deleted = await delete_personnel_by_student_id(db, student_id)
+    if not is_deleted:
+        raise HTTPException(status_code=404, detail=f"删除失败：未找到学号 {student_id} 对应的记录。")
+    notify_personnel_changed([student_id], count_changed=True)
+    return True
+
+
+# --- 6. 批量操作 (BATCH - POST /personnel/batch) ---
+async def batch_personnel_service(db: AsyncSession, operations: List[BatchOperation]) -> dict:
+    """
+    业务逻辑：按顺序执行一组新增/修改/删除操作，判定规则与 serve.batch_personnel_service 相同。
+    """
+    results, planned = validate_batch(operations)
+    affected_ids = collect_batch_ids(planned)
+    # 加行锁读取涉及学号的现状：既用于判定 404 / 409，也是统计差值的“写入前”数据
+    await begin_write(db)
+    before = await get_stat_sources_for_update(db, affected_ids)
+    segments = plan_batch(results, planned, {row.id for row in before})
+
+    if segments:
+        inserted = set()
+        try:
+            for key, rows, _ in segments:
+                if key[0] == "create":
+                    await bulk_create_personnel(db, rows)
+                elif key[0] == "update":
+                    await bulk_update_personnel(db, key[1], rows)
+                else:
+                    await bulk_delete_personnel(db, rows)
+            after = await get_stat_sources_for_update(db, affected_ids)
+            await apply_stat_deltas(db, stat_deltas(removed=before, added=after))
+            await db.commit()
+            inserted = {row.id for row in after} - {row.id for row in before}
+        except IntegrityError:
+            await db.rollback()
+            fail_batch_segments(results, segments)
+        notify_personnel_changed(affected_ids, count_changed=True, inserted=inserted)
+    else:
+        await db.rollback()  # 释放行锁
+    return summarize_batch(results)
@@ -0,0 +1,373 @@
+# shared_cache.py - 多 worker 模式的共享内存状态 (记录缓存、代数与表版本号、变更环)
+#
+# uvicorn 以多个 worker 进程运行时，进程内的缓存每个 worker 各一份，写操作也只能使本进程的缓存失效。
+# 多 worker 模式 (python main.py --workers N) 下同一台机器上的所有 worker 映射同一个文件 (默认位于 /dev/shm)：
+# - 记录缓存：组相联哈希表，学号按哈希落到一组 (WAYS 个槽)，组满时淘汰最久未使用的槽；
+#   记录以 JSON 存放在固定大小的槽中，全机只有一份。读取不加锁，orjson 直接从映射内存 (memoryview) 解析，
+#   以槽的序号 (seqlock：修改期间为奇数) 检测并发修改，被修改时重试。
+# - 代数与表版本号：写操作提交后在共享内存中递增，所有 worker 立即可见
+#   (记录缓存写回前的代数检查、ETag、请求合并的键)。
+# - 变更环：写操作涉及的学号按序号追加到定长环形缓冲区，各 worker 读取后更新自己的搜索索引、摘要树、
+#   变更日志和记录总数缓存 (serve.sync_shared_changes)；读取这些数据前以及后台每 SHARED_POLL_INTERVAL 秒检查一次。
+# - 读写分离的写入位置 (replica.WritePosition.share)：同一台机器的 worker 共用一行复制心跳。
+# 修改共享内存时持有文件锁 (fcntl.flock) 和进程内的线程锁，因此只支持 Linux / Unix。
+# 过期时间使用 time.monotonic()，Linux 上为系统范围的 CLOCK_MONOTONIC，各进程一致。
+
+import fcntl
+import mmap
+import os
+import secrets
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Any, Callable, Hashable, Iterable, List, Optional, Tuple
+
+import orjson
+
+from cache import NOT_FOUND
+
+# 后台检查变更环的间隔 (秒)
+SHARED_POLL_INTERVAL = 0.01
+# 每组的槽数、槽大小 (字节，槽头与键之后为值) 与变更环容量
+DEFAULT_WAYS = 8
+DEFAULT_SLOT_SIZE = 1024
+DEFAULT_RING_CAPACITY = 65536
+
+_MAGIC = b"PRSNSHM1"
+# 文件头：magic, 槽总数, 每组槽数, 槽大小, 变更环容量, 启动标识 (变更日志游标的前缀)
+_HEADER = struct.Struct("<8sIIII8s")
+_HEADER_SIZE = 4096
+# 文件头中的 64 位计数器
+_U64 = struct.Struct("<Q")
+_GENERATION = 64
+_TABLE_VERSION = 72
+_RING_SEQ = 80
+_CACHE_SIZE = 88
+# 读写分离的心跳计数器：已开始的心跳序号、写入要求的心跳序号
+REPLICATION_STARTED = 96
+REPLICATION_REQUIRED = 104
+
+# 变更环的一项：序号, 标志, 学号长度, 学号 (学号列为 String(13))
+_RING_ENTRY = struct.Struct("<QBB22s")
+RING_INSERTED = 1
+RING_COUNT_CHANGED = 2
+
+# 槽头：序号 (奇数表示正在修改), 状态, 键长度, 值长度, 过期时间 (monotonic), 最近使用时间 (monotonic_ns)
+_SLOT = struct.Struct("<IBBHdQ")
+_SEQ = struct.Struct("<I")
+_LAST_USED_OFFSET = 16
+_KEY_OFFSET = _SLOT.size
+_MAX_KEY = 24
+_VALUE_OFFSET = _KEY_OFFSET + _MAX_KEY
+_EMPTY, _VALUE, _NOT_FOUND = 0, 1, 2
+# 读取时遇到并发修改的最多重试次数 (超过视为未命中)
+_READ_RETRIES = 8
+
+
+class SharedSegment:
+    """映射到内存的共享文件：文件头计数器、变更环和记录缓存槽"""
+
+    def __init__(self, path: str, capacity: int = 10000, ways: int = DEFAULT_WAYS,
+                 slot_size: int = DEFAULT_SLOT_SIZE, ring_capacity: int = DEFAULT_RING_CAPACITY):
+        """
+        打开共享文件；文件不存在或为空时按参数初始化 (第一个 worker 或启动器)，否则沿用文件中的布局。
+        :param capacity: 记录缓存的槽数，向上取整为 ways 的倍数；0 表示不缓存记录
+        """
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size == 0:
+                slots = -(-max(0, capacity) // ways) * ways
+                os.ftruncate(self._fd, _HEADER_SIZE + ring_capacity * _RING_ENTRY.size + slots * slot_size)
+                header = _HEADER.pack(_MAGIC, slots, ways, slot_size, ring_capacity, secrets.token_hex(4).encode())
+                os.pwrite(self._fd, header, 0)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._mm = mmap.mmap(self._fd, 0)
+        magic, self.slots, self.ways, self.slot_size, self.ring_capacity, boot_id = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} 不是共享缓存文件")
+        self.boot_id = boot_id.decode()
+        self.view = memoryview(self._mm)
+        self.ring_offset = _HEADER_SIZE
+        self.slots_offset = self.ring_offset + self.ring_capacity * _RING_ENTRY.size
+
+    @contextmanager
+    def lock(self):
+        """修改共享内存时持有：线程锁保证进程内互斥，flock 保证进程间互斥。"""
+        with self._thread_lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def read_counter(self, offset: int) -> int:
+        return _U64.unpack_from(self._mm, offset)[0]
+
+    def write_counter(self, offset: int, value: int):
+        """调用方持有 lock"""
+        _U64.pack_into(self._mm, offset, value)
+
+    def generation(self) -> int:
+        return self.read_counter(_GENERATION)
+
+    def table_version(self) -> int:
+        return self.read_counter(_TABLE_VERSION)
+
+    def bump_table_version(self):
+        with self.lock():
+            self.write_counter(_TABLE_VERSION, self.table_version() + 1)
+
+    def close(self):
+        self.view.release()
+        self._mm.close()
+        os.close(self._fd)
+
+
+class SharedRecordCache:
+    """
+    与 cache.RecordCache 接口相同的共享内存记录缓存 (LRU 在组内近似，TTL、负缓存、出错时返回旧值均相同)。
+    值通过 encode 序列化为 JSON 字节存放，读取时 orjson 解析后交给 decode 构造返回值。
+    命中/未命中等计数为本进程的计数，size 为全机的条目数。
+    """
+
+    def __init__(self, segment: SharedSegment, encode: Callable[[Any], bytes], decode: Callable[[Any], Any],
+                 ttl: float = 60.0, negative_ttl: float = 5.0, stale_if_error: bool = False):
+        self._segment = segment
+        self._encode = encode
+        self._decode = decode
+        self.max_size = segment.slots
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_if_error = stale_if_error
+        self._buckets = segment.slots // segment.ways if segment.slots else 0
+        self._max_value = segment.slot_size - _VALUE_OFFSET
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    @staticmethod
+    def _key_bytes(key: Hashable) -> Optional[bytes]:
+        """键编码为字节；超过槽内键长度上限的键不缓存 (返回 None)"""
+        data = str(key).encode("utf-8")
+        return data if len(data) <= _MAX_KEY else None
+
+    def _bucket(self, key: bytes) -> range:
+        """键所在组的各槽偏移"""
+        segment = self._segment
+        start = segment.slots_offset + zlib.crc32(key) % self._buckets * segment.ways * segment.slot_size
+        return range(start, start + segment.ways * segment.slot_size, segment.slot_size)
+
+    def _read(self, key: bytes) -> Optional[Tuple[int, int, Any, float]]:
+        """
+        不加锁读取键所在的槽。
+        :return: (槽偏移, 状态, 解析后的值, 过期时间)；不存在时为 None
+        """
+        mm, view = self._segment._mm, self._segment.view
+        for offset in self._bucket(key):
+            for _ in range(_READ_RETRIES):
+                seq, state, key_len, value_len, expires_at, _ = _SLOT.unpack_from(mm, offset)
+                if seq & 1:
+                    continue
+                if state == _EMPTY or key_len != len(key) or view[offset + _KEY_OFFSET:offset + _KEY_OFFSET + key_len] != key:
+                    if _SEQ.unpack_from(mm, offset)[0] == seq:
+                        break  # 不是这个键，检查下一个槽
+                    continue
+                value = None
+                if state == _VALUE:
+                    try:
+                        value = orjson.loads(view[offset + _VALUE_OFFSET:offset + _VALUE_OFFSET + value_len])
+                    except orjson.JSONDecodeError:
+                        continue  # 读取期间被修改
+                if _SEQ.unpack_from(mm, offset)[0] == seq:
+                    return offset, state, value, expires_at
+        return None
+
+    def lookup(self, key: Hashable) -> Tuple[Optional[Any], int]:
+        """
+        查询缓存。
+        :return: (缓存值，未命中为 None，负缓存命中为 NOT_FOUND, 当前代数，供 store 使用)
+        """
+        generation = self._segment.generation()
+        key = self._key_bytes(key) if self.enabled else None
+        found = self._read(key) if key is not None else None
+        if found is not None and time.monotonic() < found[3]:
+            offset, state, value, _ = found
+            # 最近使用时间只用于淘汰时的选择，不加锁写入
+            _U64.pack_into(self._segment._mm, offset + _LAST_USED_OFFSET, time.monotonic_ns())
+            if state == _NOT_FOUND:
+                self._count("negative_hits")
+                return NOT_FOUND, generation
+            self._count("hits")
+            return self._decode(value), generation
+        self._count("misses")
+        return None, generation
+
+    def store(self, key: Hashable, value: Any, generation: int):
+        """写入查询结果 (value 为 NOT_FOUND 表示负缓存)；generation 为 lookup 时返回的代数。"""
+        if not self.enabled:
+            return
+        key = self._key_bytes(key)
+        if key is None:
+            return
+        if value is NOT_FOUND:
+            state, data, ttl = _NOT_FOUND, b"", self.negative_ttl
+        else:
+            state, data, ttl = _VALUE, self._encode(value), self.ttl
+            if len(data) > self._max_value:
+                return  # 超过槽容量的记录不缓存
+        segment, mm = self._segment, self._segment._mm
+        with segment.lock():
+            if segment.generation() != generation:
+                return
+            # 同一个键的槽 > 空槽 > 组内最久未使用的槽
+            match = empty = oldest = None
+            oldest_used = 0
+            for offset in self._bucket(key):
+                _, slot_state, key_len, _, _, last_used = _SLOT.unpack_from(mm, offset)
+                if slot_state == _EMPTY:
+                    if empty is None:
+                        empty = offset
+                elif key_len == len(key) and mm[offset + _KEY_OFFSET:offset + _KEY_OFFSET + key_len] == key:
+                    match = offset
+                    break
+                elif oldest is None or last_used < oldest_used:
+                    oldest, oldest_used = offset, last_used
+            if match is not None:
+                victim = match
+            elif empty is not None:
+                victim = empty
+                segment.write_counter(_CACHE_SIZE, segment.read_counter(_CACHE_SIZE) + 1)
+            else:
+                victim = oldest
+                self._count("evictions")
+            self._write_slot(victim, state, key, data, time.monotonic() + ttl)
+
+    def _write_slot(self, offset: int, state: int, key: bytes = b"", data: bytes = b"", expires_at: float = 0.0):
+        """调用方持有锁：先把序号改为奇数，写入内容后再改为偶数"""
+        mm = self._segment._mm
+        seq = _SEQ.unpack_from(mm, offset)[0]
+        _SEQ.pack_into(mm, offset, seq + 1)
+        mm[offset + _KEY_OFFSET:offset + _KEY_OFFSET + len(key)] = key
+        mm[offset + _VALUE_OFFSET:offset + _VALUE_OFFSET + len(data)] = data
+        _SLOT.pack_into(mm, offset, (seq + 2) & 0xFFFFFFFF, state, len(key), len(data), expires_at,
+                        time.monotonic_ns())
+
+    def get_stale(self, key: Hashable) -> Optional[Any]:
+        """数据库不可用时取最后一次已知的值 (忽略有效期)；未开启 stale_if_error 或没有旧值时返回 None。"""
+        if not self.stale_if_error or not self.enabled:
+            return None
+        key = self._key_bytes(key)
+        found = self._read(key) if key is not None else None
+        if found is None or found[1] != _VALUE:
+            return None
+        self._count("stale_hits")
+        return self._decode(found[2])
+
+    def invalidate(self, *keys: Hashable):
+        """删除指定键的缓存条目，并使所有 worker 进行中的查询结果作废。"""
+        segment, mm = self._segment, self._segment._mm
+        with segment.lock():
+            segment.write_counter(_GENERATION, segment.generation() + 1)
+            if not self.enabled:
+                return
+            removed = 0
+            for key in filter(None, map(self._key_bytes, keys)):
+                for offset in self._bucket(key):
+                    _, state, key_len, _, _, _ = _SLOT.unpack_from(mm, offset)
+                    if (state != _EMPTY and key_len == len(key)
+                            and mm[offset + _KEY_OFFSET:offset + _KEY_OFFSET + key_len] == key):
+                        self._write_slot(offset, _EMPTY)
+                        removed += 1
+                        break
+            if removed:
+                segment.write_counter(_CACHE_SIZE, segment.read_counter(_CACHE_SIZE) - removed)
+
+    def clear(self):
+        segment, mm = self._segment, self._segment._mm
+        with segment.lock():
+            segment.write_counter(_GENERATION, segment.generation() + 1)
+            for index in range(self.max_size):
+                offset = segment.slots_offset + index * segment.slot_size
+                if _SLOT.unpack_from(mm, offset)[1] != _EMPTY:
+                    self._write_slot(offset, _EMPTY)
+            segment.write_counter(_CACHE_SIZE, 0)
+
+    def stats(self) -> dict:
+        """命中/未命中等计数器 (本进程)，size 为所有 worker 共享的条目数"""
+        with self._stats_lock:
+            return {
+                "size": self._segment.read_counter(_CACHE_SIZE),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "stale_hits": self.stale_hits,
+                "evictions": self.evictions,
+                "shared": True,
+            }
+
+
+class SharedChangeRing:
+    """共享变更环：写操作追加 (学号, 标志)，每个进程记录自己已读取到的序号"""
+
+    def __init__(self, segment: SharedSegment):
+        self._segment = segment
+        self._last = segment.read_counter(_RING_SEQ)
+
+    @property
+    def last_seq(self) -> int:
+        """本进程已读取到的序号"""
+        return self._last
+
+    def publish(self, student_ids: Iterable[str], inserted: Iterable[str] = (), count_changed: bool = False):
+        segment = self._segment
+        inserted = set(inserted)
+        with segment.lock():
+            seq = segment.read_counter(_RING_SEQ)
+            for student_id in student_ids:
+                seq += 1
+                raw = student_id.encode("utf-8")
+                flags = (RING_INSERTED if student_id in inserted else 0) | (RING_COUNT_CHANGED if count_changed else 0)
+                _RING_ENTRY.pack_into(segment._mm, segment.ring_offset + seq % segment.ring_capacity * _RING_ENTRY.size,
+                                      seq, flags, len(raw), raw)
+            segment.write_counter(_RING_SEQ, seq)
+
+    def pending(self) -> bool:
+        """是否有本进程尚未读取的项 (不加锁)"""
+        return self._segment.read_counter(_RING_SEQ) != self._last
+
+    def poll(self) -> Tuple[List[Tuple[str, int]], bool, int]:
+        """
+        读取上次之后追加的项。
+        :return: ([(学号, 标志)], 是否丢失了项 (落后超过环容量，此时列表为空), 读取到的序号)
+        """
+        segment = self._segment
+        with segment.lock():
+            seq = segment.read_counter(_RING_SEQ)
+            if seq - self._last > segment.ring_capacity:
+                self._last = seq
+                return [], True, seq
+            entries = []
+            for entry_seq in range(self._last + 1, seq + 1):
+                _, flags, length, raw = _RING_ENTRY.unpack_from(
+                    segment._mm, segment.ring_offset + entry_seq % segment.ring_capacity * _RING_ENTRY.size)
+                entries.append((raw[:length].decode("utf-8"), flags))
+            self._last = seq
+        return entries, False, seq
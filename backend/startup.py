@@ -0,0 +1,236 @@
+# startup.py - 启动预热与存活/就绪检查 (main.py 的 lifespan 和 /healthz、/readyz 使用)
+#
+# 引擎在导入时创建，但连接池里的连接要到第一次使用时才建立：冷启动后的第一批请求要付出
+# 建立数据库连接 (MySQL 握手、认证) 和编译 SQL 语句的开销。应用启动后在后台预热：
+# - connections: 预先建立 warmup_connections 个连接并放回连接池；
+# - statements: 执行一遍各读接口使用的预构造语句，填充 SQLAlchemy 的编译缓存 (同时把索引页读入数据库缓存)，
+#   并读取一次记录总数放入计数缓存 (列表接口每页都返回 count)；
+# - indexes: (warmup_indexes 开启时) 加载搜索索引和摘要树。
+# 预热期间 /healthz 已返回 200 (进程存活)，/readyz 返回 503；预热完成后 /readyz 每次检查数据库可用才返回 200，
+# 负载均衡据此决定是否转发流量。预热失败 (例如数据库暂不可用) 时按退避间隔重试。
+# 从进程启动到就绪的耗时超过 startup_budget_seconds 时输出 WARNING 日志。
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import anyio
+from sqlalchemy import text
+
+logger = logging.getLogger("personnel.startup")
+
+# 预热失败后的重试间隔 (秒)，按次数翻倍直到上限
+WARMUP_RETRY_INITIAL = 1.0
+WARMUP_RETRY_MAX = 30.0
+# /readyz 数据库检查的超时时间 (秒)
+READY_CHECK_TIMEOUT = 2.0
+
+WarmupPhase = Tuple[str, Callable[[], Awaitable]]
+
+
+def process_start_time() -> float:
+    """进程启动时刻 (time.time())；Linux 从 /proc 读取，其他平台取本模块导入的时刻。"""
+    try:
+        with open("/proc/self/stat") as f:
+            # 进程名可能含空格，从最后一个 ")" 之后数字段；starttime 是第 22 个字段 (开机后的时钟滴答数)
+            start_ticks = int(f.read().rpartition(")")[2].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - uptime + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return time.time()
+
+
+class Readiness:
+    """启动预热的进度与耗时，进程内共享"""
+
+    def __init__(self):
+        self.process_started = process_start_time()
+        self.ready = False
+        self.error: Optional[str] = None
+        # 各阶段耗时 (秒)；import 为进程启动到开始预热 (解释器启动、导入模块、创建应用)
+        self.phases: Dict[str, float] = {}
+        self.startup_seconds: Optional[float] = None
+
+    async def warm_up(self, phases: List[WarmupPhase], budget: float):
+        """依次执行预热阶段，全部成功后标记为就绪；失败时记录错误并按退避间隔从头重试。"""
+        self.phases["import"] = max(0.0, time.time() - self.process_started)
+        delay = WARMUP_RETRY_INITIAL
+        while True:
+            try:
+                for name, run in phases:
+                    start = time.perf_counter()
+                    await run()
+                    self.phases[name] = time.perf_counter() - start
+                break
+            except Exception as e:
+                self.error = f"{type(e).__name__}: {e}"
+                logger.warning("启动预热失败，%.0f 秒后重试: %s", delay, self.error)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, WARMUP_RETRY_MAX)
+        self.error = None
+        self.startup_seconds = time.time() - self.process_started
+        self.ready = True
+        detail = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in self.phases.items())
+        if self.startup_seconds > budget:
+            logger.warning("启动耗时 %.2f s 超过预算 %.2f s (%s)", self.startup_seconds, budget, detail)
+        else:
+            logger.info("启动完成，耗时 %.2f s (%s)", self.startup_seconds, detail)
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "startup_seconds": self.startup_seconds,
+            "phases": self.phases,
+            "error": self.error,
+        }
+
+
+readiness = Readiness()
+
+
+# --- 预热步骤 ---
+def warmup_queries() -> list:
+    """读接口使用的预构造语句及示例参数 (参数值不影响编译缓存的键)"""
+    from dbRead import page_query, STMT_BY_PID, STMT_BY_STUDENT_ID, STMT_BY_STUDENT_IDS
+    from stats import STMT_STATS
+    after = (datetime(2000, 1, 1), 0)
+    queries = [
+        (STMT_BY_STUDENT_ID, {"student_id": ""}),
+        (STMT_BY_PID, {"pid": 0}),
+        (STMT_BY_STUDENT_IDS, {"ids": [""]}),
+        (STMT_STATS, {}),
+    ]
+    for mode in ("descend", "ascend"):
+        queries.append(page_query(mode, 1))
+        queries.append(page_query(mode, 1, after))
+    return queries
+
+
+def prime_statements(conn) -> int:
+    """在一个连接上执行一遍 warmup_queries (只读，结束时回滚)"""
+    queries = warmup_queries()
+    for stmt, params in queries:
+        conn.execute(stmt, params).all()
+    return len(queries)
+
+
+def open_pool_connections(engine, count: int) -> int:
+    """同时借出 count 个连接 (不足的由连接池新建)，各执行一次 SELECT 1 后全部归还。"""
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(engine.connect())
+            connections[-1].execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+    return len(connections)
+
+
+async def open_pool_connections_async(async_engine, count: int) -> int:
+    """open_pool_connections 的异步版本"""
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(await async_engine.connect())
+            await connections[-1].execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            await connection.close()
+    return len(connections)
+
+
+def ping(engine):
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+
+async def ping_async(async_engine):
+    async with async_engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+
+def sync_warmup_phases(engine, connections: int, load_indexes: bool, replica_engine=None) -> List[WarmupPhase]:
+    """同步模式的预热阶段：阻塞操作在线程池中执行，不占用事件循环；配置了只读副本时副本同样预热。"""
+    engines = [engine] + ([replica_engine] if replica_engine is not None else [])
+
+    def open_connections():
+        return sum(open_pool_connections(e, connections) for e in engines)
+
+    def prime():
+        from serve import count_personnel_service
+        from database import SessionLocal
+        if replica_engine is not None:
+            with replica_engine.connect() as connection:
+                prime_statements(connection)
+        with SessionLocal() as db:
+            prime_statements(db.connection())
+            count_personnel_service(db)
+
+    def indexes():
+        from serve import warm_up_indexes
+        from database import SessionLocal
+        with SessionLocal() as db:
+            warm_up_indexes(db)
+
+    phases = [
+        ("connections", lambda: anyio.to_thread.run_sync(open_connections)),
+        ("statements", lambda: anyio.to_thread.run_sync(prime)),
+    ]
+    if load_indexes:
+        phases.append(("indexes", lambda: anyio.to_thread.run_sync(indexes)))
+    return phases
+
+
+def async_warmup_phases(async_engine, connections: int, load_indexes: bool,
+                        async_replica_engine=None) -> List[WarmupPhase]:
+    """异步模式的预热阶段；配置了只读副本时副本同样预热。"""
+    async def open_connections():
+        opened = await open_pool_connections_async(async_engine, connections)
+        if async_replica_engine is not None:
+            opened += await open_pool_connections_async(async_replica_engine, connections)
+        return opened
+
+    async def prime():
+        from serve_async import count_personnel_service
+        from database_async import AsyncSessionLocal
+        if async_replica_engine is not None:
+            async with async_replica_engine.connect() as connection:
+                await connection.run_sync(prime_statements)
+        async with AsyncSessionLocal() as db:
+            await (await db.connection()).run_sync(prime_statements)
+            await count_personnel_service(db)
+
+    async def indexes():
+        from serve_async import warm_up_indexes
+        from database_async import AsyncSessionLocal
+        async with AsyncSessionLocal() as db:
+            await warm_up_indexes(db)
+
+    phases = [
+        ("connections", open_connections),
+        ("statements", prime),
+    ]
+    if load_indexes:
+        phases.append(("indexes", indexes))
+    return phases
+
+
+async def check_ready(ping_database: Callable[[], Awaitable]) -> Tuple[bool, dict]:
+    """
+    就绪检查：预热已完成，且数据库在 READY_CHECK_TIMEOUT 秒内响应。
+    :return: (是否就绪, 响应内容)
+    """
+    result = readiness.status()
+    if not readiness.ready:
+        return False, {"status": "starting", **result}
+    try:
+        with anyio.fail_after(READY_CHECK_TIMEOUT):
+            await ping_database()
+    except Exception as e:
+        return False, {"status": "unavailable", **result, "error": f"{type(e).__name__}: {e}"}
+    return True, {"status": "ready", **result}
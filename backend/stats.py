@@ -0,0 +1,170 @@
+# stats.py - 人员统计聚合 (按兴趣 / 入学年份 / 创建日 / 创建周计数)
+#
+# 计数保存在 student_stats 表中，每个 (维度, 分组) 一行。
+# 新增 / 修改 / 删除人员时，在同一事务中按差值增减对应分组 (数据库原子的 upsert: count = count + 差值)，
+# 因此读取统计只需要读取分组行，与记录数无关；并发写入时各自的增减互不覆盖。
+#
+# 重新计算全部计数 (例如首次部署或数据被绕过接口修改后):
+#   python stats.py rebuild
+
+import argparse
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, delete, insert, update, bindparam, text
+from sqlalchemy.orm import Session
+
+from database import Personnel, PersonnelStat, TIMEZONE_CN
+
+STATS_DIMENSIONS = ("hobby", "year", "day", "week")
+
+_stats = PersonnelStat.__table__
+_people = Personnel.__table__
+# 计算分组需要的列
+STAT_SOURCE_COLUMNS = (_people.c.id, _people.c.hobby, _people.c.created_time)
+
+
+def stat_buckets(student_id: str, hobby: str, created_time: datetime) -> Tuple[Tuple[str, str], ...]:
+    """一条记录所属的全部 (维度, 分组)"""
+    if created_time.tzinfo is not None:
+        created_time = created_time.astimezone(TIMEZONE_CN).replace(tzinfo=None)
+    year, week, _ = created_time.isocalendar()
+    return (
+        ("hobby", hobby),
+        ("year", student_id[:4]),  # 入学年份：学号前四位
+        ("day", created_time.date().isoformat()),
+        ("week", f"{year}-W{week:02d}"),
+    )
+
+
+def stat_deltas(removed: Iterable = (), added: Iterable = ()) -> Counter:
+    """
+    由写操作前后的记录 (含 id / hobby / created_time 的 Row 或 dict) 计算各分组的计数差值。
+    差值为 0 的分组不出现在结果中。
+    """
+    deltas = Counter()
+    for row in removed:
+        row = row if isinstance(row, dict) else row._mapping
+        for key in stat_buckets(row["id"], row["hobby"], row["created_time"]):
+            deltas[key] -= 1
+    for row in added:
+        row = row if isinstance(row, dict) else row._mapping
+        for key in stat_buckets(row["id"], row["hobby"], row["created_time"]):
+            deltas[key] += 1
+    return Counter({key: value for key, value in deltas.items() if value})
+
+
+def delta_params(deltas: Counter) -> List[Dict[str, object]]:
+    """
+    转换为 upsert 的参数列表。
+    按 (维度, 分组) 排序，所有事务以相同顺序加锁，避免并发写入互相死锁。
+    """
+    return [{"dimension": dimension, "bucket": bucket, "count": value}
+            for (dimension, bucket), value in sorted(deltas.items())]
+
+
+@lru_cache(maxsize=8)
+def build_upsert_stmt(dialect_name: str):
+    """
+    构造 “不存在则插入，存在则 count = count + 差值” 的语句 (同步/异步 CRUD 共用)。
+    不支持 upsert 的数据库返回 None，由 apply_stat_deltas 先 UPDATE 再补 INSERT。
+    各方言的 upsert 结构没有缓存键，直接执行时每次都要重新编译 (比语句本身的执行慢一个数量级)，
+    因此在这里编译一次，返回等价的 text() 语句 (参数 :dimension / :bucket / :count)。
+    """
+    if dialect_name in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert as dialect_insert, dialect
+        stmt = dialect_insert(_stats)
+        stmt = stmt.on_duplicate_key_update(count=_stats.c.count + stmt.inserted["count"])
+    elif dialect_name in ("sqlite", "postgresql"):
+        if dialect_name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert, dialect
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert, dialect
+        stmt = dialect_insert(_stats)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[_stats.c.dimension, _stats.c.bucket],
+            set_={"count": _stats.c.count + stmt.excluded["count"]},
+        )
+    else:
+        return None
+    return text(str(stmt.compile(dialect=dialect(paramstyle="named"))))
+
+
+# 无 upsert 时的退路：先按差值 UPDATE，影响 0 行的再 INSERT
+STMT_ADD_COUNT = (
+    update(_stats)
+    .where(_stats.c.dimension == bindparam("b_dimension"), _stats.c.bucket == bindparam("b_bucket"))
+    .values(count=_stats.c.count + bindparam("b_count"))
+)
+# 写操作事务中读取变更前的记录 (加行锁，防止并发写入使差值基于过期数据)
+STMT_STAT_SOURCE_FOR_UPDATE = (select(*STAT_SOURCE_COLUMNS)
+                               .where(_people.c.id == bindparam("student_id"))
+                               .with_for_update())
+STMT_STAT_SOURCES_FOR_UPDATE = (select(*STAT_SOURCE_COLUMNS)
+                                .where(_people.c.id.in_(bindparam("ids", expanding=True)))
+                                .with_for_update())
+STMT_STATS = (select(_stats.c.dimension, _stats.c.bucket, _stats.c.count)
+              .where(_stats.c.count > 0)
+              .order_by(_stats.c.dimension, _stats.c.bucket))
+
+
+def format_stats(rows: Iterable, dimensions: Optional[Iterable[str]] = None) -> Dict[str, object]:
+    """
+    把统计表的行整理为响应结构 {"total": 记录总数, 维度: {分组: 计数}}。
+    total 由 year 维度求和得到 (每条记录恰好属于一个入学年份)。
+    """
+    result = {dimension: {} for dimension in STATS_DIMENSIONS}
+    for dimension, bucket, count in rows:
+        if dimension in result:
+            result[dimension][bucket] = count
+    total = sum(result["year"].values())
+    if dimensions is not None:
+        result = {dimension: result[dimension] for dimension in dimensions}
+    return {"total": total, **result}
+
+
+def rebuild_stats(db: Session, batch_size: int = 10000) -> int:
+    """
+    从 student 表重新计算全部计数，在一个事务中替换统计表内容。
+    - 先清空统计表 (获得写锁)，再以共享锁读取 student，重建期间的写操作会等待，不会丢失增量。
+    :return: 参与统计的记录数
+    """
+    PersonnelStat.__table__.create(bind=db.get_bind(), checkfirst=True)
+    db.execute(delete(_stats))
+    counts = Counter()
+    total = 0
+    result = db.execute(
+        select(*STAT_SOURCE_COLUMNS).with_for_update(read=True).execution_options(yield_per=batch_size)
+    )
+    for row in result:
+        total += 1
+        for key in stat_buckets(row.id, row.hobby, row.created_time):
+            counts[key] += 1
+    params = delta_params(counts)
+    for start in range(0, len(params), batch_size):
+        db.execute(insert(_stats), params[start:start + batch_size])
+    db.commit()
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="人员统计聚合表维护")
+    parser.add_argument("command", choices=["rebuild", "show"], help="rebuild: 重新计算全部计数；show: 输出当前统计")
+    args = parser.parse_args(argv)
+
+    from database import SessionLocal
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild":
+            total = rebuild_stats(db)
+            print(f"统计已重建：共 {total} 条记录。")
+        else:
+            print(format_stats(db.execute(STMT_STATS)))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
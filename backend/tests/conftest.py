@@ -0,0 +1,60 @@
+# conftest.py - 测试公共设置：临时 SQLite 数据库、同步模式的应用与 SQL 语句记录
+#
+# 用法 (在仓库根目录或 backend 目录下执行):
+#   python -m pytest backend/tests -q
+#
+# config.py 在导入时读取环境变量，因此必须在导入任何应用模块之前设置数据库地址。
+
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# 忽略运行环境中的 PERSONNEL_* 配置 (只读副本、共享内存等)，所有测试使用同一个临时数据库
+for _name in [name for name in os.environ if name.startswith("PERSONNEL_")]:
+    del os.environ[_name]
+TEST_DB_DIR = tempfile.mkdtemp(prefix="personnel-tests-")
+os.environ["PERSONNEL_DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DB_DIR, 'test.db')}"
+os.environ["PERSONNEL_DB_MODE"] = "sync"
+os.environ["PERSONNEL_SETTINGS_FILE"] = ""
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(TEST_DB_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def engine():
+    """执行全部迁移后的应用引擎"""
+    import migrate
+    from database import engine
+    migrate.upgrade(engine)
+    return engine
+
+
+@pytest.fixture(scope="session")
+def client(engine):
+    """同步模式的应用 (不执行 lifespan，避免后台预热的语句混入记录)"""
+    from fastapi.testclient import TestClient
+    from main import app
+    return TestClient(app)
+
+
+@pytest.fixture
+def statements(engine):
+    """记录期间发往数据库的语句 (每次 cursor.execute / executemany 记一条，取语句的第一个关键字)"""
+    from sqlalchemy import event
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement.split(None, 1)[0].upper())
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
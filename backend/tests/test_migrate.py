@@ -0,0 +1,26 @@
+# test_migrate.py - 迁移可重复执行，读接口的语句走索引 (migrate.py check 的 EXPLAIN 检查)
+
+from sqlalchemy import create_engine, text
+
+import migrate
+
+
+def test_read_paths_use_indexes(engine):
+    assert migrate.check(engine)
+
+
+def test_upgrade_adds_missing_index_and_is_idempotent(tmp_path):
+    # 独立的数据库：模拟缺少 (created_time, pid) 索引的旧库
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrate.db'}")
+    try:
+        assert migrate.upgrade(engine, target=1) == [1]
+        with engine.begin() as conn:
+            conn.execute(text("DROP INDEX ix_student_created_time_pid"))
+        assert not migrate.check(engine)
+
+        assert migrate.upgrade(engine) == [item.version for item in migrate.MIGRATIONS if item.version > 1]
+        assert migrate.check(engine)
+        assert migrate.upgrade(engine) == []
+        assert all(applied_at is not None for _, _, applied_at in migrate.status(engine))
+    finally:
+        engine.dispose()
@@ -0,0 +1,13 @@
+# test_startup.py - 冷启动：启动 uvicorn 子进程到就绪的耗时在预算内，就绪后第一个请求即是快速响应
+# 测量过程同 python -m bench.startup (临时 SQLite 数据库，预置数据后启动)。
+
+import pytest
+
+from bench import startup
+
+
+@pytest.mark.parametrize("db_mode", ["sync", "async"])
+def test_cold_start_to_first_fast_response(db_mode):
+    pytest.importorskip("uvicorn")
+    # 退出码为 1 时，超出预算的项目已输出到标准错误
+    assert startup.main(["--rows", "5000", "--repeat", "5", "--db-mode", db_mode]) == 0
@@ -0,0 +1,26 @@
+# test_validation.py - 批量校验 (val_bulk) 与 PersonnelCreate 的结果完全一致
+# 数据与比较方式同 python -m bench.validation 的一致性检查。
+
+import pytest
+
+from bench.validation import BAD_VALUES, check_conformance, make_items, make_record, validate_after, validate_before
+
+
+def test_conformance_with_random_invalid_rows():
+    # 一半以上的行含非法值、缺失字段、多余字段或不是 dict
+    assert check_conformance(make_items(20000, invalid_ratio=0.6, seed=0)) == 0
+
+
+@pytest.mark.parametrize("field", sorted(BAD_VALUES))
+def test_conformance_for_each_bad_value(field):
+    items = [make_record(0)]
+    for value in BAD_VALUES[field]:
+        items.append({**make_record(len(items)), field: value})
+    missing = make_record(len(items))
+    del missing[field]
+    items.append(missing)
+
+    before_records, before_errors = validate_before(items)
+    after_records, after_errors = validate_after(items)
+    assert after_records == before_records
+    assert after_errors == before_errors
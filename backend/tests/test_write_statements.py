@@ -0,0 +1,89 @@
+# test_write_statements.py - 单条写接口与批量接口发往数据库的语句数
+#
+# 新增依赖学号唯一索引 (不先查重、不 refresh)；修改 / 删除直接按学号执行并检查影响行数，修改没有变化时不写入。
+# BEGIN 由 database.install_engine_events 显式发出 (SQLite)；
+# 写操作后的 INSERT ... ON CONFLICT 为统计聚合表的 upsert (stats.py)，一次 executemany 写入全部分组。
+
+import pytest
+
+_next_id = iter(range(2099000000000, 2099000100000))
+
+
+def new_record() -> dict:
+    student_id = str(next(_next_id))
+    return {"id": student_id, "name": "欧阳修", "email": f"u{student_id}@example.com",
+            "tel": "13" + student_id[-9:], "hobby": "编程与阅读"}
+
+
+@pytest.fixture
+def person(client) -> dict:
+    record = new_record()
+    assert client.post("/personnel/", json=record).status_code == 201
+    return record
+
+
+def test_create(client, statements):
+    response = client.post("/personnel/", json=new_record())
+    assert response.status_code == 201
+    assert statements == ["BEGIN", "INSERT", "INSERT"]
+
+
+def test_create_duplicate(client, person, statements):
+    response = client.post("/personnel/", json=person)
+    assert response.status_code == 409
+    assert statements == ["BEGIN", "INSERT"]
+
+
+def test_update_with_change(client, person, statements):
+    response = client.put(f"/personnel/{person['id']}", json={"name": "苏轼"})
+    assert response.status_code == 200
+    assert response.json()["name"] == "苏轼"
+    assert statements == ["BEGIN", "SELECT", "UPDATE"]
+
+
+def test_update_with_stats_change(client, person, statements):
+    response = client.put(f"/personnel/{person['id']}", json={"hobby": "书法"})
+    assert response.status_code == 200
+    assert statements == ["BEGIN", "SELECT", "UPDATE", "INSERT"]
+
+
+def test_update_without_change(client, person, statements):
+    response = client.put(f"/personnel/{person['id']}", json={"name": person["name"], "hobby": person["hobby"]})
+    assert response.status_code == 200
+    assert statements == ["BEGIN", "SELECT"]
+
+
+def test_update_missing(client, statements):
+    response = client.put(f"/personnel/{new_record()['id']}", json={"name": "苏轼"})
+    assert response.status_code == 404
+    assert statements == ["BEGIN", "SELECT"]
+
+
+def test_delete(client, person, statements):
+    response = client.delete(f"/personnel/{person['id']}")
+    assert response.status_code == 204
+    assert statements == ["BEGIN", "DELETE", "INSERT"]
+
+
+def test_delete_missing(client, statements):
+    response = client.delete(f"/personnel/{new_record()['id']}")
+    assert response.status_code == 404
+    assert statements == ["BEGIN", "DELETE"]
+
+
+@pytest.mark.parametrize("creates", [3, 30])
+def test_batch(client, statements, creates):
+    """语句数与批次大小无关：相邻同类操作合并为一条多行语句"""
+    updated, deleted = new_record(), new_record()
+    for record in (updated, deleted):
+        assert client.post("/personnel/", json=record).status_code == 201
+    operations = [{"op": "create", "data": new_record()} for _ in range(creates)]
+    operations += [{"op": "update", "id": updated["id"], "data": {"name": "苏轼"}},
+                   {"op": "delete", "id": deleted["id"]}]
+    statements.clear()
+
+    response = client.post("/personnel/batch", json={"operations": operations})
+    assert response.status_code == 200
+    assert response.json()["succeeded"] == creates + 2
+    # 加锁读取现状 -> 多行 INSERT -> UPDATE -> DELETE -> 读取写入后的状态 -> 统计 upsert
+    assert statements == ["BEGIN", "SELECT", "INSERT", "UPDATE", "DELETE", "SELECT", "INSERT"]
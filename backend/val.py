@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, field_validator, ConfigDict
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
 from datetime import datetime
 import re
 
@@ -170,6 +170,67 @@ class PersonnelCollection(BaseModel):
     """用于包装列表查询结果的 Pydantic 模型"""
     items: List[PersonnelInDB] = Field(description="人员记录列表")
     count: int = Field(description="记录总数")
+    next: Optional[str] = Field(None, description="下一页游标，没有更多记录时为 null")
+
+
+# 单次批量请求允许的最大操作数
+MAX_BATCH_SIZE = 5000
+
+
+class BatchOperation(BaseModel):
+    """批量请求中的单个操作"""
+    op: Literal["create", "update", "delete"] = Field(..., description="操作类型")
+    id: Optional[str] = Field(None, description="目标学号 (update/delete 必填)")
+    data: Optional[Dict[str, Any]] = Field(None, description="create 时为 PersonnelCreate 字段，update 时为 PersonnelUpdate 字段")
+
+
+class BatchRequest(BaseModel):
+    """批量新增/修改/删除的请求体模型，操作按列表顺序生效"""
+    operations: List[BatchOperation] = Field(..., max_length=MAX_BATCH_SIZE, description="操作列表")
+
+
+class BatchItemResult(BaseModel):
+    """批量请求中单个操作的处理结果"""
+    index: int = Field(description="操作在请求列表中的下标")
+    op: str = Field(description="操作类型")
+    id: Optional[str] = Field(None, description="涉及的学号")
+    status: int = Field(description="结果状态码：201/200/204 成功，404/409/422 失败")
+    detail: Optional[Any] = Field(None, description="失败原因")
+
+
+class BatchResult(BaseModel):
+    """批量请求的响应模型"""
+    results: List[BatchItemResult] = Field(description="逐条处理结果，与请求顺序一致")
+    succeeded: int = Field(description="成功的操作数")
+    failed: int = Field(description="失败的操作数")
+
+
+class PersonnelStats(BaseModel):
+    """人员统计的响应模型 (各维度为 分组 -> 人数)"""
+    total: int = Field(description="记录总数")
+    hobby: Optional[Dict[str, int]] = Field(None, description="按兴趣")
+    year: Optional[Dict[str, int]] = Field(None, description="按入学年份 (学号前四位)")
+    day: Optional[Dict[str, int]] = Field(None, description="按创建日期 (YYYY-MM-DD)")
+    week: Optional[Dict[str, int]] = Field(None, description="按创建周 (ISO 周，YYYY-Www)")
+
+
+class PersonnelDigest(BaseModel):
+    """内容摘要 (增量同步用) 的响应模型，摘要算法见 digest.py"""
+    buckets: int = Field(description="分桶数")
+    count: int = Field(description="记录总数")
+    root: str = Field(description="根摘要")
+    digests: Optional[Dict[str, str]] = Field(None, description="桶号 -> 桶摘要 (只含非空桶)")
+    records: Optional[Dict[str, Dict[str, str]]] = Field(None, description="请求的桶号 -> {学号: 记录摘要}")
+
+
+class PersonnelChanges(BaseModel):
+    """变更日志 (GET /personnel/changes) 的响应模型，每个学号只出现一次 (当前状态)"""
+    cursor: str = Field(description="下次请求使用的游标")
+    resync: bool = Field(False, description="游标已失效 (过旧或服务已重启)，需要重新加载列表")
+    more: bool = Field(False, description="还有未返回的变更，应立即用新游标继续读取")
+    inserted: List[PersonnelInDB] = Field(default_factory=list, description="新增的记录")
+    updated: List[PersonnelInDB] = Field(default_factory=list, description="修改的记录")
+    deleted: List[str] = Field(default_factory=list, description="删除的学号")
 
 
 # def run_validation_test():
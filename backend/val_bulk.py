@@ -0,0 +1,231 @@
+# val_bulk.py - PersonnelCreate 的批量校验
+#
+# 与 val.PersonnelCreate 的规则、错误信息完全一致，但按列处理整批数据：
+# 每一列先用 map(str.strip / pattern.fullmatch / len) 在 C 层面整体检查，
+# 只有检查不通过的那几行才逐个生成错误，全程不抛出异常。
+# 输出的错误格式与 ValidationError.errors(include_url=False, include_context=False) 相同。
+# 与 Pydantic 模型的一致性由 bench/validation.py 对照检查。
+
+from itertools import compress, count, repeat
+from operator import is_not, not_
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Pattern, Sequence, Tuple
+
+from val import PersonnelCreate, REGEX_STUDENT_ID, REGEX_MOBILE, REGEX_EMAIL
+
+_MISSING = object()
+
+
+class FieldRule(NamedTuple):
+    """单个字段的校验规则 (对应 PersonnelBase 中的 field_validator 与 Field 约束)"""
+    name: str
+    label: str                          # 错误信息中的字段名称
+    pattern: Optional[Pattern] = None   # 去除空白后必须完整匹配的正则
+    pattern_msg: Optional[str] = None
+    max_chars: Optional[int] = None     # 校验器中的长度上限
+    max_chars_msg: Optional[str] = None
+    none_msg: Optional[str] = None      # 值为 None 时的专用提示
+    max_length: Optional[int] = None    # Field(max_length=...)，校验器之后由 Pydantic 检查
+    column_pattern: Optional[Pattern] = None  # 整列拼接后一次匹配用的正则，见 _compile_column_pattern
+
+    @property
+    def length_limit(self) -> Optional[int]:
+        """整列检查使用的长度上限 (两种上限中较小者)"""
+        limits = [limit for limit in (self.max_chars, self.max_length) if limit is not None]
+        return min(limits) if limits else None
+
+
+def _field_max_length(name: str) -> Optional[int]:
+    """从模型字段定义中读取 max_length，避免与 val.py 重复维护"""
+    for meta in PersonnelCreate.model_fields[name].metadata:
+        if getattr(meta, "max_length", None) is not None:
+            return meta.max_length
+    return None
+
+
+# 整列拼接时使用的分隔符，字段正则都不会匹配它
+_SEPARATOR = "\x00"
+# 分块整体匹配的块大小
+_CHUNK_SIZE = 64
+
+
+def _compile_column_pattern(pattern: Optional[Pattern]) -> Optional[Pattern]:
+    """
+    把 ^X$ 转换为匹配 "X\\0X\\0...X" 的正则，整列只需一次 fullmatch。
+    使用占有量词 (Python 3.11+) 避免失败时回溯；不支持时返回 None，退回逐值匹配。
+    """
+    if pattern is None:
+        return None
+    inner = pattern.pattern
+    if inner.startswith("^"):
+        inner = inner[1:]
+    if inner.endswith("$"):
+        inner = inner[:-1]
+    try:
+        return re.compile(f"(?:(?:{inner}){_SEPARATOR})*+(?:{inner})", pattern.flags)
+    except re.error:
+        return None
+
+
+# 规则顺序即模型字段顺序，错误按该顺序输出
+RULES: Tuple[FieldRule, ...] = (
+    FieldRule("id", "学号", pattern=REGEX_STUDENT_ID, pattern_msg="学号必须是13位纯数字"),
+    FieldRule("name", "姓名", max_chars=8, max_chars_msg="姓名不能超过8个中文字符"),
+    FieldRule("email", "邮箱", pattern=REGEX_EMAIL, pattern_msg="邮箱格式不正确"),
+    FieldRule("tel", "手机号码", pattern=REGEX_MOBILE, pattern_msg="手机号码必须是11位纯数字，且以1开头"),
+    FieldRule("hobby", "个人兴趣", max_chars=32, max_chars_msg="个人兴趣不能超过32个中文字符",
+              none_msg="个人兴趣是必填字段"),
+)
+RULES = tuple(
+    rule._replace(max_length=_field_max_length(rule.name), column_pattern=_compile_column_pattern(rule.pattern))
+    for rule in RULES
+)
+FIELD_NAMES = tuple(rule.name for rule in RULES)
+assert FIELD_NAMES == tuple(PersonnelCreate.model_fields), "RULES 必须覆盖 PersonnelCreate 的全部字段且顺序一致"
+
+
+class BulkValidationResult(NamedTuple):
+    """批量校验结果"""
+    records: List[Optional[Dict[str, Any]]]   # 与输入一一对应，等价于 PersonnelCreate.model_dump()；失败的位置为 None
+    errors: Dict[int, List[Dict[str, Any]]]   # 输入下标 -> 错误列表
+
+    @property
+    def valid(self) -> List[Tuple[int, Dict[str, Any]]]:
+        """校验通过的 (输入下标, 记录)"""
+        return [(index, record) for index, record in enumerate(self.records) if record is not None]
+
+
+def _value_error(rule: FieldRule, message: str, value) -> Dict[str, Any]:
+    return {"type": "value_error", "loc": (rule.name,), "msg": f"Value error, {message}", "input": value}
+
+
+def check_value(rule: FieldRule, value) -> Tuple[Any, Optional[Dict[str, Any]]]:
+    """
+    逐值校验 (只用于整列检查发现问题的行)，顺序与 field_validator 一致。
+    :return: (去除空白后的值, 错误)，通过时错误为 None
+    """
+    if not isinstance(value, str):
+        if value is None and rule.none_msg:
+            return None, _value_error(rule, rule.none_msg, value)
+        return None, _value_error(rule, f"{rule.label}必须是字符串", value)
+    cleaned = value.strip()
+    if not cleaned:
+        return None, _value_error(rule, f"{rule.label}不能为空或只包含空格。", value)
+    if rule.pattern is not None and not rule.pattern.fullmatch(cleaned):
+        return None, _value_error(rule, rule.pattern_msg, value)
+    if rule.max_chars is not None and len(cleaned) > rule.max_chars:
+        return None, _value_error(rule, rule.max_chars_msg, value)
+    if rule.max_length is not None and len(cleaned) > rule.max_length:
+        return None, {"type": "string_too_long", "loc": (rule.name,),
+                      "msg": f"String should have at most {rule.max_length} characters", "input": cleaned}
+    return cleaned, None
+
+
+def _positions(flags) -> List[int]:
+    """返回为真的位置 (compress 在 C 层面完成遍历)"""
+    return list(compress(count(), flags))
+
+
+def _column_matches(rule: FieldRule, stripped: List[str]) -> bool:
+    """用一次正则匹配判断这些值是否都完整匹配 rule.pattern；无法判断时返回 False"""
+    if rule.column_pattern is None:
+        return False
+    joined = _SEPARATOR.join(stripped)
+    # 值中含有分隔符时结果不可靠，交给逐值匹配
+    if joined.count(_SEPARATOR) != len(stripped) - 1:
+        return False
+    return rule.column_pattern.fullmatch(joined) is not None
+
+
+def _pattern_failures(rule: FieldRule, stripped: List[str]) -> List[int]:
+    """
+    返回不匹配 rule.pattern 的位置。
+    按 _CHUNK_SIZE 分块整体匹配，只有匹配失败的块才逐值定位，少量坏值不会拖慢整列。
+    """
+    fullmatch = rule.pattern.fullmatch
+    failures = []
+    for start in range(0, len(stripped), _CHUNK_SIZE):
+        chunk = stripped[start:start + _CHUNK_SIZE]
+        if not _column_matches(rule, chunk):
+            failures.extend(start + i for i in _positions(map(not_, map(fullmatch, chunk))))
+    return failures
+
+
+def _bad_rows(rule: FieldRule, stripped: List[str]) -> set:
+    """整列检查，返回可能不合格的行 (列内下标)"""
+    bad = set()
+    if "" in stripped:
+        bad.update(_positions(map(not_, stripped)))
+    if rule.pattern is not None:
+        bad.update(_pattern_failures(rule, stripped))
+    limit = rule.length_limit
+    if limit is not None and stripped and max(map(len, stripped)) > limit:
+        bad.update(_positions(map(limit.__lt__, map(len, stripped))))
+    return bad
+
+
+def _validate_column(rule: FieldRule, column: list) -> Tuple[list, Dict[int, Dict[str, Any]]]:
+    """
+    校验一列 (缺失的值为 _MISSING)。
+    :return: (去除空白后的值，失败的位置为 None, 列内下标 -> 错误)
+    """
+    others = _positions(map(is_not, map(type, column), repeat(str)))
+    if others:
+        # 缺失值和非 str 的值先记为空串，由逐值校验给出准确的错误
+        column_str = column.copy()
+        for i in others:
+            column_str[i] = ""
+        stripped = list(map(str.strip, column_str))
+    else:
+        stripped = list(map(str.strip, column))
+    errors = {}
+    for i in sorted(_bad_rows(rule, stripped)):
+        value = column[i]
+        if value is _MISSING:
+            stripped[i] = None
+            errors[i] = {"type": "missing", "loc": (rule.name,), "msg": "Field required", "input": _MISSING}
+            continue
+        stripped[i], error = check_value(rule, value)
+        if error is not None:
+            errors[i] = error
+    return stripped, errors
+
+
+def validate_personnel_batch(items: Sequence[Any]) -> BulkValidationResult:
+    """
+    按 PersonnelCreate 的规则批量校验原始数据 (dict 列表)。
+    - 多余的键被忽略，通过的记录只包含模型字段，值已去除首尾空白。
+    - 每行的错误按字段定义顺序排列，内容与 Pydantic 的 errors() 一致。
+    """
+    items = list(items)
+    errors: Dict[int, List[Dict[str, Any]]] = {}
+    for index in _positions(map(is_not, map(type, items), repeat(dict))):
+        if not isinstance(items[index], dict):
+            errors[index] = [{"type": "model_attributes_type", "loc": (),
+                              "msg": "Input should be a valid dictionary or object to extract fields from",
+                              "input": items[index]}]
+    if errors:
+        rows = [index for index in range(len(items)) if index not in errors]   # 各 dict 在输入中的下标
+        dicts = [items[index] for index in rows]
+    else:
+        rows, dicts = range(len(items)), items
+
+    columns = []
+    for rule in RULES:
+        column = list(map(dict.get, dicts, repeat(rule.name), repeat(_MISSING)))
+        cleaned, column_errors = _validate_column(rule, column)
+        columns.append(cleaned)
+        for position, error in column_errors.items():
+            if error["input"] is _MISSING:
+                # missing 错误的 input 是整条原始数据
+                error["input"] = dicts[position]
+            errors.setdefault(rows[position], []).append(error)
+
+    records = [{"id": id_, "name": name, "email": email, "tel": tel, "hobby": hobby}
+               for id_, name, email, tel, hobby in zip(*columns)]
+    if errors:
+        records_by_row, records = records, [None] * len(items)
+        for index, record in zip(rows, records_by_row):
+            if index not in errors:
+                records[index] = record
+    return BulkValidationResult(records, errors)
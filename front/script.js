@@ -4,6 +4,8 @@
 // 配置
 // ------------------------------------------------------------------
 const API_BASE_URL = 'http://127.0.0.1:8000/personnel';
+// 每页加载的记录条数
+const PAGE_LIMIT = 50;
 
 // DOM 元素引用
 const form = document.getElementById('personnelForm');
@@ -14,6 +16,18 @@ const cancelBtn = document.getElementById('cancelBtn');
 const formTitle = document.getElementById('formTitle');
 const isEditingInput = document.getElementById('isEditing');
 const originalStudentIdInput = document.getElementById('originalStudentId');
+const loadMoreBtn = document.getElementById('loadMoreBtn');
+const pagerInfo = document.getElementById('pagerInfo');
+
+// 下一页游标，为 null 时表示已加载全部记录
+let nextCursor = null;
+// 记录总数 (收到变更时增减)
+let totalCount = 0;
+// 变更推送 (GET /personnel/changes/stream)，写操作后只接收变化的记录，不再重新加载整张表
+let changeSource = null;
+let listLoaded = false;
+// 最近一次写操作返回的一致性令牌 (X-Consistency-Token)，之后的请求带上它，保证读到自己的修改 (后端读写分离时)
+let consistencyToken = null;
 
 
 function formatTime(timeStr) {
@@ -37,6 +51,9 @@ function displayMessage(msg, isError = false) {
 
 async function apiRequest(url, method, data = null) {
     const headers = { 'Content-Type': 'application/json' };
+    if (consistencyToken) {
+        headers['X-Consistency-Token'] = consistencyToken;
+    }
     
     const config = {
         method: method,
@@ -46,6 +63,10 @@ async function apiRequest(url, method, data = null) {
 
     try {
         const response = await fetch(url, config);
+        const token = response.headers.get('X-Consistency-Token');
+        if (token) {
+            consistencyToken = token;
+        }
         
         if (!response.ok) {
             const responseText = await response.text();
@@ -100,18 +121,113 @@ async function apiRequest(url, method, data = null) {
 
 
 /**
- * 获取人员列表 (GET /personnel)
+ * 获取人员列表第一页 (GET /personnel)
  */
 async function fetchPersonnelData() {
     tableBody.innerHTML = '<tr><td colspan="7">加载中...</td></tr>';
+    nextCursor = null;
     try {
-        const data = await apiRequest(`${API_BASE_URL}/?mode=descend`, 'GET');
+        const data = await apiRequest(`${API_BASE_URL}/?mode=descend&limit=${PAGE_LIMIT}`, 'GET');
         renderTable(data.items || []);
+        updatePager(data);
+        listLoaded = true;
     } catch (e) {
         tableBody.innerHTML = '<tr><td colspan="7">加载失败，请检查后端是否运行。</td></tr>';
     }
 }
 
+/**
+ * 按 next 游标加载下一页并追加到表格末尾
+ */
+async function loadMorePersonnel() {
+    if (!nextCursor) return;
+    loadMoreBtn.disabled = true;
+    try {
+        const url = `${API_BASE_URL}/?mode=descend&limit=${PAGE_LIMIT}&cursor=${encodeURIComponent(nextCursor)}`;
+        const data = await apiRequest(url, 'GET');
+        renderTable(data.items || [], true);
+        updatePager(data);
+    } catch (e) {
+        // apiRequest 会处理错误显示
+    } finally {
+        loadMoreBtn.disabled = false;
+    }
+}
+
+/**
+ * 更新记录总数和“加载更多”按钮状态
+ */
+function updatePager(data) {
+    nextCursor = data.next || null;
+    totalCount = data.count;
+    refreshPagerInfo();
+    loadMoreBtn.style.display = nextCursor ? 'inline-block' : 'none';
+}
+
+function refreshPagerInfo() {
+    const loaded = tableBody.querySelectorAll('tr[data-id]').length;
+    pagerInfo.textContent = `已加载 ${loaded} / 共 ${totalCount} 条`;
+}
+
+// ------------------------------------------------------------------
+// 变更推送
+// ------------------------------------------------------------------
+
+/**
+ * 订阅变更事件流：连接建立 (ready) 后再加载列表，之后只按变更更新表格。
+ * 断线时浏览器自动重连并带上最后的游标；游标失效 (resync) 时重新加载列表。
+ */
+function startChangeFeed() {
+    if (!window.EventSource) {
+        fetchPersonnelData();
+        return;
+    }
+    changeSource = new EventSource(`${API_BASE_URL}/changes/stream`);
+    changeSource.addEventListener('ready', () => fetchPersonnelData());
+    changeSource.addEventListener('resync', () => fetchPersonnelData());
+    changeSource.addEventListener('changes', (event) => applyChanges(JSON.parse(event.data)));
+    changeSource.onerror = () => {
+        // 后端未启动时仍显示加载失败的提示
+        if (!listLoaded) fetchPersonnelData();
+    };
+}
+
+function isFeedConnected() {
+    return changeSource !== null && changeSource.readyState === EventSource.OPEN;
+}
+
+function findRow(studentId) {
+    return tableBody.querySelector(`tr[data-id="${CSS.escape(studentId)}"]`);
+}
+
+/**
+ * 应用一次变更：删除的移除，修改的就地替换，新增的插到表格最前 (列表按创建时间降序)。
+ * 同一变更可能重复收到 (例如列表加载前后)，按学号判断，不会重复插入。
+ */
+function applyChanges(data) {
+    if (!listLoaded) return;
+    (data.deleted || []).forEach(studentId => {
+        const row = findRow(studentId);
+        if (row) row.remove();
+        if (row || nextCursor) totalCount -= 1;   // 未加载到的记录也计入总数
+    });
+    (data.updated || []).forEach(person => {
+        const row = findRow(person.id);
+        if (row) row.replaceWith(createRow(person));
+    });
+    (data.inserted || []).forEach(person => {
+        const row = findRow(person.id);
+        if (row) {
+            row.replaceWith(createRow(person));
+        } else {
+            tableBody.querySelector('tr:not([data-id])')?.remove();   // “没有找到任何记录”提示
+            tableBody.insertBefore(createRow(person), tableBody.firstChild);
+            totalCount += 1;
+        }
+    });
+    refreshPagerInfo();
+}
+
 /**
  * 新增或修改人员 (POST /personnel 或 PUT /personnel/{id})
  */
@@ -146,7 +262,8 @@ async function submitPersonnel(event) {
             displayMessage(isEdit ? '修改成功！' : '新增成功！', false);
             form.reset();
             resetFormState(); 
-            fetchPersonnelData(); 
+            // 变更推送已连接时表格由推送更新，否则重新加载
+            if (!isFeedConnected()) fetchPersonnelData();
         }
     } catch (e) {
         // apiRequest 会处理错误显示
@@ -168,7 +285,7 @@ async function deletePersonnel(studentId, name) {
     try {
         await apiRequest(url, 'DELETE');
         displayMessage(`人员【${name}】删除成功！`, false);
-        fetchPersonnelData();
+        if (!isFeedConnected()) fetchPersonnelData();
     } catch (e) {
         // apiRequest 会处理错误显示
     }
@@ -180,41 +297,52 @@ async function deletePersonnel(studentId, name) {
 
 /**
  * 渲染表格数据
+ * @param {Array} personnelList 人员列表
+ * @param {boolean} append 是否追加到已有行之后（加载更多）
  */
-function renderTable(personnelList) {
-    tableBody.innerHTML = '';
-    if (personnelList.length === 0) {
+function renderTable(personnelList, append = false) {
+    if (!append) {
+        tableBody.innerHTML = '';
+    }
+    if (!append && personnelList.length === 0) {
         tableBody.innerHTML = '<tr><td colspan="7" style="text-align:center;">没有找到任何记录。</td></tr>';
         return;
     }
 
-    personnelList.forEach(person => {
-        const row = tableBody.insertRow();
-        
-        row.insertCell().textContent = person.id;
-        row.insertCell().textContent = person.name;
-        row.insertCell().textContent = person.tel;
-        row.insertCell().textContent = person.email;
-        row.insertCell().textContent = person.hobby || '-';
-        row.insertCell().textContent = formatTime(person.created_time);
-        
-        const actionCell = row.insertCell();
-        
-        // 修改按钮
-        const editBtn = document.createElement('button');
-        editBtn.textContent = '修改';
-        editBtn.className = 'btn btn-secondary';
-        editBtn.onclick = () => loadForEdit(person);
-        actionCell.appendChild(editBtn);
-
-        // 删除按钮
-        const deleteBtn = document.createElement('button');
-        deleteBtn.textContent = '删除';
-        deleteBtn.className = 'btn btn-danger';
-        deleteBtn.style.marginLeft = '10px';
-        deleteBtn.onclick = () => deletePersonnel(person.id, person.name);
-        actionCell.appendChild(deleteBtn);
-    });
+    personnelList.forEach(person => tableBody.appendChild(createRow(person)));
+}
+
+/**
+ * 构造一行表格 (含修改/删除按钮)
+ */
+function createRow(person) {
+    const row = document.createElement('tr');
+    row.dataset.id = person.id;
+    
+    row.insertCell().textContent = person.id;
+    row.insertCell().textContent = person.name;
+    row.insertCell().textContent = person.tel;
+    row.insertCell().textContent = person.email;
+    row.insertCell().textContent = person.hobby || '-';
+    row.insertCell().textContent = formatTime(person.created_time);
+    
+    const actionCell = row.insertCell();
+    
+    // 修改按钮
+    const editBtn = document.createElement('button');
+    editBtn.textContent = '修改';
+    editBtn.className = 'btn btn-secondary';
+    editBtn.onclick = () => loadForEdit(person);
+    actionCell.appendChild(editBtn);
+
+    // 删除按钮
+    const deleteBtn = document.createElement('button');
+    deleteBtn.textContent = '删除';
+    deleteBtn.className = 'btn btn-danger';
+    deleteBtn.style.marginLeft = '10px';
+    deleteBtn.onclick = () => deletePersonnel(person.id, person.name);
+    actionCell.appendChild(deleteBtn);
+    return row;
 }
 
 /**
@@ -257,6 +385,7 @@ function resetFormState() {
 
 form.addEventListener('submit', submitPersonnel);
 cancelBtn.addEventListener('click', resetFormState);
+loadMoreBtn.addEventListener('click', loadMorePersonnel);
 
-// 初始加载数据
-window.onload = fetchPersonnelData;
\ No newline at end of file
+// 先订阅变更推送，连接建立后加载数据
+window.onload = startChangeFeed;
\ No newline at end of file